@@ -1,19 +1,19 @@
 # app.py
 import streamlit as st
-import google.genai as genai
-from google.genai.errors import APIError
-from google.genai.types import Part
-from PIL import Image
-import io, os, json, re, hashlib
-from dotenv import load_dotenv
-
-# PDF & export helpers
-import fitz  # PyMuPDF
-import pandas as pd
-from docx import Document
-from docx.shared import Pt
+import os, json
 from datetime import datetime
 
+# OCR / translation / export pipeline (importable without Streamlit). Only the
+# light modules are imported here; google-genai (gemini, pipeline, tutor) and
+# PyMuPDF (pdf) are imported where they are first used, so the first page
+# render doesn't pay for them. benchmarks/bench_startup.py tracks this.
+from scantranslate import (
+    TARGET_LANGUAGES, document_rows, export_bytes, export_txt, get_cache_manager, get_history_store,
+    get_job_registry, get_metrics, get_result_cache, get_translation_memory, get_upload_registry,
+    iter_upload_entries, job_key, render_prometheus, sentences_of,
+)
+from scantranslate.config import ADMIN_PANEL, HISTORY_PAGE_SIZE, JOB_POLL_S, STREAM_RESPONSES, THUMB_WINDOW
+
 # ─────────────────────────────────────────────────────────────
 # PAGE CONFIG
 # ─────────────────────────────────────────────────────────────
@@ -22,17 +22,26 @@ st.set_page_config(page_title="ScanTranslate", layout="wide")
 # ─────────────────────────────────────────────────────────────
 # ENV / CLIENT
 # ─────────────────────────────────────────────────────────────
-load_dotenv()
+# `.env` was loaded when scantranslate.config was imported above
 API_KEY = os.getenv("GEMINI_API_KEY")
 
-client = None
-if API_KEY:
+@st.cache_resource(show_spinner=False)
+def gemini_client(api_key: str):
+    """One rate-limited client per API key for the server process, built on first use (not on every rerun)."""
+    from scantranslate import make_client
+    return make_client(api_key)
+
+def get_client():
+    """The shared Gemini client, or None when no key is set or it can't be built (the error is shown)."""
+    if not API_KEY:
+        return None
     try:
-        client = genai.Client(api_key=API_KEY)
+        return gemini_client(API_KEY)
     except Exception as e:
         st.error(f"⚠️ Gemini 클라이언트 초기화 오류: {e}")
-        client = None
-else:
+        return None
+
+if not API_KEY:
     st.warning(
         "⚠️ **GEMINI_API_KEY** 환경 변수가 설정되지 않았거나 `.env` 파일 로드에 실패했습니다. "
         "OCR/번역 기능이 작동하지 않습니다."
@@ -51,12 +60,23 @@ TEXTS = {
         "extract_button": "텍스트 추출 및 번역",
         "target_language_label": "번역할 언어",
         "file_uploader_label": "클릭해 업로드하거나 파일을 드래그 앤 드롭",
-        "file_uploader_hint": "제한 200MB / JPG, JPEG, PNG, PDF",
+        "file_uploader_hint": "제한 200MB / JPG, JPEG, PNG, PDF, ZIP (여러 파일 가능)",
         "learn_inquire_header": "학습 & 문의",
         "learn_inquire_text": "번역 후, 특정 문장을 선택해 질문할 수 있어요.",
         "history_header": "히스토리",
         "history_text": "최근 번역 기록이 여기에 표시됩니다.",
         "history_item_prefix": "기록",
+        "history_search": "기록 검색 (원문 또는 번역)",
+        "history_all_langs": "모든 언어",
+        "history_open": "편집기에서 열기",
+        "history_no_match": "일치하는 기록이 없습니다.",
+        "history_range": "{first}–{last} / {total}건",
+        "changes_header": "이전 버전과 비교",
+        "changes_summary": "{total}페이지 중 {changed}페이지 변경 · 캐시에서 재사용 {reused} · 삭제 {removed}",
+        "changes_none": "변경된 페이지가 없습니다.",
+        "changes_page": "{page}페이지",
+        "changes_added": "새 페이지",
+        "changes_same_text": "(텍스트 변경 없음)",
         "context_label": "문맥",
         "chat_input_label": "질문할 문장/문단 (선택 또는 붙여넣기):",
         "ask_ai_button": "AI에게 질문",
@@ -83,6 +103,25 @@ TEXTS = {
         "selected_text_will_be_used": "선택된 문장이 질문에 사용됩니다.",
         "pages": "페이지",
         "saved": "저장되었습니다.",
+        "page_mode": "처리 범위",
+        "page_mode_single": "선택한 페이지",
+        "page_mode_all": "전체 페이지",
+        "page_mode_range": "페이지 범위",
+        "page_progress": "페이지 처리 중... ({done}/{total})",
+        "page_failed": "다음 페이지 처리에 실패했습니다: {pages}",
+        "batch_header": "📦 일괄 처리",
+        "batch_progress": "파일 처리 중... ({done}/{total})",
+        "batch_duplicates": "중복 파일 {n}개는 한 번만 처리됩니다.",
+        "batch_empty": "지원되는 파일이 없습니다.",
+        "batch_file": "파일",
+        "batch_status": "상태",
+        "status_queued": "대기",
+        "status_running": "처리 중",
+        "status_done": "완료",
+        "status_partial": "일부 실패",
+        "status_failed": "실패",
+        "export_batch_csv": "전체 CSV로 내보내기",
+        "export_batch_docx": "전체 DOCX로 내보내기",
     },
     "en": {
         "title_main": "ScanTranslate: Korean → Filipino OCR Tool",
@@ -93,12 +132,23 @@ TEXTS = {
         "extract_button": "Extract & Translate Text",
         "target_language_label": "Translate to",
         "file_uploader_label": "Click to upload or drag & drop",
-        "file_uploader_hint": "Limit 200MB / JPG, JPEG, PNG, PDF",
+        "file_uploader_hint": "Limit 200MB / JPG, JPEG, PNG, PDF, ZIP (multiple files allowed)",
         "learn_inquire_header": "Learn & Inquire",
         "learn_inquire_text": "After translating, select specific sentences and ask deeper questions.",
         "history_header": "History",
         "history_text": "Your recent translations will appear here.",
         "history_item_prefix": "History",
+        "history_search": "Search history (original or translation)",
+        "history_all_langs": "All languages",
+        "history_open": "Open in editor",
+        "history_no_match": "No matching translations.",
+        "history_range": "{first}–{last} of {total}",
+        "changes_header": "Changes since the previous version",
+        "changes_summary": "{changed} of {total} pages changed · {reused} reused from cache · {removed} removed",
+        "changes_none": "No pages changed.",
+        "changes_page": "Page {page}",
+        "changes_added": "new page",
+        "changes_same_text": "(text unchanged)",
         "context_label": "Context",
         "chat_input_label": "Sentence/paragraph to ask about (select or paste):",
         "ask_ai_button": "Ask AI",
@@ -125,6 +175,25 @@ TEXTS = {
         "selected_text_will_be_used": "Selected sentences will be used for the question.",
         "pages": "Pages",
         "saved": "Saved.",
+        "page_mode": "Pages to process",
+        "page_mode_single": "Selected page",
+        "page_mode_all": "All pages",
+        "page_mode_range": "Page range",
+        "page_progress": "Processing pages... ({done}/{total})",
+        "page_failed": "These pages failed: {pages}",
+        "batch_header": "📦 Batch",
+        "batch_progress": "Processing files... ({done}/{total})",
+        "batch_duplicates": "{n} duplicate file(s) will be processed only once.",
+        "batch_empty": "No supported files found.",
+        "batch_file": "File",
+        "batch_status": "Status",
+        "status_queued": "Queued",
+        "status_running": "Running",
+        "status_done": "Done",
+        "status_partial": "Partly failed",
+        "status_failed": "Failed",
+        "export_batch_csv": "Export all as CSV",
+        "export_batch_docx": "Export all as DOCX",
     },
     "fil": {
         "title_main": "ScanTranslate: Korean → Filipino OCR Kagamitan",
@@ -135,12 +204,23 @@ TEXTS = {
         "extract_button": "I-extract at Isalin",
         "target_language_label": "Isalin sa",
         "file_uploader_label": "I-click para mag-upload o i-drag & drop",
-        "file_uploader_hint": "Hangganan 200MB / JPG, JPEG, PNG, PDF",
+        "file_uploader_hint": "Hangganan 200MB / JPG, JPEG, PNG, PDF, ZIP (puwede ang maraming file)",
         "learn_inquire_header": "Matuto at Magtanong",
         "learn_inquire_text": "Pagkatapos magsalin, pumili ng mga pangungusap at magtanong nang mas malalim.",
         "history_header": "Kasaysayan",
         "history_text": "Dito lalabas ang iyong mga huling pagsasalin.",
         "history_item_prefix": "Kasaysayan",
+        "history_search": "Maghanap sa kasaysayan (orihinal o salin)",
+        "history_all_langs": "Lahat ng wika",
+        "history_open": "Buksan sa editor",
+        "history_no_match": "Walang tugmang pagsasalin.",
+        "history_range": "{first}–{last} sa {total}",
+        "changes_header": "Mga pagbabago mula sa nakaraang bersyon",
+        "changes_summary": "{changed} sa {total} pahina ang nagbago · {reused} ang muling ginamit mula sa cache · {removed} ang inalis",
+        "changes_none": "Walang nagbagong pahina.",
+        "changes_page": "Pahina {page}",
+        "changes_added": "bagong pahina",
+        "changes_same_text": "(walang pagbabago sa teksto)",
         "context_label": "Konteksto",
         "chat_input_label": "Pangungusap/talata para tanungin (pumili o i-paste):",
         "ask_ai_button": "Itanong sa AI",
@@ -167,15 +247,28 @@ TEXTS = {
         "selected_text_will_be_used": "Gagamitin sa tanong ang napiling pangungusap.",
         "pages": "Mga Pahina",
         "saved": "Nasave.",
+        "page_mode": "Mga pahinang ipoproseso",
+        "page_mode_single": "Napiling pahina",
+        "page_mode_all": "Lahat ng pahina",
+        "page_mode_range": "Saklaw ng pahina",
+        "page_progress": "Pinoproseso ang mga pahina... ({done}/{total})",
+        "page_failed": "Nabigo ang mga pahinang ito: {pages}",
+        "batch_header": "📦 Batch",
+        "batch_progress": "Pinoproseso ang mga file... ({done}/{total})",
+        "batch_duplicates": "{n} dobleng file ay ipoproseso nang isang beses lang.",
+        "batch_empty": "Walang suportadong file.",
+        "batch_file": "File",
+        "batch_status": "Katayuan",
+        "status_queued": "Naghihintay",
+        "status_running": "Pinoproseso",
+        "status_done": "Tapos",
+        "status_partial": "May nabigo",
+        "status_failed": "Nabigo",
+        "export_batch_csv": "I-export lahat bilang CSV",
+        "export_batch_docx": "I-export lahat bilang DOCX",
     },
 }
 
-TARGET_LANGUAGES = {
-    "ko": {"code": "Korean", "flag": "🇰🇷", "display_ko": "한국어", "display_en": "Korean", "display_fil": "Koreano"},
-    "en": {"code": "English", "flag": "🇺🇸", "display_ko": "영어", "display_en": "English", "display_fil": "Ingles"},
-    "fil": {"code": "Filipino (Tagalog)", "flag": "🇵🇭", "display_ko": "필리핀어", "display_en": "Filipino", "display_fil": "Filipino"},
-}
-
 # ─────────────────────────────────────────────────────────────
 # STATE
 # ─────────────────────────────────────────────────────────────
@@ -184,11 +277,15 @@ ss.setdefault("app_lang_key", "ko")
 ss.setdefault("target_lang_key", "fil")
 ss.setdefault("chat_history", [])
 ss.setdefault("translation_context", None)
-ss.setdefault("history_list", [])
+ss.setdefault("history_id", None)  # history entry shown in the editor
 ss.setdefault("edited_korean", "")
 ss.setdefault("edited_target", "")
 ss.setdefault("ocr_confidence", None)
 ss.setdefault("pdf_page_index", 0)
+ss.setdefault("pdf_page_mode", "single")
+ss.setdefault("page_results", [])
+ss.setdefault("batch_rows", [])
+ss.setdefault("batch_results", [])
 
 # ─────────────────────────────────────────────────────────────
 # STYLE (wide + blue + BIG TITLE)
@@ -226,31 +323,6 @@ def label_for(code):
     k = f"display_{ss['app_lang_key']}"
     return f"{data['flag']} {data.get(k, data['display_en'])}"
 
-def _clean_code_fence(text: str) -> str:
-    text = text.strip()
-    text = re.sub(r"^```[a-zA-Z0-9_-]*\s*", "", text)
-    text = re.sub(r"\s*```$", "", text)
-    return text.strip()
-
-def _extract_json_block(text: str):
-    cleaned = _clean_code_fence(text)
-    start = cleaned.find("{")
-    end = cleaned.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        return cleaned[start:end+1]
-    return None
-
-def _heuristic_split(raw: str) -> tuple[str, str]:
-    cleaned = _clean_code_fence(raw)
-    m_k = re.search(r'"?korean"?\s*:\s*"?(.*?)"?\s*(?:,|\n|$)', cleaned, flags=re.S|re.I)
-    m_t = re.search(r'"?(translation|filipino|english)"?\s*:\s*"?(.*?)"?\s*(?:,|\n|$)', cleaned, flags=re.S|re.I)
-    if m_k and m_t:
-        return (m_k.group(1).strip(), m_t.group(2).strip())
-    m1 = re.search(r"원본\(한국어\)\s*:?\s*(.+?)\n+\s*번역\(.+?\)\s*:\s*(.+)$", cleaned, flags=re.S)
-    if m1:
-        return (m1.group(1).strip(), m1.group(2).strip())
-    return (cleaned.strip(), "")
-
 def components_copy_button(uid: str, text: str, label: str):
     import streamlit.components.v1 as components
     html = f"""
@@ -270,148 +342,359 @@ def components_copy_button(uid: str, text: str, label: str):
     """
     components.html(html, height=36)
 
-def export_docx(korean_text, target_text) -> bytes:
-    doc = Document()
-    doc.styles['Normal'].font.name = 'Calibri'
-    doc.styles['Normal'].font.size = Pt(11)
-    doc.add_heading('ScanTranslate Export', level=1)
-    doc.add_paragraph(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    doc.add_heading(ui_text("original"), level=2)
-    doc.add_paragraph(korean_text or "")
-    doc.add_heading(ui_text("translation"), level=2)
-    doc.add_paragraph(target_text or "")
-    bio = io.BytesIO()
-    doc.save(bio)
-    return bio.getvalue()
-
-def export_csv(korean_text, target_text) -> bytes:
-    df = pd.DataFrame([{"original": korean_text, "translation": target_text}])
-    return df.to_csv(index=False).encode("utf-8-sig")
-
-def sentences_of(text):
-    chunks = re.split(r'(?<=[.!?])\s+', (text or "").strip())
-    return [s for s in chunks if s]
-
-def _hash_bytes(b: bytes) -> str:
-    return hashlib.sha256(b).hexdigest()
+def export_labels() -> dict:
+    """Localized headings for DOCX exports."""
+    return {k: ui_text(k) for k in ("original", "translation", "pages", "ocr_confidence")}
+
+def lazy_export(fmt: str, rows, labels: dict | None = None):
+    """
+    `st.download_button` data that is built only on click (on Streamlit's own
+    thread, not the script run) and cached by content, so reruns don't pay for
+    exports. `rows` is a list of result rows or a function returning one.
+    """
+    return lambda: export_bytes(fmt, rows() if callable(rows) else rows, labels)
+
+# ─────────────────────────────────────────────────────────────
+# UPLOADS (hash once per upload, then pass digests around)
+# ─────────────────────────────────────────────────────────────
+def register_upload(uploaded) -> str:
+    """
+    Read + hash an UploadedFile once per upload (keyed by its file_id) and
+    return the digest. The bytes are put back if the registry has since
+    evicted (or swept) them, so the digest always resolves.
+    """
+    digests = ss.setdefault("upload_digests", {})
+    digest = digests.get(uploaded.file_id)
+    if digest is None or digest not in get_upload_registry():
+        digest = get_upload_registry().put(uploaded.getvalue())
+        digests[uploaded.file_id] = digest
+    return digest
 
 # ─────────────────────────────────────────────────────────────
 # NEW: Learn & Inquire helper  ✅
 # ─────────────────────────────────────────────────────────────
-def generate_inquiry_response(client, question: str, context, focus_text: str = "", model: str = "gemini-2.0-flash") -> str:
+def tutor_session(context):
+    """This browser session's tutor for the current document (a new one when the context changes)."""
+    from scantranslate.tutor import TutorSession, context_hash
+
+    session = ss.get("tutor_session")
+    if session is None or session.context_hash != context_hash(context):
+        session = ss["tutor_session"] = TutorSession(context)
+    return session
+
+
+def chat_turns(context) -> list:
+    """This session's Q&A about `context`; starts over when the document (or its saved text) changes."""
+    from scantranslate.tutor import context_hash
+
+    key = context_hash(context)
+    if ss.get("chat_context") != key:
+        ss["chat_context"], ss["chat_history"] = key, []
+    return ss["chat_history"]
+
+
+def generate_inquiry_response(client, question: str, context, focus_text: str = "") -> str:
+    """The answer, or a message explaining why there is none (then `ss["tutor_failed"]` is set)."""
+    ss["tutor_failed"] = True
     if not question or not question.strip():
         return "질문을 입력해주세요. (예: 이 문장의 의미를 쉽게 설명해 주세요.)"
 
-    # Build a readable context block even if a dict is passed
-    if isinstance(context, dict):
-        context_block = (
-            f"[Korean]\n{context.get('korean','')}\n\n"
-            f"[Translation]\n{context.get('target','')}\n\n"
-            f"[Target language]\n{context.get('lang','')}"
-        )
-    else:
-        context_block = str(context or "")
-
-    prompt = "\n".join([
-        "You are a precise bilingual explainer. Answer briefly but clearly.",
-        "",
-        "=== Focused Text ===",
-        (focus_text or "[None selected]"),
-        "",
-        "=== Full Context ===",
-        context_block,
-        "",
-        "=== User Question ===",
-        question.strip()
-    ])
-
     if client is None:
         return "Gemini 클라이언트가 초기화되지 않았습니다. GEMINI_API_KEY를 확인하세요."
+    from google.genai.errors import APIError
 
     try:
-        resp = client.models.generate_content(
-            model=model,
-            contents=prompt,
-        )
-        return (resp.text or "").strip() or "No answer generated."
+        # Earlier turns go along (compacted). A document of TUTOR_CACHE_MIN_TOKENS or more is sent
+        # once, as a context cache; a shorter one goes with every question as the system instruction
+        session = tutor_session(context)
+        answer = session.ask(client, question, focus_text, history=chat_turns(context))
     except APIError as e:
         return f"AI error: {e}"
     except Exception as e:
         return f"Unexpected error while asking AI: {e}"
+    if not answer:
+        return "No answer generated."
+    ss["tutor_failed"] = False
+    return answer
+
+
+def stream_inquiry_response(client, question: str, context, focus_text: str = ""):
+    """Same as generate_inquiry_response, but yields the answer as it is generated (for st.write_stream)."""
+    ss["tutor_failed"] = True
+    if client is None:
+        yield "Gemini 클라이언트가 초기화되지 않았습니다. GEMINI_API_KEY를 확인하세요."
+        return
+    from google.genai.errors import APIError
+
+    produced = False
+    try:
+        session = tutor_session(context)
+        for text in session.ask_stream(client, question, focus_text, history=chat_turns(context)):
+            if text:
+                produced = True
+                yield text
+    except APIError as e:
+        yield f"\n\nAI error: {e}"
+        return
+    except Exception as e:
+        yield f"\n\nUnexpected error while asking AI: {e}"
+        return
+    if not produced:
+        yield "No answer generated."
+        return
+    ss["tutor_failed"] = False
 
 
 # ─────────────────────────────────────────────────────────────
-# CACHED: OCR + Translation  (keyed by image bytes hash + target)
+# HISTORY (persistent, searchable; paged from SQLite)
 # ─────────────────────────────────────────────────────────────
-@st.cache_data(show_spinner=False)
-def ocr_translate_cached(image_bytes: bytes, mime_type: str, target_lang_name: str, app_lang_key: str):
-    """Cache the full OCR+translation result by content + language."""
-    if not client:
-        return TEXTS[app_lang_key]['error_api_key'], "", None
-
-    image_part = Part.from_bytes(data=image_bytes, mime_type=mime_type)
-    prompt = (
-        "Perform OCR on the image (Korean expected) and translate to "
-        f"{target_lang_name}. Return STRICT JSON ONLY with keys: "
-        '{"korean":"...", "translation":"...", "confidence": 0-100}. '
-        "Do not add markdown/code fences. Preserve line breaks in 'korean'."
-    )
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=[prompt, image_part],
+def history_owner() -> str:
+    """History is per user when Streamlit auth is configured; otherwise every visitor shares it."""
+    return (st.user.get("email") or "") if st.user.get("is_logged_in") else ""
+
+def _history_page(delta: int):
+    ss["history_offset"] = max(ss.get("history_offset", 0) + delta * HISTORY_PAGE_SIZE, 0)
+
+def _history_reset():
+    ss["history_offset"] = 0
+
+def open_history_entry(entry_id: int) -> None:
+    """Reopen a past result in the editor: a local lookup, no API call."""
+    entry = get_history_store().get(entry_id, owner=history_owner())
+    if entry is not None:
+        load_into_editor(entry["korean"], entry["target"], entry["lang"], entry["confidence"],
+                         entry["page_results"], entry["id"])
+
+@st.fragment
+def history_panel():
+    """
+    Search box, language filter and one page of entries. Searching and paging
+    rerun only this fragment; only previews are read until an entry is opened.
+    """
+    lang_codes = [None] + [TARGET_LANGUAGES[k]["code"] for k in TARGET_LANGUAGES]
+    fc1, fc2 = st.columns([3, 1])
+    with fc1:
+        query = st.text_input(ui_text("history_search"), key="history_query", on_change=_history_reset)
+    with fc2:
+        lang = st.selectbox(
+            "lang", lang_codes, key="history_lang", on_change=_history_reset, label_visibility="hidden",
+            format_func=lambda code: ui_text("history_all_langs") if code is None else code,
         )
-        raw = (response.text or "").strip()
+    offset = ss.setdefault("history_offset", 0)
+    entries, total = get_history_store().page(query, lang, HISTORY_PAGE_SIZE, offset, owner=history_owner())
+    if not entries and offset:  # the last page emptied (e.g. a narrower search)
+        ss["history_offset"] = offset = 0
+        entries, total = get_history_store().page(query, lang, HISTORY_PAGE_SIZE, 0, owner=history_owner())
+    if not entries:
+        st.write(ui_text("history_no_match") if query or lang else ui_text("history_text"))
+        return
+    for entry in entries:
+        when = datetime.fromtimestamp(entry["updated_at"]).strftime("%Y-%m-%d %H:%M")
+        name = f" · {entry['file']}" if entry["file"] else ""
+        label = f"{ui_text('history_item_prefix')} {when}{name}: Korean → {entry['lang_flag']} {entry['lang']}"
+        with st.expander(label, expanded=entry["id"] == ss.get("history_id")):
+            if entry.get("confidence") is not None:
+                st.caption(f"{ui_text('ocr_confidence')}: {entry['confidence']}%")
+            st.caption(ui_text("original"))
+            st.code(entry["korean_preview"])
+            st.caption(ui_text("translation"))
+            st.code(entry["target_preview"])
+            if st.button(ui_text("history_open"), key=f"history_open_{entry['id']}"):
+                open_history_entry(entry["id"])
+                st.rerun()  # the editor lives outside this fragment
+    pc1, pc2, pc3 = st.columns([1, 2, 1])
+    with pc1:
+        st.button("◀", key="history_prev", disabled=offset == 0, on_click=_history_page, args=(-1,),
+                  use_container_width=True)
+    with pc2:
+        st.caption(ui_text("history_range").format(first=offset + 1, last=offset + len(entries), total=total))
+    with pc3:
+        st.button("▶", key="history_next", disabled=offset + len(entries) >= total, on_click=_history_page,
+                  args=(1,), use_container_width=True)
+
+# ─────────────────────────────────────────────────────────────
+# OCR + Translation errors (the pipeline raises; nothing failed is ever cached)
+# ─────────────────────────────────────────────────────────────
+def gemini_error_text(e: Exception) -> str:
+    """Localized message for a failed OCR/translation call."""
+    from google.genai.errors import APIError
+    from scantranslate import GeminiUnavailable
 
-        json_block = _extract_json_block(raw)
-        korean_result, target_result, conf = "", "", None
+    if isinstance(e, GeminiUnavailable):
+        return ui_text("error_api_key")
+    if isinstance(e, APIError):
+        return f"{ui_text('error_api')} {e}"
+    return f"{ui_text('error_ocr_fail')} 오류: {e}"
 
-        if json_block:
-            try:
-                data = json.loads(json_block)
-                korean_result = (data.get("korean") or "").strip()
-                target_result = (data.get("translation") or "").strip()
-                conf_val = data.get("confidence", None)
-                try:
-                    conf = int(round(float(conf_val))) if conf_val is not None else None
-                except Exception:
-                    conf = None
-            except Exception:
-                korean_result, target_result = _heuristic_split(raw)
-                conf = None
-        else:
-            korean_result, target_result = _heuristic_split(raw)
-            conf = None
+def apply_document_result(result: dict, active: dict) -> None:
+    """Move a finished document job into the editor, tutor context and history."""
+    from scantranslate import merge_page_results
 
-        # Keep boxes separate
-        if not target_result:
-            target_result = ""
-        if not korean_result:
-            korean_result = ""
+    lang_key = active["lang_key"]
+    korean_result, target_result, conf = result["korean"], result["target"], result["confidence"]
+    page_results = result["page_results"]
+    if page_results:
+        failed = [str(r["page"]) for r in page_results if r["error"]]
+        if failed:
+            ss["job_notice"] = ui_text("page_failed").format(pages=", ".join(failed))
+        if len(failed) < len(page_results):
+            korean_result, target_result, conf = merge_page_results(page_results, ui_text("pages"))
+    if korean_result is None:
+        return
+    target_lang_name = TARGET_LANGUAGES[lang_key]["code"]
+    changes = None
+    if page_results and active.get("file"):
+        # A re-upload of a revised file: compare page by page with its previous version
+        from scantranslate import page_changes
+        previous = get_history_store().previous_version(
+            active["file"], target_lang_name, active.get("digest", ""), owner=history_owner()
+        )
+        if previous:
+            changes = page_changes(previous["page_results"], page_results)
+    # Persisted under the job's content key: a re-run of the same document refreshes its entry
+    store = get_history_store()
+    history_id = store.add(
+        active["key"], korean_result or "", target_result or "", target_lang_name,
+        lang_flag=TARGET_LANGUAGES[lang_key]["flag"], confidence=conf, page_results=page_results,
+        file=active.get("file", ""), owner=history_owner(), digest=active.get("digest", ""),
+    )
+    entry = store.get(history_id, owner=history_owner())
+    if entry and entry["edited"]:
+        # Corrected and saved before: reopen the user's text, not the fresh model output
+        korean_result, target_result, page_results = entry["korean"], entry["target"], entry["page_results"]
+    load_into_editor(korean_result, target_result, target_lang_name, conf, page_results, history_id)
+    ss["page_changes"] = changes
 
-        return korean_result, target_result, conf
+def load_into_editor(korean: str, target: str, lang: str, conf, page_results: list, history_id) -> None:
+    """Editor text, tutor context and export inputs for one result (new or reopened from history)."""
+    # Save strictly separated content
+    ss["edited_korean"] = korean or ""
+    ss["edited_target"] = target or ""
+    ss["ocr_confidence"] = conf
+    ss["page_results"] = page_results
+    ss["history_id"] = history_id
+    ss["page_changes"] = None
+    ss["translation_context"] = {
+        "korean": ss["edited_korean"],
+        "target": ss["edited_target"],
+        "lang": lang
+    }
 
-    except APIError as e:
-        return f"{TEXTS[app_lang_key]['error_api']} {e}", "", None
-    except Exception as e:
-        return f"{TEXTS[app_lang_key]['error_ocr_fail']} 오류: {e}", "", None
+def page_changes_panel(changes: dict, page_results: list) -> None:
+    """What a revised upload changed relative to its previous version, one diff per changed page."""
+    reused = sum(1 for r in page_results if r.get("reused"))
+    with st.container(border=True):
+        st.markdown(f"#### {ui_text('changes_header')}")
+        st.caption(ui_text("changes_summary").format(
+            changed=len(changes["changed"]), total=changes["unchanged"] + len(changes["changed"]), reused=reused,
+            removed=len(changes["removed"]),
+        ))
+        if not changes["changed"]:
+            st.write(ui_text("changes_none"))
+        for change in changes["changed"]:
+            label = ui_text("changes_page").format(page=change["page"])
+            if change["previous_page"] is None:
+                label += f" · {ui_text('changes_added')}"
+            with st.expander(label):
+                st.code(change["korean_diff"] or ui_text("changes_same_text"), language="diff")
+                st.code(change["target_diff"] or ui_text("changes_same_text"), language="diff")
+
+@st.fragment(run_every=JOB_POLL_S)
+def job_status_panel():
+    """
+    Polls this session's background job without rerunning the whole page.
+    Streamed text and page progress (or a batch's status table) are shown while
+    it runs; once it ends the result (or error) is applied and the full page
+    reruns to show it.
+    """
+    active = ss["active_job"]
+    job = get_job_registry().get(active["key"])
+    if job is not None and not job.finished and active["kind"] == "batch":
+        rows = job.snapshot().get("rows") or []
+        done, total = job.progress or (0, 1)
+        files_done = sum(1 for r in rows if r["status"] not in ("queued", "running"))
+        st.progress(done / total, text=ui_text("batch_progress").format(done=files_done, total=len(rows)))
+        st.dataframe(batch_status_table(rows), use_container_width=True, hide_index=True)
+        return
+    if job is not None and not job.finished:
+        target_lang_name = TARGET_LANGUAGES[active["lang_key"]]["code"]
+        if job.progress:
+            done, total = job.progress
+            st.progress(done / total, text=ui_text("page_progress").format(done=done, total=total))
+        else:
+            st.caption("⏳ " + ui_text("spinner").format(target_lang_name=target_lang_name))
+        partial = job.snapshot()
+        if partial.get("korean"):
+            st.caption(ui_text("original"))
+            st.markdown(partial["korean"])
+        if partial.get("target"):
+            st.caption(ui_text("translation"))
+            st.markdown(partial["target"])
+        return
+    ss["active_job"] = None
+    if job is not None and job.error is not None:
+        # Shown, but never written to the editor, history or any cache
+        ss["job_error"] = gemini_error_text(job.error)
+    elif job is not None and active["kind"] == "batch":
+        ss["batch_rows"] = job.result.rows()
+        ss["batch_results"] = job.result.results()
+    elif job is not None:
+        apply_document_result(job.result, active)
+    st.rerun()
 
 # ─────────────────────────────────────────────────────────────
-# CACHED: Render a single PDF page thumbnail (lazy)
+# PDF page count (cached) + paginated thumbnail strip
 # ─────────────────────────────────────────────────────────────
-@st.cache_data(show_spinner=False)
-def render_pdf_page_thumb(pdf_bytes: bytes, page_index: int, scale: float = 1.2) -> bytes:
+@st.cache_data(show_spinner=False, max_entries=256, ttl=3600)
+def pdf_page_count(pdf_digest: str) -> int:
+    from scantranslate import get_pdf_documents
+    return get_pdf_documents().page_count(pdf_digest)
+
+THUMBS_PER_ROW = 6
+
+def _page_thumbs(delta: int, windows: int):
+    ss["thumb_window"] = min(max(ss["thumb_window"] + delta, 0), windows - 1)
+
+@st.fragment
+def pdf_thumbnail_strip(pdf_digest: str, page_count: int):
     """
-    Render one page as PNG bytes (lighter scale keeps it fast).
-    Cached by (pdf hash + page index + scale).
+    One window of small page previews with ◀ / ▶ paging. Paging reruns only
+    this fragment; previews come from the shared thumbnail cache and the next
+    window is rendered in the background while this one is looked at.
     """
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    p = doc.load_page(page_index)
-    pix = p.get_pixmap(matrix=fitz.Matrix(scale, scale))
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-    bio = io.BytesIO()
-    img.save(bio, format="PNG")
-    return bio.getvalue()
+    if ss.get("thumb_digest") != pdf_digest:
+        ss["thumb_digest"], ss["thumb_window"] = pdf_digest, 0
+    windows = -(-page_count // THUMB_WINDOW)
+    first = ss["thumb_window"] * THUMB_WINDOW
+    last = min(first + THUMB_WINDOW, page_count)
+
+    if windows > 1:
+        pc, lc, nc = st.columns([1, 4, 1])
+        pc.button("◀", key="thumbs_prev", disabled=first == 0, on_click=_page_thumbs, args=(-1, windows),
+                  use_container_width=True)
+        lc.markdown(f"<div class='center'>{ui_text('pages')} {first + 1}–{last} / {page_count}</div>",
+                    unsafe_allow_html=True)
+        nc.button("▶", key="thumbs_next", disabled=last >= page_count, on_click=_page_thumbs, args=(1, windows),
+                  use_container_width=True)
+
+    from scantranslate import get_thumbnails
+    thumbs = get_thumbnails()
+    for row_start in range(first, last, THUMBS_PER_ROW):
+        cols = st.columns(THUMBS_PER_ROW)
+        for col, i in zip(cols, range(row_start, min(row_start + THUMBS_PER_ROW, last))):
+            with col:
+                st.image(thumbs.get(pdf_digest, i), caption=f"{ui_text('pages')} {i+1}")
+    thumbs.prefetch(pdf_digest, range(last, min(last + THUMB_WINDOW, page_count)))
+
+def batch_status_table(rows: list[dict]) -> list[dict]:
+    """Localized column names / status labels for the live status table."""
+    return [
+        {ui_text("batch_file"): r["file"],
+         ui_text("batch_status"): ui_text(f"status_{r['status']}"),
+         ui_text("pages"): r["pages"],
+         ui_text("ocr_confidence"): r["confidence"]}
+        for r in rows
+    ]
 
 # ─────────────────────────────────────────────────────────────
 # HEADER
@@ -454,7 +737,10 @@ with left:
                 f"<br><small>{ui_text('file_uploader_hint')}</small></div>",
                 unsafe_allow_html=True
             )
-            uploaded = st.file_uploader("upload", type=["jpg","jpeg","png","pdf"], label_visibility="collapsed")
+            uploaded_files = st.file_uploader(
+                "upload", type=["jpg","jpeg","png","pdf","zip"],
+                accept_multiple_files=True, label_visibility="collapsed"
+            ) or []
 
             lc, bc = st.columns([1.5,2])
             with lc:
@@ -471,91 +757,146 @@ with left:
 
         ss["target_lang_key"] = chosen_tgt
 
+    # One plain file → the interactive single-document flow; several files or a ZIP → batch queue
+    is_batch = len(uploaded_files) > 1 or any(f.name.lower().endswith(".zip") for f in uploaded_files)
+    uploaded = uploaded_files[0] if uploaded_files and not is_batch else None
+
     # ...existing code...
     # PDF controls
-    selected_image_bytes, selected_mime = None, None
-    pdf_bytes = None
+    pdf_digest = None
+    pdf_page_indices = None  # set for multi-page runs (all pages / range)
     if uploaded is not None and uploaded.type == "application/pdf":
         st.info(ui_text("pdf_supported"))
-        pdf_bytes = uploaded.read()
-        # quick page count (open once)
-        _doc_tmp = fitz.open(stream=pdf_bytes, filetype="pdf")
-        page_count = _doc_tmp.page_count
-
-        # Thumbnails (lazy render): show up to 6 thumbs
-        show_n = min(6, page_count)
-        cols = st.columns(show_n) if show_n else []
-        for i in range(show_n):
-            thumb_png = render_pdf_page_thumb(pdf_bytes, i, 1.0)  # lighter & cached
-            with cols[i]:
-                st.image(thumb_png, caption=f"{ui_text('pages')} {i+1}", use_column_width=True)
-
-        # Picker
-        ss["pdf_page_index"] = st.slider(
-            f"{ui_text('pages')}",
-            1,
-            page_count,
-            ss.get("pdf_page_index", 0) + 1
-        ) - 1
-
-        # Render the selected page to feed OCR (cached)
-        selected_image_bytes = render_pdf_page_thumb(pdf_bytes, ss["pdf_page_index"], 1.4)
-        selected_mime = "image/png"
+        pdf_digest = register_upload(uploaded)  # hashed once per upload
+        page_count = pdf_page_count(pdf_digest)
+
+    # Close the parsed handle of a PDF this session has moved away from
+    if ss.get("open_pdf_digest") not in (None, pdf_digest):
+        from scantranslate import get_pdf_documents
+        get_pdf_documents().close(ss["open_pdf_digest"])
+    ss["open_pdf_digest"] = pdf_digest
+
+    if pdf_digest is not None:
+        # Thumbnails: the visible window only, small JPEG/WebP previews
+        pdf_thumbnail_strip(pdf_digest, page_count)
+
+        # Scope: selected page / all pages / page range
+        page_modes = ["single", "all", "range"] if page_count > 1 else ["single"]
+        if ss["pdf_page_mode"] not in page_modes:
+            ss["pdf_page_mode"] = "single"
+        ss["pdf_page_mode"] = st.radio(
+            ui_text("page_mode"),
+            page_modes,
+            format_func=lambda m: ui_text(f"page_mode_{m}"),
+            index=page_modes.index(ss["pdf_page_mode"]),
+            horizontal=True,
+        )
+
+        if ss["pdf_page_mode"] == "all":
+            pdf_page_indices = list(range(page_count))
+        elif ss["pdf_page_mode"] == "range":
+            first, last = st.slider(f"{ui_text('pages')}", 1, page_count, (1, page_count))
+            pdf_page_indices = list(range(first - 1, last))
+        elif page_count == 1:
+            ss["pdf_page_index"] = 0  # nothing to pick (a slider needs min < max)
+        else:
+            # Picker
+            ss["pdf_page_index"] = st.slider(
+                f"{ui_text('pages')}",
+                1,
+                page_count,
+                min(ss.get("pdf_page_index", 0), page_count - 1) + 1
+            ) - 1
 # ...existing code...
-    # PROCESS (only when form submitted)
+    # PROCESS (only when form submitted): runs as a background job, polled below
     if uploaded is not None and 'submitted' in locals() and submitted:
-        with st.container(border=True):
+        if uploaded.type not in ("application/pdf", "image/jpeg", "image/png", "image/jpg"):
+            st.error("Unsupported file.")
+        else:
             try:
-                if uploaded.type in ["image/jpeg","image/png","image/jpg"]:
-                    image = Image.open(uploaded)
-                    img_bio = io.BytesIO()
-                    fmt = uploaded.type.split('/')[-1]
-                    image.save(img_bio, format=fmt)
-                    image_bytes = img_bio.getvalue()
-                    mime = uploaded.type
-                elif uploaded.type == "application/pdf":
-                    image_bytes = selected_image_bytes
-                    mime = selected_mime
-                else:
-                    st.error("Unsupported file.")
-                    image_bytes, mime = None, None
-
-                if image_bytes:
-                    spinner_text = ui_text("spinner").format(
-                        target_lang_name=TARGET_LANGUAGES[ss['target_lang_key']]['code']
-                    )
-                    with st.spinner(spinner_text):
-                        # cache by content hash + target
-                        key_hash = _hash_bytes(image_bytes)
-                        korean_result, target_result, conf = ocr_translate_cached(
-                            image_bytes=image_bytes,
-                            mime_type=mime,
-                            target_lang_name=TARGET_LANGUAGES[ss['target_lang_key']]['code'],
-                            app_lang_key=ss["app_lang_key"],
-                        )
-
-                    # Save strictly separated content
-                    ss["edited_korean"] = korean_result or ""
-                    ss["edited_target"] = target_result or ""
-                    ss["ocr_confidence"] = conf
-                    ss["translation_context"] = {
-                        "korean": ss["edited_korean"],
-                        "target": ss["edited_target"],
-                        "lang": TARGET_LANGUAGES[ss['target_lang_key']]["code"]
-                    }
-                    new_hist = {
-                        "korean": ss["edited_korean"],
-                        "target": ss["edited_target"],
-                        "lang_name": TARGET_LANGUAGES[ss['target_lang_key']]["code"],
-                        "lang_flag": TARGET_LANGUAGES[ss['target_lang_key']]["flag"],
-                        "confidence": conf
-                    }
-                    ss["history_list"].insert(0, new_hist)
-                    ss["history_list"] = ss["history_list"][:5]
-
+                from scantranslate import process_document
+                target_lang_name = TARGET_LANGUAGES[ss['target_lang_key']]['code']
+                upload_digest = register_upload(uploaded)
+                is_pdf = uploaded.type == "application/pdf"
+                page_index = ss["pdf_page_index"] if is_pdf else 0
+                page_indices = pdf_page_indices if is_pdf else None
+                # Same upload + scope + language → same job, for any session (single-flight)
+                key = job_key("document", upload_digest, uploaded.type, page_indices or page_index, target_lang_name)
+                get_job_registry().submit(
+                    key, "document", process_document, get_client(), upload_digest, uploaded.type, target_lang_name,
+                    page_index=page_index, page_indices=page_indices, stream=STREAM_RESPONSES,
+                )
+                ss["active_job"] = {
+                    "key": key, "kind": "document", "lang_key": ss["target_lang_key"],
+                    "file": uploaded.name, "digest": upload_digest,
+                }
             except Exception as e:
                 st.error(f"{ui_text('error_file_proc')} {e}")
 
+    if ss.get("active_job") and ss["active_job"]["kind"] == "document":
+        with st.container(border=True):
+            job_status_panel()
+    if ss.get("job_error"):
+        st.error(ss.pop("job_error"))
+    if ss.get("job_notice"):
+        st.warning(ss.pop("job_notice"))
+    if ss.get("page_changes"):
+        page_changes_panel(ss["page_changes"], ss.get("page_results") or [])
+
+    # BATCH (multi-file / ZIP): the whole queue is one background job, polled like a document
+    batch_notices = []
+    if is_batch and submitted:
+        ss["batch_rows"], ss["batch_results"] = [], []
+        try:
+            from scantranslate import BatchJobQueue
+            queue = BatchJobQueue()
+            for f in uploaded_files:
+                for name, data, mime in iter_upload_entries(f.name, f.getvalue(), f.type):
+                    queue.add(name, data, mime)
+            if not queue.jobs:
+                batch_notices.append((st.warning, ui_text("batch_empty")))
+            else:
+                if queue.duplicates:
+                    batch_notices.append((st.info, ui_text("batch_duplicates").format(n=queue.duplicates)))
+                target_lang_name = TARGET_LANGUAGES[ss['target_lang_key']]['code']
+                # Same files (names included: they label the results) + language → same job, for any session
+                key = job_key("batch", [(j["files"], digest) for digest, j in queue.jobs.items()], target_lang_name)
+                get_job_registry().submit(key, "batch", queue.run, get_client(), target_lang_name)
+                ss["active_job"] = {"key": key, "kind": "batch", "lang_key": ss["target_lang_key"]}
+        except Exception as e:
+            st.error(f"{ui_text('error_file_proc')} {e}")
+
+    batch_running = bool(ss.get("active_job")) and ss["active_job"]["kind"] == "batch"
+    if batch_running or batch_notices or ss.get("batch_results"):
+        with st.container(border=True):
+            st.markdown(f"### {ui_text('batch_header')}")
+            for show, text in batch_notices:
+                show(text)
+            if batch_running:
+                job_status_panel()
+            elif ss.get("batch_results"):
+                st.dataframe(batch_status_table(ss["batch_rows"]), use_container_width=True, hide_index=True)
+
+    if ss.get("batch_results"):
+        batch_rows = ss["batch_results"]
+        bc1, bc2 = st.columns(2)
+        with bc1:
+            st.download_button(
+                ui_text("export_batch_csv"),
+                data=lazy_export("csv", batch_rows),
+                file_name=f"scantranslate_batch_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+        with bc2:
+            st.download_button(
+                ui_text("export_batch_docx"),
+                data=lazy_export("batch_docx", batch_rows, export_labels()),
+                file_name=f"scantranslate_batch_{datetime.now().strftime('%Y%m%d_%H%M')}.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                use_container_width=True
+            )
+
     # Side-by-side editor + copy + export
     if ss.get("edited_korean") or ss.get("edited_target"):
         st.markdown("### ✍️ Side-by-Side Editor")
@@ -571,22 +912,35 @@ with left:
             ss["edited_target"] = st.text_area("tgt", ss["edited_target"], height=220, label_visibility="collapsed")
             components_copy_button("target", ss["edited_target"], ui_text("copy"))
 
+        # Exports are built only when a button is clicked; their inputs are captured now
+        korean_now, target_now = ss["edited_korean"], ss["edited_target"]
+        page_results_now, conf_now, page_label = ss["page_results"], ss["ocr_confidence"], ui_text("pages")
+
+        def editor_rows():
+            return document_rows(korean_now, target_now, page_results_now, page_label, conf_now)
+
         sc, ec1, ec2, ec3 = st.columns([1,1,1,1])
         with sc:
             if st.button(ui_text("save_edits"), use_container_width=True):
-                if ss["history_list"]:
-                    ss["history_list"][0]["korean"] = ss["edited_korean"]
-                    ss["history_list"][0]["target"] = ss["edited_target"]
+                # The editor's language: a reopened history entry may differ from the current selection
+                edit_lang = (ss["translation_context"] or {}).get("lang") or TARGET_LANGUAGES[ss['target_lang_key']]["code"]
+                if ss["history_id"] is not None:
+                    get_history_store().update(
+                        ss["history_id"], ss["edited_korean"], ss["edited_target"], owner=history_owner()
+                    )
+                # Corrected sentences are reused for later documents
+                from scantranslate import remember_edits
+                remember_edits(ss["edited_korean"], ss["edited_target"], edit_lang)
                 ss["translation_context"] = {
                     "korean": ss["edited_korean"],
                     "target": ss["edited_target"],
-                    "lang": TARGET_LANGUAGES[ss['target_lang_key']]["code"]
+                    "lang": edit_lang
                 }
                 st.success(ui_text("saved"))
         with ec1:
             st.download_button(
                 ui_text("export_txt"),
-                data=(ss["edited_korean"]+"\n\n---\n\n"+ss["edited_target"]).encode("utf-8"),
+                data=lambda: export_txt(korean_now, target_now),
                 file_name=f"scantranslate_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
                 mime="text/plain",
                 use_container_width=True
@@ -594,7 +948,7 @@ with left:
         with ec2:
             st.download_button(
                 ui_text("export_docx"),
-                data=export_docx(ss["edited_korean"], ss["edited_target"]),
+                data=lazy_export("docx", editor_rows, export_labels()),
                 file_name=f"scantranslate_{datetime.now().strftime('%Y%m%d_%H%M')}.docx",
                 mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                 use_container_width=True
@@ -602,7 +956,7 @@ with left:
         with ec3:
             st.download_button(
                 ui_text("export_csv"),
-                data=export_csv(ss["edited_korean"], ss["edited_target"]),
+                data=lazy_export("csv", editor_rows),
                 file_name=f"scantranslate_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
                 mime="text/csv",
                 use_container_width=True
@@ -636,17 +990,23 @@ with right:
                 if not question:
                     st.warning("질문을 입력해주세요. 예: '이 문장의 의미를 쉽게 설명해 줘.'")
                 else:
-                    with st.spinner("..."):
-                        # ✅ Correct signature (client first) and ctx can be dict
-                        answer = generate_inquiry_response(client, question, ctx, focus_text=focus_text)
-                    ss["chat_history"].append(("user", question))
-                    ss["chat_history"].append(("model", answer))
                     st.markdown(f"**👤 User:** *{question}*")
-                    st.markdown(f"**🤖 AI Tutor:** {answer}")
+                    if STREAM_RESPONSES:
+                        st.markdown("**🤖 AI Tutor:**")
+                        answer = st.write_stream(stream_inquiry_response(get_client(), question, ctx, focus_text=focus_text))
+                        answer = (answer if isinstance(answer, str) else "".join(map(str, answer))).strip()
+                    else:
+                        with st.spinner("..."):
+                            # ✅ Correct signature (client first) and ctx can be dict
+                            answer = generate_inquiry_response(get_client(), question, ctx, focus_text=focus_text)
+                        st.markdown(f"**🤖 AI Tutor:** {answer}")
+                    if not ss.get("tutor_failed"):  # errors are shown, not sent back as model turns
+                        chat_turns(ctx).extend([("user", question), ("model", answer)])
 
-            if ss["chat_history"]:
+            turns = chat_turns(ctx)
+            if turns:
                 st.markdown("---")
-                for role, text in ss["chat_history"]:
+                for role, text in turns:
                     if role == "user":
                         st.markdown(f"**👤 User:** *{text}*")
                     else:
@@ -659,15 +1019,28 @@ with right:
     # History
     with st.container(border=True):
         st.subheader(f"◷ {ui_text('history_header')}")
-        if ss["history_list"]:
-            for i, entry in enumerate(ss["history_list"]):
-                label = f"{ui_text('history_item_prefix')} #{i+1}: Korean → {entry['lang_flag']} {entry['lang_name']}"
-                with st.expander(label):
-                    if entry.get("confidence") is not None:
-                        st.caption(f"{ui_text('ocr_confidence')}: {entry['confidence']}%")
-                    st.caption(ui_text("original"))
-                    st.code(entry["korean"])
-                    st.caption(ui_text("translation"))
-                    st.code(entry["target"])
-        else:
-            st.write(ui_text("history_text"))
+        history_panel()
+
+# ─────────────────────────────────────────────────────────────
+# ADMIN PANEL (SCANTRANSLATE_ADMIN=1; drawn last so it includes this run)
+# ─────────────────────────────────────────────────────────────
+if ADMIN_PANEL:
+    with st.sidebar:
+        st.subheader("📈 Metrics")
+        st.caption("Stage timings (recent window)")
+        st.dataframe(get_metrics().stage_summary(), hide_index=True, use_container_width=True)
+        st.caption("Model calls (latency / cost per model, incl. OCR cascade tiers)")
+        st.dataframe(get_metrics().model_summary(), hide_index=True, use_container_width=True)
+        st.caption("Gemini call budget")
+        from scantranslate import get_call_budget
+        st.json(get_call_budget().stats())
+        st.caption("Caches")
+        get_result_cache()  # registers itself with the cache manager
+        st.dataframe(
+            [{"cache": name, **stats} for name, stats in get_cache_manager().stats().items()],
+            hide_index=True, use_container_width=True,
+        )
+        st.caption("Translation memory")
+        st.json(get_translation_memory().stats())
+        with st.expander("Prometheus"):
+            st.code(render_prometheus(), language="text")
@@ -0,0 +1,92 @@
+"""
+Per-rerun PDF render cost: reopen-per-call vs. the PdfDocumentCache handle.
+
+Simulates what one Streamlit rerun does on a large PDF with cold render caches
+(page count + 6 thumbnails at 1.0 + the selected page at 1.4) and what a slider
+drag costs (page count + one new page at 1.4).
+
+    python benchmarks/bench_pdf_render.py --pages 150 --runs 5
+"""
+import argparse, json, os, statistics, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fitz  # noqa: E402
+from scantranslate.pdf import PdfDocumentCache, render_page_png  # noqa: E402
+from scantranslate.uploads import get_upload_registry  # noqa: E402
+
+
+def make_pdf(pages: int) -> bytes:
+    """A PDF with enough objects per page that xref parsing is not free."""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((40, 40 + line * 18), f"Page {i + 1} / line {line + 1} - 공지사항 안내문", fontsize=9)
+        page.draw_rect(fitz.Rect(30, 30, 560, 780), color=(0, 0, 0.6))
+    return doc.tobytes()
+
+
+def rerun_reopen(pdf_bytes: bytes, selected: int) -> None:
+    # The pre-handle-cache pattern: every call parses the PDF again
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    count = doc.page_count
+    for i in range(min(6, count)):
+        render_page_png(fitz.open(stream=pdf_bytes, filetype="pdf"), i, 1.0)
+    render_page_png(fitz.open(stream=pdf_bytes, filetype="pdf"), selected, 1.4)
+
+
+def rerun_handle(docs: PdfDocumentCache, digest: str, selected: int) -> None:
+    count = docs.page_count(digest)
+    with docs.document(digest) as doc:
+        for i in range(min(6, count)):
+            render_page_png(doc, i, 1.0)
+        render_page_png(doc, selected, 1.4)
+
+
+def drag_reopen(pdf_bytes: bytes, page: int) -> None:
+    fitz.open(stream=pdf_bytes, filetype="pdf").page_count
+    render_page_png(fitz.open(stream=pdf_bytes, filetype="pdf"), page, 1.4)
+
+
+def drag_handle(docs: PdfDocumentCache, digest: str, page: int) -> None:
+    docs.page_count(digest)
+    with docs.document(digest) as doc:
+        render_page_png(doc, page, 1.4)
+
+
+def timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pages", type=int, default=150)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    pdf_bytes = make_pdf(args.pages)
+    digest = get_upload_registry().put(pdf_bytes)
+    docs = PdfDocumentCache(max_docs=2)
+
+    results = {"pages": args.pages, "pdf_bytes": len(pdf_bytes), "runs": args.runs}
+    cases = {
+        "rerun_reopen_ms": [timed(rerun_reopen, pdf_bytes, r % args.pages) for r in range(args.runs)],
+        "rerun_handle_ms": [timed(rerun_handle, docs, digest, r % args.pages) for r in range(args.runs)],
+        "drag_reopen_ms": [timed(drag_reopen, pdf_bytes, (r * 7) % args.pages) for r in range(args.runs)],
+        "drag_handle_ms": [timed(drag_handle, docs, digest, (r * 7) % args.pages) for r in range(args.runs)],
+    }
+    docs.close()
+    for name, samples in cases.items():
+        results[name] = round(statistics.median(samples), 2)
+        print(f"{name:18s} median {results[name]:8.2f} ms  (min {min(samples):.2f}, max {max(samples):.2f})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Offline end-to-end benchmark: PDF rendering, OCR/translation pipeline, parsing and export.
+
+Gemini is replaced by benchmarks/fake_gemini.py (injected latency, canned
+Korean replies) behind the real rate limiter and retry wrapper, and caches live
+in a throwaway directory, so runs need no API key or network and start cold.
+The corpus is generated: scanned-style Korean PDFs of 1, 10 and 100 pages and
+a large phone-scan JPEG. Each corpus size runs in its own process so peak RSS
+is per case.
+
+    python benchmarks/bench_pipeline.py --sizes 1,10,100 --latency-ms 300 --json bench.json
+    python benchmarks/bench_pipeline.py --json new.json --compare bench.json
+"""
+import argparse, io, json, multiprocessing, os, platform, resource, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Lower is better unless listed here
+HIGHER_IS_BETTER = ("pages_per_s", "ops_per_s")
+
+
+def _pct(samples: list[float], q: float) -> float:
+    if len(samples) == 1:
+        return round(samples[0], 2)
+    return round(statistics.quantiles(samples, n=100, method="inclusive")[int(q) - 1], 2)
+
+
+def _summary(samples_ms: list[float]) -> dict:
+    return {"p50_ms": _pct(samples_ms, 50), "p95_ms": _pct(samples_ms, 95), "max_ms": round(max(samples_ms), 2)}
+
+
+# ─────────────────────────────────────────────────────────────
+# Corpus
+# ─────────────────────────────────────────────────────────────
+def make_scanned_pdf(pages: int, scale: float = 1.5) -> bytes:
+    """Korean notice pages rasterized and re-embedded as images, i.e. no text layer (the OCR path)."""
+    import fitz
+    from fake_gemini import KOREAN_LINES
+
+    out = fitz.open()
+    for i in range(pages):
+        src = fitz.open()
+        page = src.new_page()
+        page.insert_text((60, 70), f"공지 {i + 1}", fontname="korea", fontsize=18)
+        for line in range(30):
+            text = KOREAN_LINES[(i + line) % len(KOREAN_LINES)]
+            page.insert_text((60, 110 + line * 22), text, fontname="korea", fontsize=11)
+        png = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY).tobytes("png")
+        dst = out.new_page(width=page.rect.width, height=page.rect.height)
+        dst.insert_image(dst.rect, stream=png)
+    return out.tobytes(deflate=True)
+
+
+def make_phone_scan(width: int = 4000, height: int = 5600) -> bytes:
+    """An oversize JPEG, the kind of upload that gets downsampled before OCR."""
+    from PIL import Image
+    import fitz
+
+    src = fitz.open()
+    page = src.new_page()
+    page.insert_text((60, 70), "주민센터 공지사항입니다.\n다음 주 월요일부터 서류 접수가 시작됩니다.", fontname="korea", fontsize=14)
+    png = page.get_pixmap(matrix=fitz.Matrix(2, 2)).tobytes("png")
+    img = Image.open(io.BytesIO(png)).convert("RGB").resize((width, height))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=92)
+    return out.getvalue()
+
+
+# ─────────────────────────────────────────────────────────────
+# One corpus size (runs in a fresh process)
+# ─────────────────────────────────────────────────────────────
+def run_size(pages: int, args: dict) -> dict:
+    work = tempfile.mkdtemp(prefix="scantranslate-bench-")
+    os.environ.update({
+        "SCANTRANSLATE_CACHE_PATH": os.path.join(work, "results.sqlite3"),
+        "SCANTRANSLATE_TM_PATH": os.path.join(work, "tm.sqlite3"),
+        "SCANTRANSLATE_UPLOAD_DIR": os.path.join(work, "uploads"),
+        "SCANTRANSLATE_GEMINI_RPM": str(args["rpm"]),
+        "SCANTRANSLATE_GEMINI_BURST": str(max(1, int(args["rpm"]))),
+        "SCANTRANSLATE_PDF_WORKERS": str(args["workers"]),
+    })
+    from fake_gemini import FakeGemini
+    from scantranslate import export, pipeline
+    from scantranslate.gemini import GeminiClient, get_call_budget
+    from scantranslate.images import prepare_image_bytes
+    from scantranslate.metrics import get_metrics
+    from scantranslate.pdf import render_page_ref
+    from scantranslate.uploads import get_upload_registry
+
+    fake = FakeGemini(latency_ms=args["latency_ms"], jitter_ms=args["jitter_ms"])
+    client = GeminiClient(fake)
+    out = {"pages": pages}
+
+    t0 = time.perf_counter()
+    pdf_bytes = make_scanned_pdf(pages)
+    out["corpus"] = {"pdf_bytes": len(pdf_bytes), "build_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    digest = get_upload_registry().put(pdf_bytes)
+
+    # Render for OCR (what every scanned page costs before the model call)
+    samples = []
+    for i in range(pages):
+        t = time.perf_counter()
+        render_page_ref(digest, i, 1.4)
+        samples.append((time.perf_counter() - t) * 1000)
+    out["render"] = {"pages_per_s": round(pages / (sum(samples) / 1000), 2), **_summary(samples)}
+
+    # Full pipeline: cold caches, then warm (everything served from the result cache)
+    page_ms = []
+    real_page = pipeline.ocr_pdf_page
+
+    def timed_page(*a, **kw):
+        t = time.perf_counter()
+        try:
+            return real_page(*a, **kw)
+        finally:
+            page_ms.append((time.perf_counter() - t) * 1000)
+
+    pipeline.ocr_pdf_page = timed_page
+    for phase in ("pipeline_cold", "pipeline_warm"):
+        page_ms.clear()
+        calls_before = fake.calls
+        t = time.perf_counter()
+        results = pipeline.ocr_translate_pages(client, digest, range(pages), "Filipino (Tagalog)")
+        wall = time.perf_counter() - t
+        out[phase] = {
+            "wall_ms": round(wall * 1000, 1),
+            "pages_per_s": round(pages / wall, 2),
+            "model_calls": fake.calls - calls_before,
+            "failed_pages": sum(1 for r in results if r["error"]),
+            **_summary(page_ms),
+        }
+    pipeline.ocr_pdf_page = real_page
+    out["stages"] = get_metrics().stage_summary()
+    out["models"] = get_metrics().model_summary()  # OCR cascade: calls per tier
+    out["call_budget"] = get_call_budget().stats()
+
+    # Parsing model replies: clean JSON, fenced JSON, and the heuristic fallback
+    replies = [
+        json.dumps({"korean": "공지사항입니다.\n접수 안내", "confidence": 91}, ensure_ascii=False),
+        '```json\n{"korean": "공지사항입니다.", "confidence": "88"}\n```',
+        'korean: 공지사항입니다.\ntranslation: Paunawa.',
+    ]
+    n = 3000
+    t = time.perf_counter()
+    for i in range(n):
+        pipeline._parse_ocr_reply(replies[i % len(replies)])
+    out["parse"] = {"ops_per_s": round(n / (time.perf_counter() - t))}
+
+    # Exports of the batch results
+    rows = [{"file": "bench.pdf", **r} for r in results]
+    for name, fn in (("export_csv", export.export_batch_csv), ("export_docx", export.export_batch_docx),
+                     ("export_jsonl", export.export_batch_jsonl)):
+        t = time.perf_counter()
+        data = fn(rows)
+        out[name] = {"ms": round((time.perf_counter() - t) * 1000, 2), "bytes": len(data)}
+
+    # Preparing an oversize phone scan
+    jpeg = make_phone_scan()
+    t = time.perf_counter()
+    prepared, _ = prepare_image_bytes(jpeg, "image/jpeg")
+    out["image_prepare"] = {
+        "ms": round((time.perf_counter() - t) * 1000, 2), "bytes_in": len(jpeg), "bytes_out": len(prepared),
+    }
+
+    out["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return out
+
+
+# ─────────────────────────────────────────────────────────────
+# Reporting
+# ─────────────────────────────────────────────────────────────
+def _flatten(prefix: str, value, into: dict) -> None:
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}.{k}" if prefix else k, v, into)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        into[prefix] = value
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """Print per-metric changes; returns the number of regressions beyond `threshold` (fraction)."""
+    cur, base = {}, {}
+    _flatten("", current["sizes"], cur)
+    _flatten("", baseline["sizes"], base)
+    regressions = 0
+    for key in sorted(cur.keys() & base.keys()):
+        if not base[key] or key.endswith(("bytes", "pages", "model_calls", "build_ms")):
+            continue
+        change = (cur[key] - base[key]) / base[key]
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        flag = ""
+        if worse > threshold:
+            flag, regressions = "  REGRESSION", regressions + 1
+        print(f"{key:45s} {base[key]:>12g} -> {cur[key]:>12g}  {change:+.1%}{flag}")
+    return regressions
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", default="1,10,100", help="comma-separated PDF page counts")
+    ap.add_argument("--latency-ms", type=float, default=300, help="fake model latency per call")
+    ap.add_argument("--jitter-ms", type=float, default=100)
+    ap.add_argument("--workers", type=int, default=4, help="SCANTRANSLATE_PDF_WORKERS for the run")
+    ap.add_argument("--rpm", type=float, default=100000, help="rate limit for the run (default: effectively off)")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", metavar="BASELINE", help="compare against an earlier --json file")
+    ap.add_argument("--threshold", type=float, default=0.10, help="regression threshold for --compare")
+    args = ap.parse_args()
+
+    params = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "workers": args.workers, "rpm": args.rpm}
+    report = {
+        "meta": {
+            "revision": _git_revision(), "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), **params,
+        },
+        "sizes": {},
+    }
+    ctx = multiprocessing.get_context("spawn")
+    for pages in (int(s) for s in args.sizes.split(",") if s.strip()):
+        with ctx.Pool(1) as pool:
+            result = pool.apply(run_size, (pages, params))
+        report["sizes"][str(pages)] = result
+        cold, warm = result["pipeline_cold"], result["pipeline_warm"]
+        print(f"{pages:4d} pages  render p50 {result['render']['p50_ms']:7.1f} ms | "
+              f"cold {cold['pages_per_s']:7.2f} p/s p50 {cold['p50_ms']:7.1f} p95 {cold['p95_ms']:7.1f} ms | "
+              f"warm {warm['pages_per_s']:8.1f} p/s | rss {result['peak_rss_mb']} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(report, baseline, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Cold-start benchmark for the Streamlit app: import time and time to first render.
+
+Each run is a fresh interpreter under `python -X importtime`, in an empty
+working directory (so the SQLite stores and spill directories start cold). The
+child renders app.py once through Streamlit's AppTest (the script run a first
+visitor triggers, without the browser round trip), then once more as a second
+session in the same process (a new visitor on a warm server). Reported per run:
+
+  import_ms         imports triggered by the app's first script run (from -X importtime)
+  first_render_ms   wall time of that first run, imports included
+  warm_render_ms    the second session's first run
+  pipeline_import_ms  `import scantranslate.pipeline` on its own (what the first job pays)
+
+plus the heaviest modules the first render imported, and whether any of the
+dependencies that should load lazily (google-genai, PyMuPDF, python-docx,
+Pillow, numpy) got imported by it. No API key or network is needed.
+
+    python benchmarks/bench_startup.py --runs 5 --json startup.json
+    python benchmarks/bench_startup.py --json new.json --compare startup.json
+"""
+import argparse, json, os, platform, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+# Imported on first use only; the first render must not pull these in
+LAZY_MODULES = ("google.genai", "fitz", "docx", "PIL", "numpy")
+_MARKER = "--- app start ---"
+
+
+def _importtime(stderr: str, after_marker: bool = True) -> tuple[float, list[tuple[str, float]]]:
+    """(total ms, [(top-level module, cumulative ms)]) from `-X importtime` output."""
+    lines = stderr.splitlines()
+    if after_marker and _MARKER in lines:
+        lines = lines[lines.index(_MARKER) + 1:]
+    top = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit() or name[1:2] == " ":  # header row / nested import
+            continue
+        top.append((name.strip(), int(cumulative) / 1000))
+    return round(sum(ms for _, ms in top), 1), sorted(top, key=lambda t: -t[1])
+
+
+# ─────────────────────────────────────────────────────────────
+# Child process (one cold start)
+# ─────────────────────────────────────────────────────────────
+def child() -> None:
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, ROOT)
+    print(_MARKER, file=sys.stderr, flush=True)
+    t = time.perf_counter()
+    first = AppTest.from_file(APP, default_timeout=120).run()
+    first_ms = (time.perf_counter() - t) * 1000
+    loaded = [m for m in LAZY_MODULES if m in sys.modules]
+    t = time.perf_counter()
+    AppTest.from_file(APP, default_timeout=120).run()
+    warm_ms = (time.perf_counter() - t) * 1000
+    print(json.dumps({
+        "first_render_ms": round(first_ms, 1),
+        "warm_render_ms": round(warm_ms, 1),
+        "lazy_loaded": loaded,
+        "exception": [str(e.value) for e in first.exception],
+    }))
+
+
+def cold_start(python: str) -> dict:
+    env = {**os.environ, "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "bench-no-network"), "PYTHONPATH": ROOT}
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run(
+            [python, "-X", "importtime", os.path.abspath(__file__), "--child"],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True,
+        )
+        out = json.loads(proc.stdout.strip().splitlines()[-1])
+        out["import_ms"], out["top_imports"] = _importtime(proc.stderr)
+        pipeline = subprocess.run(
+            [python, "-X", "importtime", "-c", "import scantranslate.pipeline"],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True,
+        )
+        out["pipeline_import_ms"], _ = _importtime(pipeline.stderr, after_marker=False)
+    return out
+
+
+# ─────────────────────────────────────────────────────────────
+# Reporting
+# ─────────────────────────────────────────────────────────────
+def _median(runs: list[dict], key: str) -> float:
+    return round(statistics.median(r[key] for r in runs), 1)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """Print per-metric changes; returns the number of regressions beyond `threshold` (fraction)."""
+    regressions = 0
+    for key in sorted(current["median"].keys() & baseline["median"].keys()):
+        base, cur = baseline["median"][key], current["median"][key]
+        if not base:
+            continue
+        change = (cur - base) / base
+        flag = ""
+        if change > threshold:
+            flag, regressions = "  REGRESSION", regressions + 1
+        print(f"{key:25s} {base:>10g} -> {cur:>10g}  {change:+.1%}{flag}")
+    newly_lazy_loaded = set(current["lazy_loaded"]) - set(baseline.get("lazy_loaded", []))
+    if newly_lazy_loaded:
+        print(f"first render now imports {', '.join(sorted(newly_lazy_loaded))}  REGRESSION")
+        regressions += 1
+    return regressions
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5, help="cold starts (fresh interpreters) to measure")
+    ap.add_argument("--top", type=int, default=10, help="heaviest first-render imports to list")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", metavar="BASELINE", help="compare against an earlier --json file")
+    ap.add_argument("--threshold", type=float, default=0.20, help="regression threshold for --compare")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child()
+        return
+
+    runs = []
+    for i in range(args.runs):
+        run = cold_start(sys.executable)
+        if run["exception"]:
+            sys.exit(f"app raised on first render: {run['exception']}")
+        runs.append(run)
+        print(f"run {i + 1}: import {run['import_ms']:7.1f} ms | first render {run['first_render_ms']:7.1f} ms | "
+              f"warm {run['warm_render_ms']:6.1f} ms | pipeline import {run['pipeline_import_ms']:7.1f} ms")
+
+    keys = ("import_ms", "first_render_ms", "warm_render_ms", "pipeline_import_ms")
+    report = {
+        "meta": {
+            "revision": _git_revision(), "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "runs": args.runs,
+        },
+        "median": {k: _median(runs, k) for k in keys},
+        "lazy_loaded": sorted({m for r in runs for m in r["lazy_loaded"]}),
+        "top_imports": runs[-1]["top_imports"][:args.top],
+    }
+    print("median  " + " | ".join(f"{k} {v}" for k, v in report["median"].items()))
+    print("heaviest first-render imports: " + ", ".join(f"{m} {ms:.0f} ms" for m, ms in report["top_imports"]))
+    if report["lazy_loaded"]:
+        print(f"first render imported: {', '.join(report['lazy_loaded'])}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(report, baseline, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
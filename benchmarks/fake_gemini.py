@@ -0,0 +1,140 @@
+"""
+Local stand-in for `genai.Client`, for benchmarks that must run offline.
+
+Only the surface the pipeline uses is implemented: `models.generate_content`
+and `models.generate_content_stream`, with `.text` and `.usage_metadata` on
+the responses. Latency is injected per call (base + jitter, plus a per-chunk
+delay when streaming), so the numbers reflect the app's own overhead
+(rendering, encoding, caching, thread fan-out) on top of a known model delay.
+
+    client = GeminiClient(FakeGemini(latency_ms=300))   # goes through the real rate limiter
+"""
+import json, random, re, threading, time
+from types import SimpleNamespace
+
+KOREAN_LINES = [
+    "주민센터 공지사항입니다.",
+    "다음 주 월요일부터 서류 접수가 시작됩니다.",
+    "신분증과 가족관계증명서를 지참하시기 바랍니다.",
+    "문의 사항은 민원실로 연락해 주십시오.",
+    "접수 시간은 오전 9시부터 오후 6시까지입니다.",
+    "외국인 주민은 통역 서비스를 신청할 수 있습니다.",
+]
+
+
+def _usage(prompt_chars: int, output_chars: int):
+    return SimpleNamespace(
+        prompt_token_count=max(1, prompt_chars // 4),
+        candidates_token_count=max(1, output_chars // 4),
+        total_token_count=max(1, prompt_chars // 4) + max(1, output_chars // 4),
+    )
+
+
+class _Response:
+    def __init__(self, text: str, usage=None, parsed=None):
+        self.text = text
+        self.usage_metadata = usage
+        self.parsed = parsed
+
+
+def _parsed(text: str, config):
+    """What the SDK puts on `response.parsed` when a response_schema was requested."""
+    schema = getattr(config, "response_schema", None)
+    if schema is None:
+        return None
+    try:
+        if hasattr(schema, "model_validate_json"):
+            return schema.model_validate_json(text)
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGemini"):
+        self._owner = owner
+
+    def _reply(self, contents) -> tuple[str, int]:
+        """(reply text, prompt size in chars) for an OCR, array-translation or text-translation request."""
+        owner = self._owner
+        if isinstance(contents, list):
+            # Vision OCR: prompt + image part
+            image = contents[-1]
+            size = len(getattr(getattr(image, "inline_data", None), "data", b"") or b"")
+            rng = random.Random(size)
+            lines = [rng.choice(KOREAN_LINES) for _ in range(owner.lines_per_page)]
+            payload = {"korean": "\n".join(lines), "confidence": rng.randint(70, 99)}
+            text = json.dumps(payload, ensure_ascii=False)
+            if owner.fenced:
+                text = f"```json\n{text}\n```"
+            return text, len(contents[0]) + size // 3
+        prompt = str(contents)
+        if prompt.startswith("Translate each"):
+            units = json.loads(prompt[prompt.index("["):])
+            return json.dumps([f"[{owner.tag}] {u}" for u in units], ensure_ascii=False), len(prompt)
+        body = prompt.split("\n\n", 1)[-1]
+        lines = body.split("\n")
+        return "\n".join(
+            " ".join(f"[{owner.tag}] {s}" for s in re.split(r"(?<=[.!?])\s+", line.strip()) if s)
+            for line in lines
+        ), len(prompt)
+
+    def _sleep(self, ms: float) -> None:
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def generate_content(self, model, contents, config=None):
+        owner = self._owner
+        owner.record(model)
+        owner.maybe_fail()
+        text, prompt_chars = self._reply(contents)
+        self._sleep(owner.latency_ms + owner.jitter())
+        return _Response(text, _usage(prompt_chars, len(text)), _parsed(text, config))
+
+    def generate_content_stream(self, model, contents, config=None):
+        owner = self._owner
+        owner.record(model)
+        owner.maybe_fail()
+        text, prompt_chars = self._reply(contents)
+        self._sleep(owner.latency_ms + owner.jitter())
+        chunks = [text[i:i + owner.chunk_chars] for i in range(0, len(text), owner.chunk_chars)] or [""]
+        for i, chunk in enumerate(chunks):
+            if i:
+                self._sleep(owner.chunk_ms)
+            last = i == len(chunks) - 1
+            yield _Response(chunk, _usage(prompt_chars, len(text)) if last else None)
+
+
+class FakeGemini:
+    """Drop-in for `genai.Client` with injected latency, optional failures and call counting."""
+
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 100, chunk_ms: float = 20,
+                 chunk_chars: int = 24, lines_per_page: int = 6, fail_rate: float = 0.0,
+                 fenced: bool = False, tag: str = "fil", seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.chunk_ms = chunk_ms
+        self.chunk_chars = chunk_chars
+        self.lines_per_page = lines_per_page
+        self.fail_rate = fail_rate
+        self.fenced = fenced
+        self.tag = tag
+        self.calls = 0
+        self._rng = random.Random(seed)  # seeded, so runs inject the same delays
+        self._lock = threading.Lock()
+        self.models = _FakeModels(self)
+
+    def record(self, model: str) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def jitter(self) -> float:
+        with self._lock:
+            return self._rng.uniform(0, self.jitter_ms)
+
+    def maybe_fail(self) -> None:
+        if self.fail_rate:
+            with self._lock:
+                failed = self._rng.random() < self.fail_rate
+            if failed:
+                raise ConnectionError("injected failure")
@@ -0,0 +1,58 @@
+"""
+ScanTranslate core: Korean OCR + translation pipeline usable without Streamlit.
+
+The Streamlit app (app.py) and the `python -m scantranslate` CLI are both thin
+front ends over this package.
+
+Names are re-exported lazily: `from scantranslate import X` imports only the
+submodule that defines X. Importing the package (or `scantranslate.config`)
+therefore does not pull in google-genai, PyMuPDF, Pillow or python-docx until
+something that needs them is used, which keeps the app's cold start short.
+"""
+import importlib
+
+_EXPORTS = {
+    "cache": ("ResultCache", "get_result_cache"),
+    "caches": ("CacheManager", "MemoryCache", "get_cache_manager"),
+    "config": ("TARGET_LANGUAGES",),
+    "export": (
+        "document_rows", "export_batch_csv", "export_batch_docx", "export_batch_jsonl", "export_bytes", "export_csv",
+        "export_docx", "export_txt", "iter_csv", "iter_jsonl", "write_csv", "write_jsonl",
+    ),
+    "gemini": ("CallBudget", "GeminiClient", "get_call_budget", "make_client"),
+    "history": ("HistoryStore", "get_history_store"),
+    "images": ("prepare_image_bytes", "prepare_image_ref"),
+    "jobs": ("Job", "JobRegistry", "get_job_registry", "job_key"),
+    "memory": ("TranslationMemory", "align", "get_translation_memory"),
+    "metrics": ("get_metrics", "render_prometheus", "span", "write_prometheus"),
+    "parsing": ("clean_code_fence", "extract_json_block", "heuristic_split", "partial_json_string", "sentences_of"),
+    "pdf": (
+        "PdfDocumentCache", "ThumbnailCache", "extract_text_layer", "get_pdf_documents", "get_thumbnails",
+        "page_count", "page_fingerprint", "page_fingerprints", "render_page", "render_page_ref",
+    ),
+    "pipeline": (
+        "BatchJobQueue", "GeminiUnavailable", "OcrStream", "merge_page_results", "ocr_image", "ocr_korean",
+        "ocr_korean_regions", "ocr_pdf_page", "ocr_translate", "ocr_translate_pages", "ocr_translate_regions",
+        "process_document", "remember_edits", "translate_text", "translate_text_stream",
+    ),
+    "regions": ("image_region_plan", "pdf_page_region_plan"),
+    "revisions": ("page_changes",),
+    "tutor": ("TutorSession", "context_hash", "get_context_caches"),
+    "uploads": ("UploadRegistry", "get_upload_registry", "hash_bytes", "iter_upload_entries", "mime_for"),
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULE_OF)
+
+
+def __getattr__(name: str):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
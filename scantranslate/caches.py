@@ -0,0 +1,246 @@
+"""
+In-process caches under one policy: byte budgets, LRU eviction, TTLs.
+
+Every in-memory store that grows with traffic (uploaded and rendered images,
+thumbnails, built exports) is a `MemoryCache` created through the process-wide
+`CacheManager`, each with its own byte budget from config. A cache with a
+`spill_dir` writes evicted values to disk instead of dropping them and reads
+them back on demand (uploads and OCR renders must stay resolvable by digest);
+the directory has its own byte budget and TTL, least recently used files go
+first.
+Stores that are bounded differently (open PDF handles, the SQLite result
+cache) report their stats through the manager as well, so the admin panel
+and /metrics show memory use per cache in one place.
+"""
+import functools, hashlib, os, threading, time
+from collections import OrderedDict
+
+
+_SWEEP_INTERVAL_S = 600  # spill directories are also swept this often, for the TTL
+
+
+class MemoryCache:
+    """
+    Thread-safe key → bytes-like LRU bounded by total size (`sizeof(value)`).
+    Entries older than `ttl_seconds` are treated as missing. The most recently
+    added entry is always kept, even when it alone exceeds the budget.
+
+    Spilled files are swept oldest first (reads refresh a file's mtime) once
+    the directory exceeds `spill_max_bytes`, and when they are older than
+    `spill_ttl_seconds`.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl_seconds: float | None = None,
+                 spill_dir: str | None = None, sizeof=len, spill_max_bytes: int | None = None,
+                 spill_ttl_seconds: float | None = None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir
+        self.sizeof = sizeof
+        self.spill_max_bytes = spill_max_bytes
+        self.spill_ttl_seconds = spill_ttl_seconds
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spilled = 0
+        self.spill_bytes = 0  # as of the last sweep, plus what was spilled since
+        self.spill_removed = 0
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._spilling = {}  # evicted, file not written yet: key -> value
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _spill_path(self, key) -> str:
+        name = key if isinstance(key, str) and key.isalnum() else hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.spill_dir, name)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[2]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._drop(key)
+            if key in self._spilling:
+                self.hits += 1
+                return self._spilling[key]
+        if self.spill_dir:
+            path = self._spill_path(key)
+            try:
+                if not self._expired(os.path.getmtime(path)):
+                    with open(path, "rb") as f:
+                        value = f.read()
+                    os.utime(path)  # recently used: swept last
+                    self.put(key, value)
+                    with self._lock:
+                        self.hits += 1
+                    return value
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value) -> None:
+        size = self.sizeof(value)
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, time.time())
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, (old_value, _, _) = next(iter(self._entries.items()))
+                self._drop(old_key)
+                self.evictions += 1
+                if self.spill_dir:
+                    self._spilling[old_key] = old_value
+                    evicted.append((old_key, old_value))
+        # Disk writes happen outside the lock; until a file is in place `_spilling` serves the value
+        for old_key, old_value in evicted:
+            try:
+                self._spill(old_key, old_value)
+            finally:
+                with self._lock:
+                    self._spilling.pop(old_key, None)
+        if evicted:
+            self._maybe_sweep()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return (entry is not None and not self._expired(entry[2])) or key in self._spilling
+
+    def _drop(self, key) -> None:
+        """Caller holds the lock."""
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def _spill(self, key, value) -> None:
+        """Written once (to a temp file, then renamed into place); spilled content never changes for a key."""
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(value)
+        os.replace(tmp, path)
+        with self._lock:
+            self.spilled += 1
+            self.spill_bytes += len(value)
+
+    def _maybe_sweep(self) -> None:
+        over_budget = self.spill_max_bytes is not None and self.spill_bytes > self.spill_max_bytes
+        if over_budget or time.time() - self._last_sweep > _SWEEP_INTERVAL_S:
+            self.sweep_spill()
+
+    def sweep_spill(self) -> None:
+        """
+        Delete spilled files past `spill_ttl_seconds`, then the least recently
+        used ones until the directory fits `spill_max_bytes`. One thread sweeps
+        at a time; others skip rather than wait.
+        """
+        if not self.spill_dir or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now = time.time()
+            files = []
+            try:
+                with os.scandir(self.spill_dir) as it:
+                    for e in it:
+                        if e.is_file() and not e.name.endswith(".tmp"):
+                            st = e.stat()
+                            files.append((st.st_mtime, st.st_size, e.path))
+            except FileNotFoundError:
+                pass
+            files.sort()
+            total, removed = sum(size for _, size, _ in files), 0
+            for mtime, size, path in files:
+                expired = self.spill_ttl_seconds is not None and now - mtime > self.spill_ttl_seconds
+                if not expired and (self.spill_max_bytes is None or total <= self.spill_max_bytes):
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            with self._lock:
+                self.spill_bytes = total
+                self.spill_removed += removed
+        finally:
+            self._sweep_lock.release()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "spilled": self.spilled,
+                "spill_bytes": self.spill_bytes,
+                "spill_removed": self.spill_removed,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+            }
+
+
+class CacheManager:
+    """Creates the process's memory caches and collects stats from every cache, in-memory or not."""
+
+    def __init__(self):
+        self._caches = {}
+        self._reporters = {}
+        self._lock = threading.Lock()
+
+    def memory_cache(self, name: str, max_mb: float, ttl_seconds: float | None = None,
+                     spill_dir: str | None = None, sizeof=len, spill_max_mb: float | None = None,
+                     spill_ttl_seconds: float | None = None) -> MemoryCache:
+        with self._lock:
+            cache = self._caches.get(name)
+            if cache is None:
+                cache = self._caches[name] = MemoryCache(
+                    name, int(max_mb * 1024 * 1024), ttl_seconds, spill_dir, sizeof,
+                    None if spill_max_mb is None else int(spill_max_mb * 1024 * 1024), spill_ttl_seconds,
+                )
+            return cache
+
+    def report(self, name: str, stats_fn) -> None:
+        """Include a cache managed elsewhere (a `stats() -> dict` callable) in `stats()`."""
+        with self._lock:
+            self._reporters[name] = stats_fn
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            sources = {**{n: c.stats for n, c in self._caches.items()}, **self._reporters}
+        return {name: fn() for name, fn in sorted(sources.items())}
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the memory caches (their budgets bound this)."""
+        with self._lock:
+            caches = list(self._caches.values())
+        return sum(c.bytes for c in caches)
+
+
+@functools.lru_cache(maxsize=None)
+def get_cache_manager() -> CacheManager:
+    return CacheManager()
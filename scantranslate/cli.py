@@ -0,0 +1,141 @@
+"""
+Headless entry point: OCR + translate files or directories without a browser.
+
+    python -m scantranslate scans/ notice.pdf -o out/ --lang fil --format txt,csv,docx,jsonl
+"""
+import argparse, os, sys
+
+from . import config
+from .export import export_batch_docx, export_txt, write_csv, write_jsonl
+from .gemini import make_client
+from .metrics import write_prometheus
+from .pipeline import BatchJobQueue, merge_page_results
+from .uploads import UPLOAD_MIME_BY_EXT, iter_upload_entries
+
+FORMATS = ("txt", "csv", "docx", "jsonl")
+
+
+def collect_inputs(paths) -> list[tuple[str, str]]:
+    """
+    Expand directories (recursively) into supported files. Returns (path, name)
+    pairs where `name` is relative to the directory given on the command line.
+    """
+    supported = set(UPLOAD_MIME_BY_EXT) | {".zip"}
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(
+                    (os.path.join(root, n), os.path.relpath(os.path.join(root, n), path))
+                    for n in sorted(names)
+                    if os.path.splitext(n)[1].lower() in supported
+                )
+        else:
+            files.append((path, os.path.basename(path)))
+    return files
+
+
+def resolve_language(value: str) -> str:
+    """Accept a language key (ko/en/fil) or a full language name."""
+    if value in config.TARGET_LANGUAGES:
+        return config.TARGET_LANGUAGES[value]["code"]
+    return value
+
+
+def _safe_name(name: str, taken: set) -> str:
+    """A flat file name for `name`, numbered (`x.jpg_2`) when an earlier file already took it."""
+    base = safe = name.replace(os.sep, "__").replace("/", "__")
+    n = 1
+    while safe in taken:
+        n += 1
+        safe = f"{base}_{n}"
+    taken.add(safe)
+    return safe
+
+
+def _document_text(job: dict) -> tuple[str, str]:
+    """(korean, target) for one file: PDF pages under page headers, a picture as it is."""
+    if job["mime"] == "application/pdf":
+        korean, target, _ = merge_page_results(job["pages"])
+        return korean, target
+    page = job["pages"][0]
+    if page["error"]:
+        return f"⚠️ {page['error']}", ""
+    return page["korean"], page["target"]
+
+
+def write_outputs(queue: BatchJobQueue, out_dir: str, formats) -> list[str]:
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    if "txt" in formats:
+        taken = set()
+        for job in queue.jobs.values():
+            korean, target = _document_text(job)
+            path = os.path.join(out_dir, _safe_name(job["files"][0], taken) + ".txt")
+            with open(path, "wb") as f:
+                f.write(export_txt(korean, target))
+            written.append(path)
+    results = queue.results()
+    # CSV / JSONL are written row by row; DOCX is built as one document
+    combined = {
+        "csv": write_csv,
+        "docx": lambda rows, f: f.write(export_batch_docx(rows)),
+        "jsonl": write_jsonl,
+    }
+    for fmt, writer in combined.items():
+        if fmt in formats:
+            path = os.path.join(out_dir, f"scantranslate_results.{fmt}")
+            with open(path, "wb") as f:
+                writer(results, f)
+            written.append(path)
+    return written
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="scantranslate", description="OCR Korean scans and translate them.")
+    ap.add_argument("inputs", nargs="+", help="image/PDF/ZIP files or directories")
+    ap.add_argument("-o", "--out", default="scantranslate_out", help="output directory")
+    ap.add_argument("-l", "--lang", default="fil", help="target language key (ko/en/fil) or name")
+    ap.add_argument("-f", "--format", default="txt,csv,jsonl",
+                    help=f"comma-separated output formats: {','.join(FORMATS)}")
+    ap.add_argument("-w", "--workers", type=int, default=config.BATCH_MAX_WORKERS,
+                    help="concurrent Gemini calls")
+    ap.add_argument("-q", "--quiet", action="store_true", help="no progress output")
+    ap.add_argument("--metrics", metavar="FILE", help="write Prometheus-format metrics for the run to FILE")
+    args = ap.parse_args(argv)
+
+    formats = {f.strip() for f in args.format.split(",") if f.strip()}
+    unknown = formats - set(FORMATS)
+    if unknown:
+        ap.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    client = make_client()
+    if client is None:
+        print("warning: GEMINI_API_KEY is not set; only cached results can be returned.", file=sys.stderr)
+
+    queue = BatchJobQueue()
+    for path, display_name in collect_inputs(args.inputs):
+        with open(path, "rb") as f:
+            data = f.read()
+        for name, payload, mime in iter_upload_entries(display_name, data):
+            queue.add(name, payload, mime)
+    if not queue.jobs:
+        print("error: no supported input files", file=sys.stderr)
+        return 1
+
+    def _progress(done, total):
+        if not args.quiet:
+            print(f"\r[{done}/{total}] pages", end="" if done < total else "\n", file=sys.stderr, flush=True)
+
+    queue.run(client, resolve_language(args.lang), on_update=_progress, max_workers=max(1, args.workers))
+
+    for path in write_outputs(queue, args.out, formats):
+        if not args.quiet:
+            print(path)
+    if args.metrics:
+        write_prometheus(args.metrics)
+    failed = [row["file"] for row in queue.rows() if row["status"] != "done"]
+    for name in failed:
+        print(f"failed: {name}", file=sys.stderr)
+    return 2 if failed else 0
@@ -0,0 +1,145 @@
+"""
+Runtime settings for the OCR/translation pipeline.
+
+Everything is read from the environment so the Streamlit app, the CLI and
+workers share one set of knobs. A `.env` file (the working directory's, else
+the project's) is loaded here, before any setting is read, so every front end
+sees its values; variables already set in the environment win.
+"""
+import json, os
+
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv(usecwd=True) or find_dotenv())
+
+# Upper bound on concurrent Gemini calls when a whole PDF (or a page range) is processed
+PDF_MAX_WORKERS = max(1, int(os.getenv("SCANTRANSLATE_PDF_WORKERS", "4")))
+
+# Upper bound on concurrent Gemini calls for multi-file / ZIP batches
+BATCH_MAX_WORKERS = max(1, int(os.getenv("SCANTRANSLATE_BATCH_WORKERS", "4")))
+
+# Models + prompt revisions; all are part of the persistent cache keys
+OCR_PROMPT_VERSION = "ocr-v3"
+TRANSLATE_MODEL = "gemini-2.5-flash"
+TRANSLATE_PROMPT_VERSION = "translate-v1"
+
+# OCR model cascade, cheapest first. A page moves to the next model only when the
+# current one reports a confidence below OCR_ESCALATE_BELOW, its reply doesn't
+# parse against the schema, its output was cut off (or is empty), or the call
+# failed. The last model's answer is always kept; a single model disables the cascade.
+# An empty list (or only commas) falls back to the default cascade.
+_DEFAULT_OCR_MODELS = ("gemini-2.5-flash-lite", "gemini-2.5-flash")
+OCR_MODELS = tuple(
+    m.strip() for m in os.getenv("SCANTRANSLATE_OCR_MODELS", "").split(",") if m.strip()
+) or _DEFAULT_OCR_MODELS
+OCR_ESCALATE_BELOW = float(os.getenv("SCANTRANSLATE_OCR_ESCALATE_BELOW", "80"))
+
+# USD per 1M (input, output) tokens, for per-model cost metrics; models not listed
+# are reported without a cost. SCANTRANSLATE_MODEL_PRICES (JSON) overrides entries.
+MODEL_PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    **json.loads(os.getenv("SCANTRANSLATE_MODEL_PRICES", "{}")),
+}
+
+# Gemini call budget shared by every session/worker in the process
+GEMINI_RPM = float(os.getenv("SCANTRANSLATE_GEMINI_RPM", "60"))
+GEMINI_BURST = max(1, int(os.getenv("SCANTRANSLATE_GEMINI_BURST", "10")))
+GEMINI_MAX_CONCURRENCY = max(1, int(os.getenv("SCANTRANSLATE_GEMINI_CONCURRENCY", "8")))
+GEMINI_MAX_RETRIES = max(0, int(os.getenv("SCANTRANSLATE_GEMINI_RETRIES", "5")))
+GEMINI_TIMEOUT_S = float(os.getenv("SCANTRANSLATE_GEMINI_TIMEOUT", "120"))
+BACKOFF_BASE_S = float(os.getenv("SCANTRANSLATE_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX_S = float(os.getenv("SCANTRANSLATE_BACKOFF_MAX", "30"))
+
+# Persistent result cache (point SCANTRANSLATE_CACHE_PATH at a shared volume to share across replicas)
+RESULT_CACHE_PATH = os.getenv("SCANTRANSLATE_CACHE_PATH", os.path.join(".cache", "scantranslate_results.sqlite3"))
+RESULT_CACHE_MAX_MB = float(os.getenv("SCANTRANSLATE_CACHE_MAX_MB", "256"))
+RESULT_CACHE_TTL_DAYS = float(os.getenv("SCANTRANSLATE_CACHE_TTL_DAYS", "30"))
+
+# Sentence-level translation memory (never evicted). TM_FUZZY_MIN > 0 also reuses
+# near-identical sentences (trigram Dice similarity >= the threshold, e.g. 0.9)
+TM_ENABLED = os.getenv("SCANTRANSLATE_TM", "1") == "1"
+TM_PATH = os.getenv("SCANTRANSLATE_TM_PATH", os.path.join(".cache", "scantranslate_tm.sqlite3"))
+TM_FUZZY_MIN = float(os.getenv("SCANTRANSLATE_TM_FUZZY", "0"))
+
+# Translation history (every finished document, full-text searchable); the
+# app's history panel shows HISTORY_PAGE_SIZE entries per page
+HISTORY_PATH = os.getenv("SCANTRANSLATE_HISTORY_PATH", os.path.join(".cache", "scantranslate_history.sqlite3"))
+HISTORY_PAGE_SIZE = max(1, int(os.getenv("SCANTRANSLATE_HISTORY_PAGE_SIZE", "10")))
+
+# Upload registry (uploads, OCR page renders, region crops): bytes kept in
+# memory up to this budget, older blobs spill to disk. Spilled blobs are
+# deleted least recently used first past UPLOAD_SPILL_MAX_MB, and once unused
+# for UPLOAD_SPILL_TTL_S
+UPLOAD_MEMORY_MB = float(os.getenv("SCANTRANSLATE_UPLOAD_MEMORY_MB", "512"))
+UPLOAD_SPILL_DIR = os.getenv("SCANTRANSLATE_UPLOAD_DIR", os.path.join(".cache", "uploads"))
+UPLOAD_SPILL_MAX_MB = float(os.getenv("SCANTRANSLATE_UPLOAD_SPILL_MAX_MB", "4096"))
+UPLOAD_SPILL_TTL_S = float(os.getenv("SCANTRANSLATE_UPLOAD_SPILL_TTL_S", str(7 * 24 * 3600)))
+
+# Built downloads (DOCX / CSV / JSONL), kept so repeated clicks don't rebuild them
+EXPORT_CACHE_MB = float(os.getenv("SCANTRANSLATE_EXPORT_CACHE_MB", "64"))
+EXPORT_CACHE_TTL_S = float(os.getenv("SCANTRANSLATE_EXPORT_CACHE_TTL_S", "1800"))
+
+# Parsed PyMuPDF documents kept open at once (least recently used is closed first)
+PDF_MAX_OPEN_DOCS = max(1, int(os.getenv("SCANTRANSLATE_PDF_OPEN_DOCS", "8")))
+
+# PDF page previews: fixed width, JPEG or WebP, in a byte-bounded cache of
+# their own (entries expire after THUMB_CACHE_TTL_S); the viewer shows
+# THUMB_WINDOW pages at a time and prefetches the next window
+THUMB_WIDTH_PX = int(os.getenv("SCANTRANSLATE_THUMB_WIDTH", "160"))
+THUMB_FORMAT = os.getenv("SCANTRANSLATE_THUMB_FORMAT", "jpeg")  # jpeg | webp
+THUMB_QUALITY = int(os.getenv("SCANTRANSLATE_THUMB_QUALITY", "70"))
+THUMB_CACHE_MB = float(os.getenv("SCANTRANSLATE_THUMB_CACHE_MB", "32"))
+THUMB_CACHE_TTL_S = float(os.getenv("SCANTRANSLATE_THUMB_CACHE_TTL_S", "3600"))
+THUMB_WINDOW = max(1, int(os.getenv("SCANTRANSLATE_THUMB_WINDOW", "12")))
+
+# Born-digital PDFs: pages whose embedded text layer has at least this many
+# characters are translated directly, without rendering or vision OCR
+PDF_TEXT_LAYER = os.getenv("SCANTRANSLATE_PDF_TEXT_LAYER", "1") == "1"
+PDF_TEXT_MIN_CHARS = int(os.getenv("SCANTRANSLATE_PDF_TEXT_MIN_CHARS", "20"))
+
+# OCR image preparation: longest side sent to Gemini, colour mode, page encoding
+OCR_MAX_SIDE_PX = int(os.getenv("SCANTRANSLATE_OCR_MAX_SIDE", "2400"))
+OCR_GRAYSCALE = os.getenv("SCANTRANSLATE_OCR_GRAYSCALE", "1") == "1"
+OCR_PAGE_FORMAT = os.getenv("SCANTRANSLATE_OCR_PAGE_FORMAT", "png")  # png | jpeg
+OCR_JPEG_QUALITY = int(os.getenv("SCANTRANSLATE_OCR_JPEG_QUALITY", "85"))
+OCR_ACCEPTED_MIME = {"image/jpeg", "image/png", "image/webp"}
+
+# Region OCR for dense / very large pages: off | auto (oversize or multi-column) | on.
+# Blocks are at most OCR_REGION_TILE_PX on a side and OCR'd concurrently.
+OCR_REGIONS = os.getenv("SCANTRANSLATE_OCR_REGIONS", "off")
+OCR_REGION_TILE_PX = int(os.getenv("SCANTRANSLATE_OCR_REGION_TILE", "1600"))
+OCR_REGION_WORKERS = max(1, int(os.getenv("SCANTRANSLATE_OCR_REGION_WORKERS", "4")))
+OCR_REGION_RENDER_SCALE = float(os.getenv("SCANTRANSLATE_OCR_REGION_SCALE", "2.0"))
+
+# Instrumentation: JSON trace lines ("-" = stderr, else a file path), a Prometheus
+# textfile and/or endpoint port, and the sidebar admin panel in the app
+TRACE_LOG = os.getenv("SCANTRANSLATE_TRACE_LOG", "")
+METRICS_FILE = os.getenv("SCANTRANSLATE_METRICS_FILE", "")
+METRICS_PORT = int(os.getenv("SCANTRANSLATE_METRICS_PORT", "0"))
+ADMIN_PANEL = os.getenv("SCANTRANSLATE_ADMIN", "0") == "1"
+
+# Learn & Inquire tutor: documents of at least TUTOR_CACHE_MIN_TOKENS (estimated)
+# go to a Gemini context cache; chat history beyond TUTOR_HISTORY_TOKENS is summarized
+TUTOR_MODEL = os.getenv("SCANTRANSLATE_TUTOR_MODEL", "gemini-2.0-flash")
+TUTOR_PROMPT_VERSION = "tutor-v2"
+TUTOR_CACHE_MIN_TOKENS = int(os.getenv("SCANTRANSLATE_TUTOR_CACHE_MIN_TOKENS", "4096"))
+TUTOR_CACHE_TTL_S = float(os.getenv("SCANTRANSLATE_TUTOR_CACHE_TTL_S", "1800"))
+TUTOR_HISTORY_TOKENS = int(os.getenv("SCANTRANSLATE_TUTOR_HISTORY_TOKENS", "2000"))
+
+# Background jobs for the interactive flow: worker threads, how long finished
+# jobs stay joinable by identical submits, and how often the page polls them
+JOB_WORKERS = max(1, int(os.getenv("SCANTRANSLATE_JOB_WORKERS", "4")))
+JOB_KEEP_S = float(os.getenv("SCANTRANSLATE_JOB_KEEP_S", "600"))
+JOB_POLL_S = float(os.getenv("SCANTRANSLATE_JOB_POLL_S", "0.5"))
+
+# Interactive UI renders OCR / translation / tutor text as it streams in
+STREAM_RESPONSES = os.getenv("SCANTRANSLATE_STREAM", "1") == "1"
+
+TARGET_LANGUAGES = {
+    "ko": {"code": "Korean", "flag": "🇰🇷", "display_ko": "한국어", "display_en": "Korean", "display_fil": "Koreano"},
+    "en": {"code": "English", "flag": "🇺🇸", "display_ko": "영어", "display_en": "English", "display_fil": "Ingles"},
+    "fil": {"code": "Filipino (Tagalog)", "flag": "🇵🇭", "display_ko": "필리핀어", "display_en": "Filipino", "display_fil": "Filipino"},
+}
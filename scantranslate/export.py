@@ -0,0 +1,216 @@
+"""
+TXT / CSV / DOCX / JSONL exporters for single results, multi-page documents and batches.
+
+Multi-row exports work on result rows: the pipeline's page results (file,
+page, source, confidence, korean, target, error). CSV and JSONL are produced
+row by row (`iter_csv` / `iter_jsonl`, or `write_csv` / `write_jsonl` into a
+binary file), so a large batch is never held twice in memory. `export_bytes()`
+builds a download on demand and keeps it in a memory cache by content hash,
+so an unchanged result is never rebuilt.
+"""
+import csv, io, json, re
+from datetime import datetime
+
+from . import config
+from .caches import get_cache_manager
+from .uploads import hash_bytes
+
+# Headings used in exports; the app passes its localized UI strings instead
+DEFAULT_LABELS = {
+    "original": "Original",
+    "translation": "Translation",
+    "pages": "Page",
+    "ocr_confidence": "OCR Confidence",
+}
+
+CSV_FIELDS = ("file", "page", "source", "confidence", "original", "translation", "error")
+_CSV_FLUSH_ROWS = 200  # rows per yielded chunk
+
+
+def _new_document(title: str):
+    # python-docx is imported on first DOCX export, not with the module (CSV / JSONL / TXT don't need it)
+    from docx import Document
+    from docx.shared import Pt
+
+    doc = Document()
+    doc.styles['Normal'].font.name = 'Calibri'
+    doc.styles['Normal'].font.size = Pt(11)
+    doc.add_heading(title, level=1)
+    doc.add_paragraph(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    return doc
+
+
+def _document_bytes(doc) -> bytes:
+    bio = io.BytesIO()
+    doc.save(bio)
+    return bio.getvalue()
+
+
+# ─────────────────────────────────────────────────────────────
+# Single result (editor text as one block)
+# ─────────────────────────────────────────────────────────────
+def export_txt(korean_text, target_text) -> bytes:
+    return ((korean_text or "") + "\n\n---\n\n" + (target_text or "")).encode("utf-8")
+
+
+def export_docx(korean_text, target_text, labels: dict | None = None) -> bytes:
+    labels = {**DEFAULT_LABELS, **(labels or {})}
+    doc = _new_document('ScanTranslate Export')
+    doc.add_heading(labels["original"], level=2)
+    doc.add_paragraph(korean_text or "")
+    doc.add_heading(labels["translation"], level=2)
+    doc.add_paragraph(target_text or "")
+    return _document_bytes(doc)
+
+
+def export_csv(korean_text, target_text) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(("original", "translation"))
+    writer.writerow((korean_text or "", target_text or ""))
+    return out.getvalue().encode("utf-8-sig")
+
+
+# ─────────────────────────────────────────────────────────────
+# Result rows (multi-page documents, batches)
+# ─────────────────────────────────────────────────────────────
+def _page_header(label: str) -> re.Pattern:
+    return re.compile(rf"^\[{re.escape(label)} (\d+)\]$", re.M)
+
+
+def _split_pages(text: str, label: str) -> dict[int, str]:
+    """{page: text} from text merged by pipeline.merge_page_results; empty when there are no headers."""
+    parts = _page_header(label).split(text or "")
+    # parts = [preamble, page, body, page, body, ...]
+    return {int(parts[i]): parts[i + 1].strip() for i in range(1, len(parts) - 1, 2)}
+
+
+def document_rows(korean_text: str, target_text: str, page_results=None, page_label: str = "Page",
+                  confidence=None, file: str = "") -> list[dict]:
+    """
+    Result rows for the editor's text. A multi-page result is split back into
+    pages on the `[<page_label> N]` headers, so edits made in the editor are
+    kept per page along with each page's confidence and error. Anything that
+    no longer lines up with `page_results` is exported as a single row.
+    """
+    if page_results:
+        korean_pages, target_pages = _split_pages(korean_text, page_label), _split_pages(target_text, page_label)
+        by_page = {r["page"]: r for r in page_results}
+        if korean_pages and korean_pages.keys() == target_pages.keys() and korean_pages.keys() <= by_page.keys():
+            return [
+                {
+                    "file": file, "page": page, "source": by_page[page].get("source", "ocr"),
+                    "confidence": by_page[page]["confidence"], "error": by_page[page]["error"],
+                    "korean": "" if by_page[page]["error"] else korean_pages[page], "target": target_pages[page],
+                }
+                for page in korean_pages
+            ]
+    return [{
+        "file": file, "page": 1, "source": "ocr", "confidence": confidence, "error": None,
+        "korean": korean_text or "", "target": target_text or "",
+    }]
+
+
+def _csv_values(r: dict) -> tuple:
+    return (r.get("file", ""), r["page"], r.get("source", "ocr"), r["confidence"],
+            r["korean"], r["target"], r["error"] or "")
+
+
+def iter_csv(results):
+    """CSV (UTF-8 with BOM, for Excel) as byte chunks, a few hundred rows at a time."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_FIELDS)
+    first = True
+    for i, r in enumerate(results, start=1):
+        writer.writerow(_csv_values(r))
+        if i % _CSV_FLUSH_ROWS == 0:
+            yield buf.getvalue().encode("utf-8-sig" if first else "utf-8")
+            buf.seek(0)
+            buf.truncate()
+            first = False
+    if buf.tell() or first:
+        yield buf.getvalue().encode("utf-8-sig" if first else "utf-8")
+
+
+def iter_jsonl(results):
+    """One JSON object per line, as byte chunks."""
+    for r in results:
+        yield (json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def write_csv(results, fp) -> None:
+    for chunk in iter_csv(results):
+        fp.write(chunk)
+
+
+def write_jsonl(results, fp) -> None:
+    for chunk in iter_jsonl(results):
+        fp.write(chunk)
+
+
+def export_batch_csv(results: list[dict]) -> bytes:
+    return b"".join(iter_csv(results))
+
+
+def export_batch_jsonl(results: list[dict]) -> bytes:
+    return b"".join(iter_jsonl(results))
+
+
+def export_batch_docx(results: list[dict], labels: dict | None = None,
+                      title: str = 'ScanTranslate Batch Export') -> bytes:
+    """
+    Bilingual layout: per file, one two-column table (original | translation)
+    with a full-width page row (page number, confidence) above each page.
+    """
+    labels = {**DEFAULT_LABELS, **(labels or {})}
+    doc = _new_document(title)
+    current_file, table = None, None
+    for r in results:
+        if table is None or r.get("file", "") != current_file:
+            current_file = r.get("file", "")
+            if current_file:
+                doc.add_heading(current_file, level=2)
+            table = doc.add_table(rows=1, cols=2)
+            table.style = "Table Grid"
+            header = table.rows[0].cells
+            for cell, text in zip(header, (labels["original"], labels["translation"])):
+                cell.text = text
+                cell.paragraphs[0].runs[0].bold = True
+        conf = f" ({labels['ocr_confidence']}: {r['confidence']}%)" if r["confidence"] is not None else ""
+        page_cells = table.add_row().cells
+        page_cell = page_cells[0].merge(page_cells[1])
+        page_cell.text = f"{labels['pages']} {r['page']}{conf}" + (f"\n⚠️ {r['error']}" if r["error"] else "")
+        page_cell.paragraphs[0].runs[0].bold = True
+        if r["error"]:
+            continue
+        korean_cell, target_cell = table.add_row().cells
+        korean_cell.text = r["korean"] or ""
+        target_cell.text = r["target"] or ""
+    return _document_bytes(doc)
+
+
+# ─────────────────────────────────────────────────────────────
+# On-demand downloads, cached by content
+# ─────────────────────────────────────────────────────────────
+_ROW_EXPORTERS = {
+    "csv": lambda rows, labels: export_batch_csv(rows),
+    "jsonl": lambda rows, labels: export_batch_jsonl(rows),
+    "docx": lambda rows, labels: export_batch_docx(rows, labels, title='ScanTranslate Export'),
+    "batch_docx": export_batch_docx,
+}
+
+
+def export_bytes(fmt: str, rows: list[dict], labels: dict | None = None) -> bytes:
+    """
+    `fmt` ("csv" / "jsonl" / "docx" / "batch_docx") export of result rows.
+    Built exports are kept (EXPORT_CACHE_MB, EXPORT_CACHE_TTL_S) by a hash of
+    (format, rows, labels), so repeated downloads of an unchanged result cost one hash.
+    """
+    key = hash_bytes(json.dumps([fmt, rows, labels], ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+    exports = get_cache_manager().memory_cache("exports", config.EXPORT_CACHE_MB, ttl_seconds=config.EXPORT_CACHE_TTL_S)
+    data = exports.get(key)
+    if data is None:
+        data = _ROW_EXPORTERS[fmt](rows, labels)
+        exports.put(key, data)
+    return data
@@ -0,0 +1,196 @@
+"""
+Rate-limit-aware Gemini client.
+
+`make_client()` returns a thin wrapper around `genai.Client` whose
+`models.generate_content` (and `generate_content_stream`) go through one
+process-wide budget:
+
+- a token bucket (requests per minute) shared by every session and worker;
+- a semaphore capping concurrent in-flight calls (a stream holds its slot
+  until it is exhausted or closed);
+- retries with exponential backoff and full jitter for 408/429/5xx and
+  transport errors. A 429 also pauses the shared bucket, so the other
+  callers back off as well and don't keep hitting the quota;
+- a per-call HTTP timeout.
+
+Errors that survive the retries are raised. Callers must not cache them.
+"""
+import contextlib, functools, os, random, threading, time
+
+import google.genai as genai
+import httpx
+from google.genai.errors import APIError
+from google.genai.types import HttpOptions
+
+from . import config
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, APIError):
+        return exc.code in RETRYABLE_STATUS
+    return isinstance(exc, (httpx.TimeoutException, httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `pause()` blocks every caller for a while (e.g. after a 429)."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping as needed. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate if self.rate else 1.0)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class CallBudget:
+    """Process-wide limiter + counters shared by every wrapped client."""
+
+    def __init__(self, rpm: float, burst: int, max_concurrency: int):
+        self.bucket = TokenBucket(rpm, burst)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "retries": 0, "throttled_s": 0.0, "failures": 0}
+
+    def count(self, key: str, value=1) -> None:
+        with self._lock:
+            self.counters[key] += value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+
+@functools.lru_cache(maxsize=None)
+def get_call_budget() -> CallBudget:
+    return CallBudget(config.GEMINI_RPM, config.GEMINI_BURST, config.GEMINI_MAX_CONCURRENCY)
+
+
+def call_with_retries(fn, *args, budget: CallBudget | None = None, max_retries: int = config.GEMINI_MAX_RETRIES,
+                      take_slot: bool = True, **kwargs):
+    """
+    Run one Gemini request under the shared budget, retrying transient
+    failures. With `take_slot=False`, `fn` takes a concurrency slot itself.
+    """
+    budget = budget or get_call_budget()
+    for attempt in range(max_retries + 1):
+        budget.count("throttled_s", budget.bucket.acquire())
+        budget.count("calls")
+        try:
+            with budget.slots if take_slot else contextlib.nullcontext():
+                return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                budget.count("failures")
+                raise
+            delay = random.uniform(0, min(config.BACKOFF_MAX_S, config.BACKOFF_BASE_S * 2 ** attempt))
+            if isinstance(e, APIError) and e.code == 429:
+                # Quota exhausted: hold everyone back, not just this caller
+                budget.bucket.pause(delay)
+            budget.count("retries")
+            time.sleep(delay)
+
+
+class _SlotStream:
+    """Iterator over a response stream that gives its concurrency slot back once, when exhausted or closed."""
+
+    def __init__(self, first, stream, slots):
+        self._first = first
+        self._stream = stream
+        self._slots = slots
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._slots is None:
+            raise StopIteration
+        try:
+            if self._first is not None:
+                chunk, self._first = self._first, None
+                return chunk
+            return next(self._stream)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        slots, self._slots = self._slots, None
+        if slots is not None:
+            getattr(self._stream, "close", lambda: None)()
+            slots.release()
+
+    def __del__(self):  # abandoned without being read to the end
+        self.close()
+
+
+class _RetryingModels:
+    def __init__(self, models):
+        self._models = models
+
+    def generate_content(self, **kwargs):
+        return call_with_retries(self._models.generate_content, **kwargs)
+
+    def generate_content_stream(self, **kwargs):
+        """
+        Streaming variant. Opening the stream (up to the first chunk) is retried
+        under the shared budget; a failure mid-stream is raised, since chunks
+        already handed to the caller cannot be taken back. The concurrency
+        slot is held until the stream is exhausted or closed.
+        """
+        slots = get_call_budget().slots
+
+        def _open():
+            slots.acquire()
+            try:
+                stream = iter(self._models.generate_content_stream(**kwargs))
+                return _SlotStream(next(stream, None), stream, slots)
+            except BaseException:
+                slots.release()
+                raise
+
+        return call_with_retries(_open, take_slot=False)
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class GeminiClient:
+    """Drop-in for `genai.Client`: same `.models.generate_content(...)`, plus the shared budget."""
+
+    def __init__(self, client):
+        self.raw = client
+        self.models = _RetryingModels(client.models)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+def make_client(api_key: str | None = None):
+    """A rate-limited client for `api_key` (default: GEMINI_API_KEY), or None when no key is set."""
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    raw = genai.Client(api_key=api_key, http_options=HttpOptions(timeout=int(config.GEMINI_TIMEOUT_S * 1000)))
+    return GeminiClient(raw)
@@ -0,0 +1,209 @@
+"""
+Persistent translation history.
+
+Every finished document lands in one SQLite table, keyed by its content hash
+(the job key: upload digest + page scope + target language), so running the
+same document again refreshes its entry instead of adding another (text the
+user has corrected and saved is kept; only the timestamp moves). The
+Korean and translated text are indexed for full-text search (FTS5 with the
+trigram tokenizer, which suits Hangul without a word segmenter); on SQLite
+builds without it, and for queries shorter than a trigram, search falls back
+to LIKE. Listing is paged with LIMIT/OFFSET and returns previews only; the
+full text and page results are read back when an entry is opened.
+
+Each entry also records the upload digest, so a revised upload of the same
+file (same name and language, different bytes) can be compared with its
+previous version; a different page scope of the same upload is not one.
+
+Entries belong to an `owner` (the signed-in user's e-mail when the app has
+Streamlit auth configured); without auth every visitor shares owner "".
+"""
+import functools, json, os, sqlite3, threading, time
+
+from . import config
+
+_PREVIEW_CHARS = 120
+_FIELDS = ("id", "content_hash", "file", "lang", "lang_flag", "confidence", "edited", "created_at", "updated_at")
+# Columns added after the first release: (name, definition) for ALTER TABLE on older stores
+_ADDED_COLUMNS = (
+    ("digest", "TEXT NOT NULL DEFAULT ''"),
+    ("edited", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class HistoryStore:
+    """SQLite-backed history of finished documents, shared by every session."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " id INTEGER PRIMARY KEY,"
+            " owner TEXT NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " digest TEXT NOT NULL DEFAULT '',"
+            " file TEXT NOT NULL,"
+            " lang TEXT NOT NULL,"
+            " lang_flag TEXT NOT NULL,"
+            " confidence INTEGER,"
+            " edited INTEGER NOT NULL DEFAULT 0,"
+            " korean TEXT NOT NULL,"
+            " target TEXT NOT NULL,"
+            " page_results TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " UNIQUE (owner, content_hash))"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(history)")}
+        for name, definition in _ADDED_COLUMNS:
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE history ADD COLUMN {name} {definition}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_recent ON history(owner, updated_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_lang ON history(owner, lang, updated_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_file ON history(owner, file, lang, updated_at)")
+        self.fts = self._create_fts()
+        self._conn.commit()
+
+    def _create_fts(self) -> bool:
+        """External-content FTS index kept in step by triggers; False when FTS5/trigram is unavailable."""
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                " korean, target, content='history', content_rowid='id', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            return False
+        self._conn.executescript(
+            "CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN"
+            "  INSERT INTO history_fts(rowid, korean, target) VALUES (new.id, new.korean, new.target);"
+            " END;"
+            "CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN"
+            "  INSERT INTO history_fts(history_fts, rowid, korean, target) VALUES ('delete', old.id, old.korean, old.target);"
+            " END;"
+            "CREATE TRIGGER IF NOT EXISTS history_au AFTER UPDATE OF korean, target ON history BEGIN"
+            "  INSERT INTO history_fts(history_fts, rowid, korean, target) VALUES ('delete', old.id, old.korean, old.target);"
+            "  INSERT INTO history_fts(rowid, korean, target) VALUES (new.id, new.korean, new.target);"
+            " END;"
+        )
+        return True
+
+    def add(self, content_hash: str, korean: str, target: str, lang: str, lang_flag: str = "",
+            confidence=None, page_results=None, file: str = "", owner: str = "", digest: str = "") -> int:
+        """
+        Store a finished document, replacing an earlier run of the same content
+        unless the user has edited that one (then only its timestamp and
+        confidence are refreshed); returns its id.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO history (owner, content_hash, digest, file, lang, lang_flag, confidence, korean, target,"
+                " page_results, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (owner, content_hash) DO UPDATE SET digest = excluded.digest, file = excluded.file,"
+                " confidence = excluded.confidence,"
+                " korean = CASE WHEN edited THEN korean ELSE excluded.korean END,"
+                " target = CASE WHEN edited THEN target ELSE excluded.target END,"
+                " page_results = CASE WHEN edited THEN page_results ELSE excluded.page_results END,"
+                " updated_at = excluded.updated_at",
+                (owner, content_hash, digest, file, lang, lang_flag, confidence, korean or "", target or "",
+                 json.dumps(page_results or [], ensure_ascii=False), now, now),
+            )
+            row = self._conn.execute(
+                "SELECT id FROM history WHERE owner = ? AND content_hash = ?", (owner, content_hash)
+            ).fetchone()
+            self._conn.commit()
+        return row[0]
+
+    def update(self, entry_id: int, korean: str, target: str, owner: str = "") -> bool:
+        """Replace an entry's text with the user's edits (later runs of the same content keep them)."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE history SET korean = ?, target = ?, edited = 1, updated_at = ? WHERE id = ? AND owner = ?",
+                (korean or "", target or "", time.time(), entry_id, owner),
+            )
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def get(self, entry_id: int, owner: str = "") -> dict | None:
+        """One entry in full (text and page results), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_FIELDS)}, korean, target, page_results FROM history WHERE id = ? AND owner = ?",
+                (entry_id, owner),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(_FIELDS + ("korean", "target", "page_results"), row))
+        entry["page_results"] = json.loads(entry["page_results"])
+        return entry
+
+    def find(self, content_hash: str, owner: str = "") -> int | None:
+        """Id of the entry for `content_hash`, if this owner has one."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM history WHERE owner = ? AND content_hash = ?", (owner, content_hash)
+            ).fetchone()
+        return row[0] if row else None
+
+    def previous_version(self, file: str, lang: str, digest: str, owner: str = "") -> dict | None:
+        """
+        The latest entry for the same file name and language from a different
+        upload (an earlier revision), in full. Other page scopes of the same
+        upload don't count.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM history WHERE owner = ? AND file = ? AND lang = ? AND digest != '' AND digest != ?"
+                " ORDER BY updated_at DESC LIMIT 1",
+                (owner, file, lang, digest),
+            ).fetchone()
+        return self.get(row[0], owner=owner) if row else None
+
+    def page(self, query: str = "", lang: str | None = None, limit: int = 10, offset: int = 0,
+             owner: str = "") -> tuple[list[dict], int]:
+        """
+        Newest first, `limit` entries from `offset`, plus the total matching.
+        Entries carry `korean_preview` / `target_preview` instead of the full text.
+        """
+        where, params = ["h.owner = ?"], [owner]
+        if lang:
+            where.append("h.lang = ?")
+            params.append(lang)
+        query = (query or "").strip()
+        if query and self.fts and len(query) >= 3:
+            where.append("h.id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+            params.append('"' + query.replace('"', '""') + '"')
+        elif query:
+            where.append("(h.korean LIKE ? ESCAPE '\\' OR h.target LIKE ? ESCAPE '\\')")
+            params += [_like_pattern(query)] * 2
+        clause = " AND ".join(where)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM history h WHERE {clause}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join('h.' + f for f in _FIELDS)}, substr(h.korean, 1, {_PREVIEW_CHARS}),"
+                f" substr(h.target, 1, {_PREVIEW_CHARS}) FROM history h WHERE {clause}"
+                f" ORDER BY h.updated_at DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [dict(zip(_FIELDS + ("korean_preview", "target_preview"), r)) for r in rows], total
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, owners = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT owner) FROM history").fetchone()
+        return {"entries": entries, "owners": owners, "fts": self.fts}
+
+
+@functools.lru_cache(maxsize=None)
+def get_history_store() -> HistoryStore:
+    """One history handle per process, shared by every session."""
+    return HistoryStore(config.HISTORY_PATH)
@@ -0,0 +1,42 @@
+"""Preparing uploaded pictures for OCR."""
+import io
+
+from PIL import Image, ImageOps
+
+from . import config
+from .metrics import count, span
+from .uploads import get_upload_registry
+
+
+def prepare_image_bytes(data: bytes, mime: str) -> tuple[bytes, str]:
+    """
+    Pass uploads through untouched when Gemini accepts the format and the image
+    already fits OCR_MAX_SIDE_PX. Oversize scans (e.g. 600-dpi phone scans) are
+    downsampled, optionally grayscaled, and re-encoded once as JPEG.
+    """
+    mime = "image/jpeg" if mime == "image/jpg" else mime
+    with Image.open(io.BytesIO(data)) as img:  # header only; pixels are decoded lazily
+        if mime in config.OCR_ACCEPTED_MIME and max(img.size) <= config.OCR_MAX_SIDE_PX:
+            count("image_passthrough")
+            return data, mime
+        with span("encode", format="jpeg", bytes_in=len(data)) as rec:
+            mode = "L" if config.OCR_GRAYSCALE else "RGB"
+            if img.format == "JPEG":
+                # Let libjpeg decode at a reduced scale instead of decoding full size first
+                img.draft(mode, (config.OCR_MAX_SIDE_PX, config.OCR_MAX_SIDE_PX))
+            img = ImageOps.exif_transpose(img).convert(mode)
+            img.thumbnail((config.OCR_MAX_SIDE_PX, config.OCR_MAX_SIDE_PX), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=config.OCR_JPEG_QUALITY, optimize=True)
+            rec["bytes"] = out.tell()
+    return out.getvalue(), "image/jpeg"
+
+
+def prepare_image_ref(upload_digest: str, mime: str) -> tuple[str, str]:
+    """Prepared OCR image for an uploaded picture; returns (image digest, mime)."""
+    registry = get_upload_registry()
+    data = registry.get(upload_digest)
+    prepared, prepared_mime = prepare_image_bytes(data, mime)
+    if prepared is data:
+        return upload_digest, prepared_mime
+    return registry.put(prepared), prepared_mime
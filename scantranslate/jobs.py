@@ -0,0 +1,119 @@
+"""
+Background execution for interactive OCR/translation work.
+
+The Streamlit script thread only submits a job and polls it; the work runs on
+a process-wide pool. Jobs are keyed by content (upload digest + what was asked
+for), so identical requests from any session while one is queued, running or
+recently finished share that job instead of paying for another API call
+(single-flight). Failed jobs are not reused: the next submit retries.
+"""
+import functools, json, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from .metrics import count, span
+from .uploads import hash_bytes
+
+
+def job_key(*parts) -> str:
+    """Content key for a job: the upload digest plus whatever else shapes the result (JSON-serializable)."""
+    return hash_bytes(json.dumps(parts, ensure_ascii=False).encode("utf-8"))
+
+
+class Job:
+    """
+    One unit of background work. `progress` is (done, total) once known;
+    `partial` holds text produced so far (streamed OCR / translation) for the
+    UI to show while the job runs. `result` / `error` are set when it ends.
+    """
+
+    def __init__(self, key: str, kind: str):
+        self.key = key
+        self.kind = kind
+        self.status = "queued"  # queued | running | done | failed
+        self.progress = None
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def set_progress(self, done: int, total: int) -> None:
+        self.progress = (done, total)
+
+    def append(self, field: str, text: str) -> None:
+        """Add streamed text to `partial[field]` (called from the worker thread)."""
+        with self._lock:
+            self.partial[field] = self.partial.get(field, "") + text
+
+    def update(self, **fields) -> None:
+        with self._lock:
+            self.partial.update(fields)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.partial)
+
+
+class JobRegistry:
+    """Thread pool + content-keyed job table, shared by every session in the process."""
+
+    def __init__(self, max_workers: int, keep_seconds: float):
+        self.keep_seconds = keep_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scantranslate-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, kind: str, fn, *args, **kwargs) -> Job:
+        """
+        Run `fn(*args, job=<Job>, **kwargs)` in the background and return its
+        job at once. A live or finished job with the same key is returned instead.
+        """
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            if job is not None and job.status != "failed":
+                count("jobs", kind=kind, outcome="coalesced")
+                return job
+            job = self._jobs[key] = Job(key, kind)
+        count("jobs", kind=kind, outcome="submitted")
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn, args, kwargs) -> None:
+        job.status = "running"
+        status = "done"
+        try:
+            with span("job", kind=job.kind):
+                job.result = fn(*args, job=job, **kwargs)
+        except Exception as e:
+            # Kept as the exception so the UI can word it (quota, missing key, ...)
+            job.error = e
+            status = "failed"
+        job.finished_at = time.time()
+        job.status = status  # last, so pollers never see a finished job without its result
+
+    def get(self, key: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.keep_seconds
+        for key in [k for k, j in self._jobs.items() if j.finished_at is not None and j.finished_at < cutoff]:
+            del self._jobs[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [j.status for j in self._jobs.values()]
+        return {s: statuses.count(s) for s in ("queued", "running", "done", "failed")}
+
+
+@functools.lru_cache(maxsize=None)
+def get_job_registry() -> JobRegistry:
+    """One registry per process, so identical jobs coalesce across sessions."""
+    return JobRegistry(config.JOB_WORKERS, config.JOB_KEEP_S)
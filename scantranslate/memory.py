@@ -0,0 +1,245 @@
+"""
+Sentence-level translation memory.
+
+Notices repeat a lot of boilerplate, so finished translations are split into
+(Korean sentence → translation) pairs and stored per target language. New
+documents only send the sentences the memory has not seen to the model and
+reassemble the rest locally. Pairs saved from user edits take precedence over
+model output for the same sentence.
+
+Lookups are exact on a normalized form of the sentence. An optional fuzzy
+index (character trigrams, Dice similarity) reuses near-identical sentences
+when SCANTRANSLATE_TM_FUZZY is set to a threshold such as 0.9.
+"""
+import functools, os, re, sqlite3, threading, time, unicodedata
+
+from . import config
+
+_WS = re.compile(r"\s+")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_FUZZY_MIN_CHARS = 8
+
+
+def normalize(sentence: str) -> str:
+    """NFC, single spaces, no surrounding whitespace: the memory's lookup key."""
+    return _WS.sub(" ", unicodedata.normalize("NFC", sentence)).strip()
+
+
+def split_sentences(line: str) -> list[str]:
+    """Same sentence boundaries as parsing.sentences_of, for one line."""
+    return [s for s in _SENTENCE_SPLIT.split(line.strip()) if s]
+
+
+def _has_letters(text: str) -> bool:
+    return any(c.isalpha() for c in text)
+
+
+def _trigrams(norm: str) -> set[str]:
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def align(korean_text: str, target_text: str) -> list[tuple[str, str]]:
+    """
+    Pair source and translated sentences when the structure makes it safe:
+    line counts must match, then sentence counts within each line; a line whose
+    sentence counts differ is paired as a whole. Anything else yields nothing.
+    """
+    src_lines = [line for line in (korean_text or "").split("\n") if line.strip()]
+    tgt_lines = [line for line in (target_text or "").split("\n") if line.strip()]
+    if not src_lines or len(src_lines) != len(tgt_lines):
+        return []
+    pairs = []
+    for src, tgt in zip(src_lines, tgt_lines):
+        src_s, tgt_s = split_sentences(src), split_sentences(tgt)
+        if len(src_s) == len(tgt_s):
+            pairs.extend(zip(src_s, tgt_s))
+        else:
+            pairs.append((src.strip(), tgt.strip()))
+    return [(s, t) for s, t in pairs if _has_letters(s) and s.strip() != t.strip()]
+
+
+class TranslationPlan:
+    """
+    A text split into lines of units, with the units the memory already knows.
+    `missing` lists the units (in order, deduplicated) still to be translated.
+    """
+
+    def __init__(self, lines: list[list[str]], known: dict[str, str], missing: list[str], hits: int):
+        self.lines = lines
+        self.known = known
+        self.missing = missing
+        self.hits = hits
+
+    def assemble(self, translations: dict[str, str] | None = None) -> str:
+        done = {**self.known, **(translations or {})}
+        return "\n".join(" ".join(done[u] for u in units) for units in self.lines)
+
+
+class TranslationMemory:
+    """SQLite-backed (sentence, language) → translation store, shared by every session."""
+
+    def __init__(self, path: str, fuzzy_min: float = 0.0):
+        self.path = path
+        self.fuzzy_min = fuzzy_min
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tm ("
+            " lang TEXT NOT NULL,"
+            " norm TEXT NOT NULL,"
+            " target TEXT NOT NULL,"
+            " origin TEXT NOT NULL,"
+            " grams INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " uses INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (lang, norm))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tm_grams (lang TEXT NOT NULL, gram TEXT NOT NULL, norm TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tm_grams_lookup ON tm_grams(lang, gram)")
+        self._conn.commit()
+
+    def remember(self, pairs, lang: str, origin: str = "model") -> int:
+        """
+        Store (korean, translation) pairs. Model output never overwrites an
+        edited entry; edits overwrite anything. Returns the number of rows written.
+        """
+        now = time.time()
+        written = 0
+        with self._lock:
+            for src, tgt in pairs:
+                norm, tgt = normalize(src), tgt.strip()
+                if not norm or not tgt:
+                    continue
+                row = self._conn.execute("SELECT origin FROM tm WHERE lang = ? AND norm = ?", (lang, norm)).fetchone()
+                if row is not None and row[0] == "edit" and origin != "edit":
+                    continue
+                grams = _trigrams(norm)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tm (lang, norm, target, origin, grams, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (lang, norm, tgt, origin, len(grams), now),
+                )
+                if row is None:
+                    self._conn.executemany(
+                        "INSERT INTO tm_grams (lang, gram, norm) VALUES (?, ?, ?)",
+                        [(lang, g, norm) for g in grams],
+                    )
+                written += 1
+            self._conn.commit()
+        return written
+
+    def _exact(self, norms: list[str], lang: str) -> dict[str, str]:
+        found = {}
+        for i in range(0, len(norms), 500):  # stay under SQLite's host-parameter limit
+            chunk = norms[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            found.update(self._conn.execute(
+                f"SELECT norm, target FROM tm WHERE lang = ? AND norm IN ({marks})", (lang, *chunk)
+            ).fetchall())
+        return found
+
+    def _fuzzy(self, norm: str, lang: str) -> str | None:
+        grams = _trigrams(norm)
+        marks = ",".join("?" * len(grams))
+        rows = self._conn.execute(
+            f"SELECT g.norm, COUNT(*), t.grams, t.target FROM tm_grams g JOIN tm t ON t.lang = g.lang AND t.norm = g.norm"
+            f" WHERE g.lang = ? AND g.gram IN ({marks}) GROUP BY g.norm ORDER BY COUNT(*) DESC LIMIT 5",
+            (lang, *grams),
+        ).fetchall()
+        best, best_score = None, self.fuzzy_min
+        for _, shared, cand_grams, target in rows:
+            score = 2 * shared / (len(grams) + cand_grams)
+            if score >= best_score:
+                best, best_score = target, score
+        return best
+
+    def lookup_many(self, sentences, lang: str) -> dict[str, str]:
+        """Translations for whichever of `sentences` the memory knows, keyed by the sentence as given."""
+        norms = {s: normalize(s) for s in sentences}
+        with self._lock:
+            exact = self._exact(sorted(set(norms.values())), lang)
+            found = {}
+            for s, norm in norms.items():
+                if norm in exact:
+                    found[s] = exact[norm]
+                elif self.fuzzy_min > 0 and len(norm) >= _FUZZY_MIN_CHARS:
+                    hit = self._fuzzy(norm, lang)
+                    if hit is not None:
+                        found[s] = hit
+                        self.fuzzy_hits += 1
+            if exact:
+                self._conn.executemany(
+                    "UPDATE tm SET uses = uses + 1 WHERE lang = ? AND norm = ?", [(lang, n) for n in exact]
+                )
+                self._conn.commit()
+        return found
+
+    def plan(self, text: str, lang: str) -> TranslationPlan:
+        """
+        Split `text` into lines and sentences and resolve what the memory knows.
+        A whole line is tried first (edits are often stored per line), then its
+        sentences. Units without letters (numbers, dates, bullets) are copied.
+        """
+        raw_lines = [line.strip() for line in text.split("\n")]
+        candidates = set()
+        for line in raw_lines:
+            if line:
+                candidates.add(line)
+                candidates.update(split_sentences(line))
+        found = self.lookup_many([c for c in candidates if _has_letters(c)], lang)
+
+        lines, known, missing, hits = [], {}, [], 0
+        for line in raw_lines:
+            if not line:
+                lines.append([])
+                continue
+            if line in found:
+                lines.append([line])
+                known[line] = found[line]
+                hits += 1
+                continue
+            units = split_sentences(line)
+            lines.append(units)
+            for u in units:
+                if u in known or u in missing:
+                    continue
+                if not _has_letters(u):
+                    known[u] = u
+                elif u in found:
+                    known[u] = found[u]
+                    hits += 1
+                else:
+                    missing.append(u)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(missing)
+        return TranslationPlan(lines, known, missing, hits)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, edits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(origin = 'edit'), 0) FROM tm"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "edited": edits,
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else None,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_translation_memory() -> TranslationMemory:
+    """One memory handle per process, shared by every session and worker thread."""
+    return TranslationMemory(config.TM_PATH, fuzzy_min=config.TM_FUZZY_MIN)
@@ -0,0 +1,268 @@
+"""
+Per-stage tracing and process-wide metrics.
+
+Every instrumented stage (render, encode, Gemini call, parse, cache lookups)
+goes through `span()` / `count()`. Each finished span is:
+
+- one JSON log line on the `scantranslate.trace` logger (stage, duration_ms
+  and whatever the stage attached: bytes sent, prompt/output tokens, parse
+  path, cache outcome). SCANTRANSLATE_TRACE_LOG=- sends it to stderr,
+  any other value appends to that file;
+- folded into Prometheus-style counters and histograms. They are exposed as
+  text via `render_prometheus()`, written to SCANTRANSLATE_METRICS_FILE, and
+  served on SCANTRANSLATE_METRICS_PORT when that is set.
+"""
+import bisect, functools, json, logging, os, statistics, threading, time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import config
+
+BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_RECENT = 500  # samples per stage kept for the admin panel's percentiles
+_FILE_EVERY_S = 5.0
+
+log = logging.getLogger("scantranslate.trace")
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """Thread-safe counters + histograms (Prometheus naming), plus recent samples per stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self.recent = defaultdict(lambda: deque(maxlen=_RECENT))  # stage -> durations (ms)
+        self._file_written = 0.0
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            self.counters[(name, _labels(labels))] += value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            h = self.histograms.setdefault(key, [0] * len(BUCKETS_S) + [0.0, 0])
+            i = bisect.bisect_left(BUCKETS_S, seconds)
+            if i < len(BUCKETS_S):
+                h[i] += 1
+            h[-2] += seconds
+            h[-1] += 1
+            if name == "scantranslate_stage_seconds":
+                self.recent[labels.get("stage")].append(seconds * 1000)
+
+    def stage_summary(self) -> list[dict]:
+        """Admin-panel view: count / p50 / p95 / max (ms) per stage over the recent window."""
+        with self._lock:
+            samples = {stage: sorted(v) for stage, v in self.recent.items()}
+        rows = []
+        for stage, ms in sorted(samples.items()):
+            q = statistics.quantiles(ms, n=20, method="inclusive") if len(ms) >= 2 else [ms[0]] * 19
+            rows.append({
+                "stage": stage, "n": len(ms),
+                "p50_ms": round(statistics.median(ms), 1), "p95_ms": round(q[18], 1), "max_ms": round(ms[-1], 1),
+            })
+        return rows
+
+    def model_summary(self) -> list[dict]:
+        """Admin-panel view: calls, mean latency (ms) and cost (USD) per stage and model."""
+        def stage_model(labels: tuple) -> tuple:
+            return dict(labels).get("stage", ""), dict(labels).get("model", "")
+
+        with self._lock:
+            calls = {
+                stage_model(labels): (h[-2], h[-1])
+                for (name, labels), h in self.histograms.items() if name == "scantranslate_model_call_seconds"
+            }
+            costs = {
+                stage_model(labels): value
+                for (name, labels), value in self.counters.items() if name == "scantranslate_cost_usd_total"
+            }
+        return [
+            {
+                "stage": stage, "model": model, "calls": n,
+                "mean_ms": round(seconds * 1000 / n, 1), "cost_usd": round(costs.get((stage, model), 0.0), 6),
+            }
+            for (stage, model), (seconds, n) in sorted(calls.items())
+        ]
+
+    def render_prometheus(self, gauges: dict | None = None) -> str:
+        lines = []
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {k: list(v) for k, v in self.histograms.items()}
+        for name in sorted({n for n, _ in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+        for name in sorted({n for n, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (n, labels), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, c in zip(BUCKETS_S, h):
+                    cumulative += c
+                    le = _fmt_labels(labels, 'le="%g"' % bound)
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                le = _fmt_labels(labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{le} {h[-1]}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-2]:.6f}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {h[-1]}")
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+@functools.lru_cache(maxsize=None)
+def get_metrics() -> Metrics:
+    """One registry per process; also wires up the trace log, metrics file and endpoint from config."""
+    if config.TRACE_LOG:
+        handler = logging.StreamHandler() if config.TRACE_LOG == "-" else logging.FileHandler(config.TRACE_LOG)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    if config.METRICS_PORT:
+        _serve(config.METRICS_PORT)
+    return Metrics()
+
+
+def _gauges() -> dict:
+    """Point-in-time values owned by other modules (call budget, jobs, caches, TM, history)."""
+    from .cache import get_result_cache
+    from .caches import get_cache_manager
+    from .gemini import get_call_budget
+    from .history import get_history_store
+    from .jobs import get_job_registry
+    from .memory import get_translation_memory
+
+    get_result_cache()  # registers itself with the cache manager
+    gauges = {f"scantranslate_gemini_{k}": v for k, v in get_call_budget().stats().items()}
+    gauges.update({f"scantranslate_jobs_{k}": v for k, v in get_job_registry().stats().items()})
+    sources = {f"cache_{name}": stats for name, stats in get_cache_manager().stats().items()}
+    sources.update(tm=get_translation_memory().stats(), history=get_history_store().stats())
+    for prefix, stats in sources.items():
+        gauges.update({f"scantranslate_{prefix}_{k}": v for k, v in stats.items() if isinstance(v, (int, float))})
+    return gauges
+
+
+def render_prometheus() -> str:
+    return get_metrics().render_prometheus(_gauges())
+
+
+def write_prometheus(path: str) -> None:
+    """Atomically replace `path` with the current exposition (for a node-exporter textfile collector)."""
+    tmp = f"{path}.tmp"
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+def _maybe_write_file(metrics: Metrics) -> None:
+    if not config.METRICS_FILE:
+        return
+    now = time.monotonic()
+    if now - metrics._file_written < _FILE_EVERY_S:
+        return
+    metrics._file_written = now
+    try:
+        write_prometheus(config.METRICS_FILE)
+    except OSError as e:
+        log.warning("could not write %s: %s", config.METRICS_FILE, e)
+
+
+def _serve(port: int) -> None:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200 if self.path in ("/", "/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    except OSError as e:  # e.g. a second Streamlit process on the same host
+        log.warning("metrics endpoint not started on :%s: %s", port, e)
+        return
+    threading.Thread(target=server.serve_forever, name="scantranslate-metrics", daemon=True).start()
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """Increment `scantranslate_<name>_total`."""
+    get_metrics().inc(f"scantranslate_{name}_total", value, **labels)
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """
+    Time a stage. The yielded dict can be filled in by the caller (bytes, tokens,
+    parse path, ...). Numeric `bytes_sent`, `prompt_tokens` and `output_tokens`
+    also feed counters; the whole dict is logged as one JSON line.
+    """
+    metrics = get_metrics()
+    record = {"stage": stage, **fields}
+    t0 = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - t0
+        record["duration_ms"] = round(seconds * 1000, 2)
+        metrics.observe("scantranslate_stage_seconds", seconds, stage=stage)
+        if record.get("bytes_sent"):
+            metrics.inc("scantranslate_bytes_sent_total", record["bytes_sent"], stage=stage)
+        for kind in ("prompt", "output"):
+            if record.get(f"{kind}_tokens"):
+                metrics.inc("scantranslate_tokens_total", record[f"{kind}_tokens"], stage=stage, kind=kind)
+        if record.get("model"):
+            # Model calls: latency and cost per model, so cascade tiers can be compared
+            metrics.observe("scantranslate_model_call_seconds", seconds, stage=stage, model=record["model"])
+            cost = call_cost(record["model"], record.get("prompt_tokens"), record.get("output_tokens"))
+            if cost:
+                record["cost_usd"] = round(cost, 8)
+                metrics.inc("scantranslate_cost_usd_total", cost, stage=stage, model=record["model"])
+        if "error" in record:
+            metrics.inc("scantranslate_stage_errors_total", stage=stage)
+        if log.isEnabledFor(logging.INFO):
+            log.info(json.dumps({"ts": round(time.time(), 3), **record}, ensure_ascii=False, default=str))
+        _maybe_write_file(metrics)
+
+
+def call_cost(model: str, prompt_tokens, output_tokens) -> float | None:
+    """USD for one call from config.MODEL_PRICES, or None for a model without a price."""
+    prices = config.MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return ((prompt_tokens or 0) * prices[0] + (output_tokens or 0) * prices[1]) / 1_000_000
+
+
+def usage_fields(response) -> dict:
+    """prompt/output token counts from a Gemini response (or a final streamed chunk), when reported."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+        "output_tokens": getattr(usage, "candidates_token_count", None) or 0,
+    }
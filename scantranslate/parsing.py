@@ -0,0 +1,73 @@
+"""Parsing helpers for raw model output and sentence splitting."""
+import re
+
+
+def clean_code_fence(text: str) -> str:
+    text = text.strip()
+    text = re.sub(r"^```[a-zA-Z0-9_-]*\s*", "", text)
+    text = re.sub(r"\s*```$", "", text)
+    return text.strip()
+
+
+def extract_json_block(text: str):
+    cleaned = clean_code_fence(text)
+    start = cleaned.find("{")
+    end = cleaned.rfind("}")
+    if start != -1 and end != -1 and end > start:
+        return cleaned[start:end+1]
+    return None
+
+
+def heuristic_split(raw: str) -> tuple[str, str]:
+    cleaned = clean_code_fence(raw)
+    m_k = re.search(r'"?korean"?\s*:\s*"?(.*?)"?\s*(?:,|\n|$)', cleaned, flags=re.S|re.I)
+    m_t = re.search(r'"?(translation|filipino|english)"?\s*:\s*"?(.*?)"?\s*(?:,|\n|$)', cleaned, flags=re.S|re.I)
+    if m_k and m_t:
+        return (m_k.group(1).strip(), m_t.group(2).strip())
+    m1 = re.search(r"원본\(한국어\)\s*:?\s*(.+?)\n+\s*번역\(.+?\)\s*:\s*(.+)$", cleaned, flags=re.S)
+    if m1:
+        return (m1.group(1).strip(), m1.group(2).strip())
+    return (cleaned.strip(), "")
+
+
+_JSON_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+
+def partial_json_string(buffer: str, key: str) -> str:
+    """
+    Decoded value of `"key": "..."` in a JSON document that may still be
+    streaming in. Returns the prefix decoded so far (stopping before an
+    incomplete escape), or "" when the key has not appeared yet.
+    """
+    m = re.search(r'"%s"\s*:\s*"' % re.escape(key), buffer)
+    if not m:
+        return ""
+    out, i = [], m.end()
+    while i < len(buffer):
+        ch = buffer[i]
+        if ch == '"':
+            break
+        if ch == "\\":
+            if i + 1 >= len(buffer):
+                break
+            esc = buffer[i + 1]
+            if esc == "u":
+                if i + 6 > len(buffer):
+                    break
+                try:
+                    out.append(chr(int(buffer[i + 2:i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+                continue
+            out.append(_JSON_ESCAPES.get(esc, esc))
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def sentences_of(text):
+    chunks = re.split(r'(?<=[.!?])\s+', (text or "").strip())
+    return [s for s in chunks if s]
@@ -0,0 +1,289 @@
+"""
+PyMuPDF document handles, page fingerprints and page rendering (thumbnails, display + OCR).
+
+A page fingerprint hashes what the page draws rather than how the file
+encodes it, so an unchanged page of a revised (or merely re-saved) upload
+keeps its fingerprint.
+Thumbnails, OCR renders and page results (pipeline) are keyed by it.
+"""
+import functools, hashlib, io, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import fitz  # PyMuPDF
+
+from . import config
+from .caches import get_cache_manager
+from .metrics import span
+from .uploads import get_upload_registry
+
+
+class PdfDocumentCache:
+    """
+    Open fitz.Document handles keyed by upload digest, so the xref/object table
+    is parsed once per upload instead of once per render. At most `max_docs`
+    stay open; the least recently used one is closed on eviction.
+    MuPDF is not thread-safe, so all access goes through `document()`, which
+    holds a process-wide lock for the duration of the block.
+    """
+
+    def __init__(self, max_docs: int):
+        self.max_docs = max_docs
+        self._docs = OrderedDict()
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def document(self, pdf_digest: str):
+        with self._lock:
+            doc = self._docs.get(pdf_digest)
+            if doc is None or doc.is_closed:
+                doc = fitz.open(stream=get_upload_registry().get(pdf_digest), filetype="pdf")
+                self._docs[pdf_digest] = doc
+                while len(self._docs) > self.max_docs:
+                    _, evicted = self._docs.popitem(last=False)
+                    evicted.close()
+            self._docs.move_to_end(pdf_digest)
+            yield doc
+
+    def page_count(self, pdf_digest: str) -> int:
+        with self.document(pdf_digest) as doc:
+            return doc.page_count
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._docs), "max_entries": self.max_docs}
+
+    def close(self, pdf_digest: str | None = None) -> None:
+        """Close one document, or every open document when no digest is given."""
+        with self._lock:
+            digests = [pdf_digest] if pdf_digest else list(self._docs)
+            for d in digests:
+                doc = self._docs.pop(d, None)
+                if doc is not None:
+                    doc.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_pdf_documents() -> PdfDocumentCache:
+    docs = PdfDocumentCache(config.PDF_MAX_OPEN_DOCS)
+    get_cache_manager().report("pdf_documents", docs.stats)
+    return docs
+
+
+def page_count(pdf_digest: str) -> int:
+    return get_pdf_documents().page_count(pdf_digest)
+
+
+# ─────────────────────────────────────────────────────────────
+# Page fingerprints
+# ─────────────────────────────────────────────────────────────
+def _r(value) -> float:
+    """Coordinates to 1/100 pt: re-saves may reformat numbers, never move anything."""
+    return round(float(value), 2)
+
+
+def _coords(item) -> tuple:
+    if isinstance(item, fitz.Point):
+        return _r(item.x), _r(item.y)
+    if isinstance(item, (fitz.Rect, fitz.Quad)):
+        return tuple(_r(v) for v in (item if isinstance(item, fitz.Rect) else (*item.ul, *item.ur, *item.ll, *item.lr)))
+    return item
+
+
+def _appearance(doc, xref: int) -> bytes:
+    """Decoded normal appearance stream of an annotation or form field (what gets rendered), or b""."""
+    kind, value = doc.xref_get_key(xref, "AP/N")
+    if kind != "xref":
+        return b""
+    return doc.xref_stream(int(value.split()[0])) or b""
+
+
+def _fingerprint(doc, page_index: int) -> str:
+    """
+    sha256 over what the page draws, as MuPDF interprets it: geometry, every
+    text span (font, size, colour, characters and their positions), every
+    vector path, every image (placement plus a hash of its decoded pixels),
+    its annotations and its form fields (name, value and appearance, so two
+    fillings of the same form differ). Nothing depends on how the file is
+    encoded, so re-saving it (compressed, garbage-collected, cleaned or
+    expanded) keeps every fingerprint. Fonts count by name, not by their
+    embedded bytes.
+    """
+    page = doc.load_page(page_index)
+    h = hashlib.sha256()
+    h.update(repr((_coords(page.rect), page.rotation)).encode())
+    for s in page.get_texttrace():
+        chars = tuple((c[0], c[1], *_coords(fitz.Point(c[2]))) for c in s["chars"])  # (unicode, glyph, origin, bbox)
+        h.update(repr((s["font"], _r(s["size"]), s["color"], s["type"], s.get("opacity"), chars)).encode())
+    for path in page.get_drawings():
+        items = tuple(tuple(_coords(v) for v in item) for item in path["items"])
+        h.update(repr((path.get("type"), path.get("color"), path.get("fill"), _r(path.get("width") or 0),
+                       path.get("fill_opacity"), path.get("stroke_opacity"), items)).encode())
+    for image in page.get_image_info(hashes=True):
+        h.update(repr((_coords(fitz.Rect(image["bbox"])), tuple(_r(v) for v in image["transform"]),
+                       image["has-mask"], image["digest"])).encode())
+    for annot in page.annots():
+        h.update(repr((annot.type, _coords(annot.rect), annot.info.get("content"))).encode())
+        h.update(_appearance(doc, annot.xref))
+    for widget in page.widgets():
+        h.update(repr((widget.field_name, widget.field_type, widget.field_value, _coords(widget.rect))).encode())
+        h.update(_appearance(doc, widget.xref))
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=8192)
+def page_fingerprint(pdf_digest: str, page_index: int) -> str:
+    """Content fingerprint of one page (memoized: a digest's pages never change)."""
+    with span("fingerprint", page=page_index + 1):
+        with get_pdf_documents().document(pdf_digest) as doc:
+            return _fingerprint(doc, page_index)
+
+
+def page_fingerprints(pdf_digest: str) -> list[str]:
+    return [page_fingerprint(pdf_digest, i) for i in range(page_count(pdf_digest))]
+
+
+def render_page_png(doc, page_index: int, scale: float) -> bytes:
+    """Display render: colour PNG straight from the pixmap (no PIL round trip)."""
+    p = doc.load_page(page_index)
+    return p.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False).tobytes("png")
+
+
+def render_thumbnail(doc, page_index: int, width_px: int) -> bytes:
+    """Small colour preview, `width_px` wide whatever the page size, as JPEG or WebP (THUMB_FORMAT)."""
+    p = doc.load_page(page_index)
+    scale = width_px / max(p.rect.width, 1)
+    pix = p.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csRGB, alpha=False)
+    if config.THUMB_FORMAT == "webp":
+        from PIL import Image
+
+        out = io.BytesIO()
+        Image.frombytes("RGB", (pix.width, pix.height), pix.samples).save(out, "WEBP", quality=config.THUMB_QUALITY)
+        return out.getvalue()
+    return pix.tobytes("jpeg", jpg_quality=config.THUMB_QUALITY)
+
+
+def render_page_for_ocr(doc, page_index: int, scale: float) -> tuple[bytes, str]:
+    """OCR render: capped at OCR_MAX_SIDE_PX, optionally grayscale, encoded by MuPDF directly."""
+    with span("render", page=page_index + 1) as rec:
+        p = doc.load_page(page_index)
+        longest = max(p.rect.width, p.rect.height) * scale
+        if longest > config.OCR_MAX_SIDE_PX:
+            scale *= config.OCR_MAX_SIDE_PX / longest
+        pix = p.get_pixmap(
+            matrix=fitz.Matrix(scale, scale),
+            colorspace=fitz.csGRAY if config.OCR_GRAYSCALE else fitz.csRGB,
+            alpha=False,
+        )
+        rec["pixels"] = pix.width * pix.height
+    with span("encode", format=config.OCR_PAGE_FORMAT) as rec:
+        if config.OCR_PAGE_FORMAT == "jpeg":
+            data, mime = pix.tobytes("jpeg", jpg_quality=config.OCR_JPEG_QUALITY), "image/jpeg"
+        else:
+            data, mime = pix.tobytes("png"), "image/png"
+        rec["bytes"] = len(data)
+    return data, mime
+
+
+def usable_text_layer(text: str) -> bool:
+    """
+    Enough real characters to trust the embedded text. Broken font encodings
+    (common in HWP → PDF exports) come out as U+FFFD / private-use glyphs, so
+    a page dominated by those goes to OCR instead.
+    """
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < config.PDF_TEXT_MIN_CHARS:
+        return False
+    garbled = sum(1 for c in chars if c == "\ufffd" or "\ue000" <= c <= "\uf8ff")
+    return garbled / len(chars) < 0.1
+
+
+def extract_text_layer(pdf_digest: str, page_index: int) -> str | None:
+    """The page's embedded text in reading order, or None when it should be OCR'd."""
+    if not config.PDF_TEXT_LAYER:
+        return None
+    with span("text_layer", page=page_index + 1) as rec:
+        with get_pdf_documents().document(pdf_digest) as doc:
+            text = doc.load_page(page_index).get_text("text", sort=True)
+        text = "\n".join(line.rstrip() for line in text.strip().splitlines())
+        rec["chars"], rec["usable"] = len(text), usable_text_layer(text)
+    return text if rec["usable"] else None
+
+
+class ThumbnailCache:
+    """
+    Page previews keyed by page fingerprint, in a memory cache of their
+    own (separate from the OCR renders, byte-bounded, with a TTL), so paging
+    through a long document keeps memory flat. `prefetch()` renders pages
+    ahead of the viewer on one background thread.
+    """
+
+    def __init__(self, width_px: int):
+        self.width_px = width_px
+        self._thumbs = get_cache_manager().memory_cache(
+            "thumbnails", config.THUMB_CACHE_MB, ttl_seconds=config.THUMB_CACHE_TTL_S,
+        )
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scantranslate-thumbs")
+
+    def _key(self, pdf_digest: str, page_index: int) -> tuple:
+        return page_fingerprint(pdf_digest, page_index), self.width_px, config.THUMB_FORMAT, config.THUMB_QUALITY
+
+    def get(self, pdf_digest: str, page_index: int) -> bytes:
+        key = self._key(pdf_digest, page_index)
+        data = self._thumbs.get(key)
+        if data is None:
+            with get_pdf_documents().document(pdf_digest) as doc:
+                data = render_thumbnail(doc, page_index, self.width_px)
+            self._thumbs.put(key, data)
+        return data
+
+    def prefetch(self, pdf_digest: str, page_indices) -> None:
+        """Render the given pages in the background unless cached or already queued."""
+        with self._lock:
+            todo = [(pdf_digest, i) for i in page_indices
+                    if (pdf_digest, i) not in self._pending and self._key(pdf_digest, i) not in self._thumbs]
+            self._pending.update(todo)
+        for key in todo:
+            self._prefetcher.submit(self._prefetch_one, key)
+
+    def _prefetch_one(self, key) -> None:
+        try:
+            self.get(*key)
+        except Exception:
+            pass  # the upload may be gone by now; the viewer renders on demand anyway
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
+@functools.lru_cache(maxsize=None)
+def get_thumbnails() -> ThumbnailCache:
+    return ThumbnailCache(config.THUMB_WIDTH_PX)
+
+
+def render_page(pdf_digest: str, page_index: int, scale: float = 1.2) -> bytes:
+    with get_pdf_documents().document(pdf_digest) as doc:
+        return render_page_png(doc, page_index, scale)
+
+
+def render_page_ref(pdf_digest: str, page_index: int, scale: float = 1.4) -> tuple[str, str]:
+    """
+    Render a page for OCR and register it; returns (page image digest, mime).
+    Renders are remembered by page fingerprint, so the same page in another
+    upload (a revised file) is not rendered again while its image is still registered.
+    """
+    registry = get_upload_registry()
+    refs = get_cache_manager().memory_cache("page_renders", 1, sizeof=lambda ref: 128)  # ~8k (digest, mime) refs
+    key = (page_fingerprint(pdf_digest, page_index), scale, config.OCR_MAX_SIDE_PX, config.OCR_GRAYSCALE,
+           config.OCR_PAGE_FORMAT, config.OCR_JPEG_QUALITY)
+    ref = refs.get(key)
+    if ref is not None and ref[0] in registry:
+        return ref
+    with get_pdf_documents().document(pdf_digest) as doc:
+        data, mime = render_page_for_ocr(doc, page_index, scale)
+    ref = (registry.put(data), mime)
+    refs.put(key, ref)
+    return ref
@@ -0,0 +1,820 @@
+"""
+OCR → translation pipeline, independent of Streamlit.
+
+    stage 1  image → Korean text        (keyed by image hash + model; vision call through
+                                         the OCR_MODELS cascade, cheapest model first;
+                                         skipped for PDF pages with a text layer)
+    stage 2  Korean text → target text  (keyed by text hash + language; text-only call;
+                                         sentences in the translation memory are reused)
+
+Finished PDF pages are also cached whole, by page fingerprint (pdf.py), so
+the unchanged pages of a revised upload skip text extraction, rendering and
+both stages.
+
+Both stages check the persistent ResultCache before calling Gemini, and raise
+on failure so errors are never cached. `OcrStream` / `translate_text_stream`
+are incremental versions of the two stages for the interactive UI. Page- and
+file-level helpers never raise; failures are recorded on the result dict
+instead. Every stage reports timings, tokens and cache outcomes to `metrics`.
+"""
+import json, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from google.genai.types import GenerateContentConfig, Part
+from pydantic import ValidationError
+
+from . import config
+from .cache import ResultCache, get_result_cache
+from .images import prepare_image_ref
+from .memory import align, get_translation_memory
+from .metrics import count, span, usage_fields
+from .parsing import clean_code_fence, extract_json_block, heuristic_split, partial_json_string
+from .pdf import extract_text_layer, page_count, page_fingerprint, render_page_ref
+from .regions import crop_regions, image_region_plan, pdf_page_region_plan
+from .schemas import OcrResult, SentenceTranslations
+from .uploads import get_upload_registry, hash_bytes
+
+
+class GeminiUnavailable(RuntimeError):
+    """Raised by the pipeline stages when there is no client; never cached."""
+
+    def __init__(self, message: str = "Gemini client is not configured (GEMINI_API_KEY)."):
+        super().__init__(message)
+
+
+def _result(page: int = 1) -> dict:
+    return {"page": page, "korean": "", "target": "", "confidence": None, "error": None, "source": "ocr"}
+
+
+_OCR_PROMPT = (
+    "Perform OCR on the image (Korean expected). Put the recognized text in 'korean' "
+    "and your confidence (0-100) in 'confidence'. "
+    "Do not translate. Preserve line breaks in 'korean'."
+)
+
+# Structured output: the reply is JSON matching OcrResult, read from response.parsed
+_OCR_CONFIG = GenerateContentConfig(response_mime_type="application/json", response_schema=OcrResult)
+_UNITS_CONFIG = GenerateContentConfig(response_mime_type="application/json", response_schema=SentenceTranslations)
+
+
+def _ocr_key(image_digest: str, model: str) -> str:
+    return ResultCache.make_key("ocr", image_digest, model, config.OCR_PROMPT_VERSION)
+
+
+def _cascade_spec() -> str:
+    """What decides which tier's answer is kept; part of keys for results built from the cascade."""
+    return f"{','.join(config.OCR_MODELS)}@{config.OCR_ESCALATE_BELOW:g}"
+
+
+def _ocr_contents(image_digest: str, mime_type: str) -> list:
+    image_part = Part.from_bytes(data=get_upload_registry().get(image_digest), mime_type=mime_type)
+    return [_OCR_PROMPT, image_part]
+
+
+def _confidence(value) -> int | None:
+    try:
+        return max(0, min(100, int(round(float(value))))) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_ocr(raw: str, parsed=None) -> tuple[str, int | None, str]:
+    with span("parse") as rec:
+        korean_result, conf, rec["parse_path"] = _parse_ocr_reply(raw, parsed)
+    count("parse", path=rec["parse_path"])
+    return korean_result, conf, rec["parse_path"]
+
+
+def _parse_ocr_reply(raw: str, parsed=None) -> tuple[str, int | None, str]:
+    """
+    (korean, confidence, parse path). The path is "schema" for a reply that
+    validates against OcrResult (the normal case with structured output);
+    "json" and "heuristic" are the counted fallbacks for anything else.
+    """
+    if not isinstance(parsed, OcrResult):
+        try:
+            parsed = OcrResult.model_validate_json(raw)
+        except ValidationError:
+            parsed = None
+    if parsed is not None:
+        return parsed.korean.strip(), _confidence(parsed.confidence), "schema"
+
+    json_block = extract_json_block(raw)
+    korean_result, conf = "", None
+
+    if json_block:
+        try:
+            data = json.loads(json_block)
+            korean_result = (data.get("korean") or "").strip()
+            conf = _confidence(data.get("confidence", None))
+        except Exception:
+            korean_result, _ = heuristic_split(raw)
+            return korean_result, conf, "heuristic"
+    else:
+        korean_result, _ = heuristic_split(raw)
+        return korean_result, conf, "heuristic"
+    return korean_result, conf, "json"
+
+
+def _finish_reason(response) -> str | None:
+    """"STOP", "MAX_TOKENS", ... from the first candidate, when the response reports one."""
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return getattr(reason, "name", reason)
+
+
+def _tier_result(raw: str, parsed, finish_reason) -> dict:
+    korean_result, conf, parse_path = _parse_ocr(raw, parsed)
+    return {
+        "korean": korean_result, "confidence": conf, "parse_path": parse_path,
+        "truncated": finish_reason == "MAX_TOKENS",
+    }
+
+
+def _degraded(out: dict) -> bool:
+    """A truncated or non-schema reply: escalated, or kept for this run only when it is the last tier's."""
+    return bool(out.get("truncated")) or out.get("parse_path") != "schema"
+
+
+def _tier_hit(hit: dict | None, tier: int) -> dict | None:
+    """
+    A cached tier answer, or None to call the model. A degraded answer is
+    cached so a lower tier isn't paid for again just to be escalated, but the
+    last tier's is a miss: it would otherwise be kept, unretried, for good.
+    """
+    if hit is None:
+        return None
+    hit = {"parse_path": "schema", "truncated": False, **hit}
+    return None if _degraded(hit) and tier == len(config.OCR_MODELS) - 1 else hit
+
+
+def _ocr_tier(client, image_digest: str, mime_type: str, model: str, tier: int) -> dict:
+    """
+    One cascade tier: `model`'s OCR of the image as {"korean", "confidence",
+    "parse_path", "truncated"}, cached per model so a later escalation (or a
+    changed threshold) never pays for a tier twice.
+    """
+    disk_cache = get_result_cache()
+    disk_key = _ocr_key(image_digest, model)
+    hit = _tier_hit(disk_cache.get(disk_key), tier)
+    count("cache", stage="ocr", outcome="miss" if hit is None else "hit")
+    if hit is not None:
+        return hit
+
+    if not client:
+        raise GeminiUnavailable()
+
+    with span("ocr_call", model=model, tier=tier) as rec:
+        contents = _ocr_contents(image_digest, mime_type)
+        rec["bytes_sent"] = len(contents[1].inline_data.data)
+        response = client.models.generate_content(
+            model=model,
+            contents=contents,
+            config=_OCR_CONFIG,
+        )
+        rec.update(usage_fields(response))
+    out = _tier_result((response.text or "").strip(), getattr(response, "parsed", None), _finish_reason(response))
+
+    if out["korean"]:
+        disk_cache.put(disk_key, out)
+    return out
+
+
+def _escalation_reason(out: dict) -> str | None:
+    """Why a tier's OCR should go to the next model, or None to keep it."""
+    if out.get("error"):
+        return "error"
+    if out["truncated"]:
+        return "truncated"
+    if out["parse_path"] != "schema":
+        return "parse"
+    if not out["korean"]:
+        return "empty"
+    if out["confidence"] is None or out["confidence"] < config.OCR_ESCALATE_BELOW:
+        return "low_confidence"
+    return None
+
+
+def _cascade(client, image_digest: str, mime_type: str, first: dict | None = None) -> tuple[str, int | None, bool]:
+    """
+    Run config.OCR_MODELS cheapest first until a tier's answer is good enough;
+    the last tier's answer is kept whatever it looks like. Returns (korean,
+    confidence, degraded); a degraded answer is retried on the next run, so
+    nothing built from it should be cached. `first` is tier 0's
+    result when the caller already has it (streamed OCR). Each decision is
+    counted (`ocr_tier`, by model / outcome / reason) and the whole cascade is
+    one "ocr" trace line listing them.
+    """
+    models = config.OCR_MODELS
+    with span("ocr", tiers=len(models)) as rec:
+        decisions = rec["decisions"] = []
+        for tier, model in enumerate(models):
+            last = tier == len(models) - 1
+            if tier == 0 and first is not None:
+                out = first
+            else:
+                try:
+                    out = _ocr_tier(client, image_digest, mime_type, model, tier)
+                except GeminiUnavailable:
+                    raise
+                except Exception as e:
+                    if last:
+                        raise
+                    out = {"error": type(e).__name__}
+            reason = _escalation_reason(out)
+            kept = reason is None or last
+            count("ocr_tier", model=model, outcome="kept" if kept else "escalated", reason=reason or "ok")
+            decisions.append({"model": model, "confidence": out.get("confidence"), "escalated": None if kept else reason})
+            if kept:
+                rec["final_model"] = model
+                return out["korean"], out["confidence"], _degraded(out)
+
+
+def ocr_korean(client, image_digest: str, mime_type: str) -> tuple[str, int | None]:
+    """Stage 1: OCR only, through the model cascade. Returns (korean_text, confidence)."""
+    korean_result, conf, _ = _cascade(client, image_digest, mime_type)
+    return korean_result, conf
+
+
+def _translate_key(korean_text: str, target_lang_name: str) -> str:
+    return ResultCache.make_key(
+        "translate", hash_bytes(korean_text.encode("utf-8")), target_lang_name,
+        config.TRANSLATE_MODEL, config.TRANSLATE_PROMPT_VERSION,
+    )
+
+
+def _translate_prompt(korean_text: str, target_lang_name: str) -> str:
+    return (
+        f"Translate the following Korean text to {target_lang_name}. "
+        "Return ONLY the translation, without notes or markdown/code fences. "
+        "Preserve line breaks.\n\n"
+        f"{korean_text}"
+    )
+
+
+def _translate_units(client, units: list[str], target_lang_name: str) -> list[str] | None:
+    """Translate only the sentences the memory lacks, as a JSON array; None if the reply doesn't line up."""
+    prompt = (
+        f"Translate each Korean sentence in this JSON array to {target_lang_name}. "
+        "Reply with an array of translations with the same length and order.\n\n"
+        f"{json.dumps(units, ensure_ascii=False)}"
+    )
+    with span("translate_call", model=config.TRANSLATE_MODEL, mode="sentences", sentences=len(units)) as rec:
+        rec["bytes_sent"] = len(prompt.encode("utf-8"))
+        response = client.models.generate_content(
+            model=config.TRANSLATE_MODEL, contents=prompt, config=_UNITS_CONFIG,
+        )
+        rec.update(usage_fields(response))
+    translated = getattr(response, "parsed", None)
+    if translated is None:
+        # Counted fallback: dig the array out of the text
+        count("parse", path="json")
+        raw = clean_code_fence(response.text or "")
+        start, end = raw.find("["), raw.rfind("]")
+        try:
+            translated = json.loads(raw[start:end + 1]) if start != -1 and end > start else None
+        except ValueError:
+            return None
+    else:
+        count("parse", path="schema")
+    if not isinstance(translated, list) or len(translated) != len(units):
+        return None
+    return [str(t).strip() for t in translated]
+
+
+def _translate_with_memory(client, korean_text: str, target_lang_name: str) -> str | None:
+    """
+    Reassemble from the translation memory, calling the model only for unseen
+    sentences. None means the memory knew nothing (or the partial reply was
+    unusable) and the whole text should be translated as usual.
+    """
+    if not config.TM_ENABLED:
+        return None
+    plan = get_translation_memory().plan(korean_text, target_lang_name)
+    count("tm_sentences", plan.hits, outcome="hit")
+    count("tm_sentences", len(plan.missing), outcome="miss")
+    if not plan.hits:
+        return None
+    if not plan.missing:
+        return plan.assemble()
+    if not client:
+        raise GeminiUnavailable()
+    translated = _translate_units(client, plan.missing, target_lang_name)
+    if translated is None:
+        return None
+    get_translation_memory().remember(zip(plan.missing, translated), target_lang_name)
+    return plan.assemble(dict(zip(plan.missing, translated)))
+
+
+def _remember(korean_text: str, target_text: str, target_lang_name: str, origin: str = "model") -> None:
+    if config.TM_ENABLED:
+        get_translation_memory().remember(align(korean_text, target_text), target_lang_name, origin=origin)
+
+
+def remember_edits(korean_text: str, target_text: str, target_lang_name: str) -> None:
+    """Feed user-corrected text back into the translation memory; edits win over model output."""
+    _remember(korean_text, target_text, target_lang_name, origin="edit")
+
+
+def translate_text(client, korean_text: str, target_lang_name: str) -> str:
+    """Stage 2: text-only translation of already-extracted Korean."""
+    if not korean_text.strip():
+        return ""
+    if target_lang_name == config.TARGET_LANGUAGES["ko"]["code"]:
+        return korean_text
+
+    disk_cache = get_result_cache()
+    disk_key = _translate_key(korean_text, target_lang_name)
+    hit = disk_cache.get(disk_key)
+    count("cache", stage="translate", outcome="miss" if hit is None else "hit")
+    if hit is not None:
+        return hit["translation"]
+
+    target_result = _translate_with_memory(client, korean_text, target_lang_name)
+    if target_result is None:
+        if not client:
+            raise GeminiUnavailable()
+
+        prompt = _translate_prompt(korean_text, target_lang_name)
+        with span("translate_call", model=config.TRANSLATE_MODEL, mode="text") as rec:
+            rec["bytes_sent"] = len(prompt.encode("utf-8"))
+            response = client.models.generate_content(
+                model=config.TRANSLATE_MODEL,
+                contents=prompt,
+            )
+            rec.update(usage_fields(response))
+        target_result = clean_code_fence(response.text or "")
+        _remember(korean_text, target_result, target_lang_name)
+
+    if target_result:
+        disk_cache.put(disk_key, {"translation": target_result})
+    return target_result
+
+
+def ocr_translate(client, image_digest: str, mime_type: str, target_lang_name: str) -> tuple[str, str, int | None]:
+    """Both stages. Returns (korean, target, confidence); raises on failure."""
+    korean_result, conf = ocr_korean(client, image_digest, mime_type)
+    target_result = translate_text(client, korean_result, target_lang_name)
+    return korean_result, target_result, conf
+
+
+# ─────────────────────────────────────────────────────────────
+# Region OCR (dense / very large pages)
+# ─────────────────────────────────────────────────────────────
+def ocr_korean_regions(client, image_digest: str, boxes, max_workers: int = config.OCR_REGION_WORKERS):
+    """
+    OCR each region of a page concurrently and join them in the given (reading)
+    order. Returns (korean_text, confidence, blocks), where every block has its
+    pixel `bbox`, `korean` and `confidence`. Raises if any region fails.
+    """
+    korean_result, conf, blocks, _ = _ocr_regions(client, image_digest, boxes, max_workers)
+    return korean_result, conf, blocks
+
+
+def _ocr_regions(client, image_digest: str, boxes, max_workers: int = config.OCR_REGION_WORKERS):
+    """`ocr_korean_regions`, plus whether any region's answer was degraded (see `_cascade`)."""
+    disk_cache = get_result_cache()
+    disk_key = ResultCache.make_key(
+        "ocr-regions", image_digest, json.dumps(boxes), _cascade_spec(), config.OCR_PROMPT_VERSION,
+    )
+    hit = disk_cache.get(disk_key)
+    count("cache", stage="ocr_regions", outcome="miss" if hit is None else "hit")
+    if hit is not None:
+        return hit["korean"], hit["confidence"], hit["blocks"], False
+
+    registry = get_upload_registry()
+    with span("encode", format=config.OCR_PAGE_FORMAT, regions=len(boxes)) as rec:
+        encoded = crop_regions(registry.get(image_digest), boxes)
+        rec["bytes"] = sum(len(data) for data, _ in encoded)
+    crops = [(registry.put(data), mime) for data, mime in encoded]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(crops)))) as pool:
+        texts = list(pool.map(lambda c: _cascade(client, *c), crops))
+
+    blocks = [
+        {"bbox": list(box), "korean": korean, "confidence": conf}
+        for box, (korean, conf, _) in zip(boxes, texts)
+    ]
+    degraded = any(d for _, _, d in texts)
+    korean_result = "\n\n".join(b["korean"] for b in blocks if b["korean"])
+    confs = [b["confidence"] for b in blocks if b["confidence"] is not None]
+    conf = min(confs) if confs else None
+
+    if korean_result and not degraded:
+        disk_cache.put(disk_key, {"korean": korean_result, "confidence": conf, "blocks": blocks})
+    return korean_result, conf, blocks, degraded
+
+
+def ocr_translate_regions(client, image_digest: str, boxes, target_lang_name: str):
+    """Region OCR + one translation of the merged text. Returns (korean, target, confidence, blocks)."""
+    korean_result, conf, blocks = ocr_korean_regions(client, image_digest, boxes)
+    return korean_result, translate_text(client, korean_result, target_lang_name), conf, blocks
+
+
+# ─────────────────────────────────────────────────────────────
+# Streaming variants (same cache keys; final text is cached once complete)
+# ─────────────────────────────────────────────────────────────
+class OcrStream:
+    """
+    Iterate to get the Korean text as it arrives (decoded from the partial JSON
+    reply); once exhausted, `korean` and `confidence` hold the parsed result,
+    exactly as `ocr_korean` would have returned them (`degraded` as `_cascade`
+    reports it). Only the first cascade
+    tier is streamed: when it is escalated, the stronger model's answer (not
+    streamed) replaces it in `korean`.
+    """
+
+    def __init__(self, client, image_digest: str, mime_type: str):
+        self.client = client
+        self.image_digest = image_digest
+        self.mime_type = mime_type
+        self.korean = ""
+        self.confidence = None
+        self.degraded = False
+
+    def __iter__(self):
+        model = config.OCR_MODELS[0]
+        disk_cache = get_result_cache()
+        disk_key = _ocr_key(self.image_digest, model)
+        first = _tier_hit(disk_cache.get(disk_key), 0)
+        count("cache", stage="ocr", outcome="miss" if first is None else "hit")
+        if first is not None:
+            yield first["korean"]
+        else:
+            if not self.client:
+                raise GeminiUnavailable()
+            first = yield from self._stream(model, disk_cache, disk_key)
+        # The parsed (or escalated) text may differ from what was streamed;
+        # callers should display `korean` afterwards.
+        self.korean, self.confidence, self.degraded = _cascade(self.client, self.image_digest, self.mime_type, first=first)
+
+    def _stream(self, model: str, disk_cache, disk_key):
+        raw, shown, finish_reason = "", "", None
+        try:
+            with span("ocr_call", model=model, tier=0, streamed=True) as rec:
+                contents = _ocr_contents(self.image_digest, self.mime_type)
+                rec["bytes_sent"] = len(contents[1].inline_data.data)
+                t0 = time.perf_counter()
+                for chunk in self.client.models.generate_content_stream(
+                    model=model, contents=contents, config=_OCR_CONFIG,
+                ):
+                    rec.setdefault("first_chunk_ms", round((time.perf_counter() - t0) * 1000, 2))
+                    rec.update(usage_fields(chunk))
+                    finish_reason = _finish_reason(chunk) or finish_reason
+                    raw += chunk.text or ""
+                    partial = partial_json_string(raw, "korean")
+                    if len(partial) > len(shown):
+                        yield partial[len(shown):]
+                        shown = partial
+        except Exception as e:
+            if len(config.OCR_MODELS) == 1:
+                raise
+            return {"error": type(e).__name__}  # the cascade escalates
+        out = _tier_result(raw.strip(), None, finish_reason)
+        if out["korean"]:
+            disk_cache.put(disk_key, out)
+        return out
+
+
+def translate_text_stream(client, korean_text: str, target_lang_name: str):
+    """Stage 2 as a generator of text deltas; caches the full translation when the stream completes."""
+    if not korean_text.strip():
+        return
+    if target_lang_name == config.TARGET_LANGUAGES["ko"]["code"]:
+        yield korean_text
+        return
+
+    disk_cache = get_result_cache()
+    disk_key = _translate_key(korean_text, target_lang_name)
+    hit = disk_cache.get(disk_key)
+    count("cache", stage="translate", outcome="miss" if hit is None else "hit")
+    if hit is not None:
+        yield hit["translation"]
+        return
+
+    remembered = _translate_with_memory(client, korean_text, target_lang_name)
+    if remembered is not None:
+        if remembered:
+            disk_cache.put(disk_key, {"translation": remembered})
+        yield remembered
+        return
+
+    if not client:
+        raise GeminiUnavailable()
+
+    raw = ""
+    prompt = _translate_prompt(korean_text, target_lang_name)
+    with span("translate_call", model=config.TRANSLATE_MODEL, mode="text", streamed=True) as rec:
+        rec["bytes_sent"] = len(prompt.encode("utf-8"))
+        t0 = time.perf_counter()
+        for chunk in client.models.generate_content_stream(model=config.TRANSLATE_MODEL, contents=prompt):
+            rec.setdefault("first_chunk_ms", round((time.perf_counter() - t0) * 1000, 2))
+            rec.update(usage_fields(chunk))
+            text = chunk.text or ""
+            raw += text
+            if text:
+                yield text
+
+    target_result = clean_code_fence(raw)
+    _remember(korean_text, target_result, target_lang_name)
+    if target_result:
+        disk_cache.put(disk_key, {"translation": target_result})
+
+
+# ─────────────────────────────────────────────────────────────
+# Page / file units (never raise)
+# ─────────────────────────────────────────────────────────────
+def _page_key(fingerprint: str, target_lang_name: str) -> str:
+    """A PDF page's result: its content plus every setting that shapes how it is read and translated."""
+    return ResultCache.make_key(
+        "page", fingerprint, target_lang_name, config.PDF_TEXT_LAYER, config.PDF_TEXT_MIN_CHARS,
+        config.OCR_REGIONS, config.OCR_REGION_TILE_PX, config.OCR_REGION_RENDER_SCALE, config.OCR_MAX_SIDE_PX,
+        config.OCR_GRAYSCALE, config.OCR_PAGE_FORMAT, config.OCR_JPEG_QUALITY, _cascade_spec(),
+        config.OCR_PROMPT_VERSION, config.TRANSLATE_MODEL, config.TRANSLATE_PROMPT_VERSION,
+    )
+
+
+_PAGE_FIELDS = ("korean", "target", "confidence", "source", "regions")
+
+
+def _cached_page(fingerprint: str, target_lang_name: str) -> tuple[str, dict | None]:
+    """(page cache key, the cached page result or None)."""
+    key = _page_key(fingerprint, target_lang_name)
+    hit = get_result_cache().get(key)
+    count("cache", stage="page", outcome="miss" if hit is None else "hit")
+    return key, hit
+
+
+def _cache_page(key: str, result: dict, degraded: bool = False) -> None:
+    if result["korean"] and not result["error"] and not degraded:
+        get_result_cache().put(key, {k: result[k] for k in _PAGE_FIELDS if k in result})
+
+
+def ocr_pdf_page(client, pdf_digest: str, page_index: int, target_lang_name: str) -> dict:
+    """
+    Translate one page: reused whole when a page with the same fingerprint was
+    done before (`reused` is set), otherwise straight from its text layer when
+    it has one, else render + OCR (by region when the page calls for it).
+    Failures are kept on the page result.
+    """
+    result = _result(page_index + 1)
+    try:
+        result["fingerprint"] = page_fingerprint(pdf_digest, page_index)
+        page_key, hit = _cached_page(result["fingerprint"], target_lang_name)
+        if hit is not None:
+            result.update(hit, reused=True)
+            return result
+        korean = extract_text_layer(pdf_digest, page_index)
+        plan = pdf_page_region_plan(pdf_digest, page_index) if korean is None else None
+        degraded = False
+        if korean is not None:
+            # No OCR involved, so there is no OCR confidence to report
+            result.update(korean=korean, target=translate_text(client, korean, target_lang_name) or "", source="text")
+        elif plan is not None:
+            korean, conf, blocks, degraded = _ocr_regions(client, *plan)
+            target = translate_text(client, korean, target_lang_name)
+            result.update(korean=korean or "", target=target or "", confidence=conf, regions=blocks)
+        else:
+            page_digest, page_mime = render_page_ref(pdf_digest, page_index, 1.4)
+            korean, conf, degraded = _cascade(client, page_digest, page_mime)
+            target = translate_text(client, korean, target_lang_name)
+            result.update(korean=korean or "", target=target or "", confidence=conf)
+        _cache_page(page_key, result, degraded)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def ocr_image(client, image_digest: str, mime: str, target_lang_name: str) -> dict:
+    """Prepare + OCR one uploaded picture (by region when it calls for it); same result shape as a PDF page."""
+    result = _result()
+    try:
+        plan = image_region_plan(image_digest)
+        if plan is not None:
+            korean, target, conf, blocks = ocr_translate_regions(client, *plan, target_lang_name)
+            result.update(korean=korean or "", target=target or "", confidence=conf, regions=blocks)
+            return result
+        prepared_digest, prepared_mime = prepare_image_ref(image_digest, mime)
+        korean, target, conf = ocr_translate(client, prepared_digest, prepared_mime, target_lang_name)
+        result.update(korean=korean or "", target=target or "", confidence=conf)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def ocr_translate_pages(client, pdf_digest: str, page_indices, target_lang_name: str,
+                        on_progress=None, max_workers: int = config.PDF_MAX_WORKERS) -> list[dict]:
+    """
+    Fan pages out to a bounded thread pool so wall-clock time tracks the slowest
+    page instead of the sum of all pages. Results come back in page order;
+    `on_progress(done, total, result)` is called from the calling thread.
+    """
+    page_indices = list(page_indices)
+    if not page_indices:
+        return []
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(page_indices)))) as pool:
+        futures = {
+            pool.submit(ocr_pdf_page, client, pdf_digest, i, target_lang_name): i
+            for i in page_indices
+        }
+        for done, fut in enumerate(as_completed(futures), start=1):
+            results[futures[fut]] = fut.result()
+            if on_progress:
+                on_progress(done, len(page_indices), results[futures[fut]])
+    return [results[i] for i in page_indices]
+
+
+def merge_page_results(page_results: list[dict], page_label: str = "Page") -> tuple[str, str, int | None]:
+    """Join per-page results into one (korean, target, confidence) triple, page headers included."""
+    korean_parts, target_parts, confs = [], [], []
+    for r in page_results:
+        header = f"[{page_label} {r['page']}]"
+        if r["error"]:
+            korean_parts.append(f"{header}\n⚠️ {r['error']}")
+            target_parts.append(header)
+            continue
+        korean_parts.append(f"{header}\n{r['korean']}")
+        target_parts.append(f"{header}\n{r['target']}")
+        if r["confidence"] is not None:
+            confs.append(r["confidence"])
+    # The weakest page bounds how much the whole document can be trusted
+    conf = min(confs) if confs else None
+    return "\n\n".join(korean_parts), "\n\n".join(target_parts), conf
+
+
+# ─────────────────────────────────────────────────────────────
+# Interactive document (run as a background job by the app)
+# ─────────────────────────────────────────────────────────────
+def process_document(client, upload_digest: str, mime: str, target_lang_name: str,
+                     page_index: int = 0, page_indices=None, stream: bool = False, job=None) -> dict:
+    """
+    Everything the single-document flow does after submit: an image, one PDF
+    page (page cache → text layer → region OCR → render + OCR) or a list of PDF pages.
+    Returns {"korean", "target", "confidence", "page_results"}; multi-page runs
+    leave the merged text to the caller (page headers are localized there).
+    Single-document failures raise. With `stream`, OCR and translation text is
+    appended to `job.partial` ("korean" / "target") as it arrives.
+    """
+    out = {"korean": None, "target": None, "confidence": None, "page_results": []}
+    if page_indices:
+        def _on_page_done(done, total, _result):
+            if job is not None:
+                job.set_progress(done, total)
+        out["page_results"] = ocr_translate_pages(client, upload_digest, page_indices, target_lang_name,
+                                                  on_progress=_on_page_done)
+        return out
+
+    image_digest = image_mime = plan = page_key = None
+    page = _result(page_index + 1)  # what goes to the page cache for a PDF page
+    if mime == "application/pdf":
+        page_key, hit = _cached_page(page_fingerprint(upload_digest, page_index), target_lang_name)
+        if hit is not None:
+            out.update(korean=hit["korean"], target=hit["target"], confidence=hit.get("confidence"))
+            return out
+        korean = extract_text_layer(upload_digest, page_index)
+        if korean is not None:
+            out.update(korean=korean, target=_translate_streamed(client, korean, target_lang_name, stream, job))
+            _cache_page(page_key, {**page, "korean": korean, "target": out["target"], "source": "text"})
+            return out
+        plan = pdf_page_region_plan(upload_digest, page_index)
+        if plan is None:
+            image_digest, image_mime = render_page_ref(upload_digest, page_index, 1.4)
+    else:
+        plan = image_region_plan(upload_digest)
+        if plan is None:
+            # Passed through untouched unless it is an oversize scan
+            image_digest, image_mime = prepare_image_ref(upload_digest, mime)
+
+    if plan is not None:
+        korean, conf, page["regions"], degraded = _ocr_regions(client, *plan)
+        target = translate_text(client, korean, target_lang_name)
+    elif stream and job is not None:
+        ocr_stream = OcrStream(client, image_digest, image_mime)
+        for delta in ocr_stream:
+            job.append("korean", delta)
+        korean, conf, degraded = ocr_stream.korean, ocr_stream.confidence, ocr_stream.degraded
+        job.update(korean=korean)  # the parsed text may differ from what was streamed
+        target = _translate_streamed(client, korean, target_lang_name, stream, job)
+    else:
+        korean, conf, degraded = _cascade(client, image_digest, image_mime)
+        target = translate_text(client, korean, target_lang_name)
+    out.update(korean=korean or "", target=target or "", confidence=conf)
+    if page_key:
+        _cache_page(page_key, {**page, "korean": out["korean"], "target": out["target"], "confidence": conf}, degraded)
+    return out
+
+
+def _translate_streamed(client, korean_text: str, target_lang_name: str, stream: bool, job) -> str:
+    if not (stream and job is not None):
+        return translate_text(client, korean_text, target_lang_name) or ""
+    raw = ""
+    for delta in translate_text_stream(client, korean_text, target_lang_name):
+        raw += delta
+        job.append("target", delta)
+    # The same text translate_text returns (and the cache holds): no code fence, trimmed
+    target = raw if target_lang_name == config.TARGET_LANGUAGES["ko"]["code"] else clean_code_fence(raw)
+    job.update(target=target)
+    return target
+
+
+# ─────────────────────────────────────────────────────────────
+# Batch job queue
+# ─────────────────────────────────────────────────────────────
+class BatchJobQueue:
+    """
+    Content-deduplicated batch of OCR jobs. Identical files (by SHA-256) share one
+    job. Every picture and every PDF page is a separate work unit, and all units
+    share one bounded pool, so throughput scales with `max_workers`, not file count.
+    """
+
+    def __init__(self):
+        self.jobs = OrderedDict()  # digest -> job dict
+        self.duplicates = 0
+
+    def add(self, name: str, data: bytes, mime: str) -> None:
+        digest = get_upload_registry().put(data)
+        job = self.jobs.get(digest)
+        if job is not None:
+            job["files"].append(name)
+            self.duplicates += 1
+            return
+        self.jobs[digest] = {
+            "files": [name], "digest": digest, "mime": mime,
+            "status": "queued", "pages": [], "pending": 0,
+        }
+
+    def _units(self):
+        for job in self.jobs.values():
+            if job["mime"] == "application/pdf":
+                try:
+                    indices = range(page_count(job["digest"]))
+                    if not indices:
+                        raise ValueError("PDF has no pages")  # nothing would ever finish it
+                except Exception as e:
+                    job["status"] = "failed"
+                    job["pages"] = [{**_result(), "error": str(e)}]
+                    continue
+                for i in indices:
+                    yield job, i
+            else:
+                yield job, None
+
+    def run(self, client, target_lang_name: str, on_update=None,
+            max_workers: int = config.BATCH_MAX_WORKERS, job=None) -> "BatchJobQueue":
+        """
+        Process every job. `on_update(done_units, total_units)` is called from
+        the calling thread. Run as a background job (jobs.py), the job's
+        progress and its `rows` partial follow along, and its result is the
+        finished queue.
+        """
+        units = list(self._units())
+        for item, _ in units:
+            item["pending"] += 1
+        if job is not None:
+            job.update(rows=self.rows())
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(units) or 1))) as pool:
+            futures = {}
+            for item, page_index in units:
+                if page_index is None:
+                    fut = pool.submit(ocr_image, client, item["digest"], item["mime"], target_lang_name)
+                else:
+                    fut = pool.submit(ocr_pdf_page, client, item["digest"], page_index, target_lang_name)
+                futures[fut] = item
+                item["status"] = "running"
+            for done, fut in enumerate(as_completed(futures), start=1):
+                item = futures[fut]
+                item["pages"].append(fut.result())
+                item["pending"] -= 1
+                if item["pending"] == 0:
+                    item["pages"].sort(key=lambda r: r["page"])
+                    errors = sum(1 for r in item["pages"] if r["error"])
+                    item["status"] = "done" if not errors else ("failed" if errors == len(item["pages"]) else "partial")
+                if on_update:
+                    on_update(done, len(units))
+                if job is not None:
+                    job.set_progress(done, len(units))
+                    job.update(rows=self.rows())
+        return self
+
+    def rows(self) -> list[dict]:
+        """Status table rows (one per unique file)."""
+        rows = []
+        for job in self.jobs.values():
+            confs = [r["confidence"] for r in job["pages"] if r["confidence"] is not None]
+            rows.append({
+                "file": ", ".join(job["files"]),
+                "status": job["status"],
+                "pages": len(job["pages"]) or None,
+                "confidence": min(confs) if confs else None,
+            })
+        return rows
+
+    def results(self) -> list[dict]:
+        """Flat per-page results, in upload order, for export."""
+        return [
+            {"file": ", ".join(job["files"]), **page}
+            for job in self.jobs.values()
+            for page in job["pages"]
+        ]
@@ -0,0 +1,295 @@
+"""
+Page segmentation for region OCR.
+
+Dense or very large pages are split into blocks that are OCR'd separately and
+merged back in reading order. Block boxes come from a recursive XY-cut over an
+ink mask: a scanned picture's dark pixels, or the word rectangles PyMuPDF
+reports for a PDF page. Cuts only happen in whitespace and are sized
+against the text's line height: section breaks first, then column gutters
+that run the full height of a multi-line block, never inside one line.
+"""
+import io
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image, ImageOps
+
+from . import config
+from .pdf import get_pdf_documents
+from .uploads import get_upload_registry
+
+# Segmentation runs on a reduced copy; boxes are scaled back afterwards
+_ANALYSIS_SIDE_PX = 1200
+_INK_THRESHOLD = 160
+_PAD_PX = 8
+# Measured in text line heights: the narrowest column gutter (word spaces are
+# well under one) and the narrowest row gap taken as a section break, which
+# must also be clearly wider than the usual gap between lines
+_GUTTER_LINES = 1.0
+_SECTION_GAP_LINES = 0.8
+_SECTION_GAP_SPACING = 1.8
+_COLUMN_MIN_LINES = 3  # lines each side of a gutter needs before it counts as a column
+
+
+def _runs(mask: np.ndarray) -> list[tuple[int, int]]:
+    """(start, end) of every run of True in a 1-D mask."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def _gaps(profile: np.ndarray, min_len: float) -> list[tuple[int, int]]:
+    """Internal runs of empty rows/columns at least `min_len` long, widest first."""
+    runs = [(g0, g1) for g0, g1 in _runs(profile == 0) if g0 > 0 and g1 < len(profile) and g1 - g0 >= min_len]
+    return sorted(runs, key=lambda r: r[0] - r[1])
+
+
+def _trim(ink: np.ndarray, box):
+    x0, y0, x1, y1 = box
+    sub = ink[y0:y1, x0:x1]
+    rows, cols = np.flatnonzero(sub.any(axis=1)), np.flatnonzero(sub.any(axis=0))
+    if not len(rows):
+        return None
+    return x0 + cols[0], y0 + rows[0], x0 + cols[-1] + 1, y0 + rows[-1] + 1
+
+
+def line_metrics(ink: np.ndarray) -> tuple[float, float]:
+    """
+    Typical text line height and gap between lines: medians over the inked
+    row runs in narrow vertical strips (a strip mostly sits inside one column,
+    where rows of ink are lines; across columns, misaligned lines would run
+    together).
+    """
+    h, w = ink.shape
+    strip = max(8, w // 16)
+    heights, gaps = [], []
+    for x in range(0, w, strip):
+        runs = _runs(ink[:, x:x + strip].any(axis=1))
+        heights += [r1 - r0 for r0, r1 in runs]
+        gaps += [b0 - a1 for (_, a1), (b0, _) in zip(runs, runs[1:])]
+    height = float(np.median(heights)) if heights else float(h)
+    return height, float(np.median(gaps)) if gaps else height
+
+
+def _lines(ink: np.ndarray, box) -> int:
+    x0, y0, x1, y1 = box
+    return len(_runs(ink[y0:y1, x0:x1].any(axis=1)))
+
+
+def _gutter(ink: np.ndarray, box, line_h: float):
+    """
+    A column gutter of `box` (x0, x1 of the gap, page coordinates), or None.
+    It must run the full height of the box, be at least a line height wide
+    (word spaces are much narrower) and leave several lines of text and a
+    real column width on each side.
+    """
+    x0, y0, x1, y1 = box
+    w = x1 - x0
+    for g0, g1 in _gaps(ink[y0:y1, x0:x1].any(axis=0), line_h * _GUTTER_LINES):
+        if min(g0, w - g1) < w * 0.15:
+            continue
+        left, right = (x0, y0, x0 + g0, y1), (x0 + g1, y0, x1, y1)
+        if min(_lines(ink, left), _lines(ink, right)) >= _COLUMN_MIN_LINES:
+            return x0 + g0, x0 + g1
+    return None
+
+
+def _tile_rows(ink: np.ndarray, box, tile: int) -> list[tuple]:
+    """Cut a single-column box into bands no taller than `tile`, at line gaps where possible."""
+    x0, y0, x1, y1 = box
+    empty_rows = ~ink[y0:y1, x0:x1].any(axis=1)
+    out, top = [], 0
+    while y1 - (y0 + top) > tile:
+        window = empty_rows[top + tile // 2: top + tile]
+        gaps = np.flatnonzero(window)
+        cut = top + tile // 2 + gaps[-1] if len(gaps) else top + tile
+        out.append((x0, y0 + top, x1, y0 + cut))
+        top = cut
+    out.append((x0, y0 + top, x1, y1))
+    return [b for b in (_trim(ink, b) for b in out) if b]
+
+
+def _clear(ink: np.ndarray, box, gutter) -> bool:
+    """Whether `box` has no ink in the x-range of `gutter` (a column gutter continues through it)."""
+    x0, y0, x1, y1 = box
+    return not ink[y0:y1, max(x0, gutter[0]):min(x1, gutter[1])].any()
+
+
+def _xy_cut(ink: np.ndarray, box, tile: int, line_h: float, section_gap: float, depth: int = 0) -> list[tuple]:
+    box = _trim(ink, box)
+    if box is None:
+        return []
+    x0, y0, x1, y1 = box
+    if y1 - y0 <= line_h * 1.5:
+        return [box]  # a single line is never split (word spaces are not columns)
+
+    if depth < 12:
+        # Section breaks first (row gaps well above line spacing), e.g. a
+        # full-width title above two columns; not where a column gutter
+        # carries on across the gap, which would interleave the columns.
+        # _merge_small rejoins the pieces of one column.
+        for g0, g1 in _gaps(ink[y0:y1, x0:x1].any(axis=1), section_gap):
+            top, bottom = (x0, y0, x1, y0 + g0), (x0, y0 + g1, x1, y1)
+            above, below = _gutter(ink, top, line_h), _gutter(ink, bottom, line_h)
+            if (above and _clear(ink, bottom, above)) or (below and _clear(ink, top, below)):
+                continue
+            return (_xy_cut(ink, top, tile, line_h, section_gap, depth + 1)
+                    + _xy_cut(ink, bottom, tile, line_h, section_gap, depth + 1))
+        # Then columns, so a two-column page is read column by column, not line by line
+        gutter = _gutter(ink, box, line_h)
+        if gutter:
+            return (_xy_cut(ink, (x0, y0, gutter[0], y1), tile, line_h, section_gap, depth + 1)
+                    + _xy_cut(ink, (gutter[1], y0, x1, y1), tile, line_h, section_gap, depth + 1))
+    if y1 - y0 > tile:
+        return _tile_rows(ink, box, tile)
+    return [box]
+
+
+def _overlaps(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _merge_small(boxes: list[tuple], tile: int) -> list[tuple]:
+    """
+    Join consecutive boxes of the same column while the union still fits a
+    tile and doesn't reach into any other box (which would then be OCR'd twice).
+    """
+    merged = []
+    for i, b in enumerate(boxes):
+        if merged:
+            m = merged[-1]
+            same_column = b[0] < m[2] and m[0] < b[2]
+            union = (min(m[0], b[0]), min(m[1], b[1]), max(m[2], b[2]), max(m[3], b[3]))
+            others = merged[:-1] + boxes[i + 1:]
+            if (same_column and union[3] - union[1] <= tile and union[2] - union[0] <= tile
+                    and not any(_overlaps(union, o) for o in others)):
+                merged[-1] = union
+                continue
+        merged.append(b)
+    return merged
+
+
+def segment(ink: np.ndarray, tile: int) -> list[tuple]:
+    """Reading-ordered (x0, y0, x1, y1) boxes covering the ink in `ink` (a 2-D bool mask)."""
+    h, w = ink.shape
+    line_h, line_gap = line_metrics(ink)
+    section_gap = max(line_h * _SECTION_GAP_LINES, line_gap * _SECTION_GAP_SPACING)
+    return _merge_small(_xy_cut(ink, (0, 0, w, h), tile, line_h, section_gap), tile)
+
+
+def _scale_boxes(boxes, factor: float, size) -> list[tuple[int, int, int, int]]:
+    w, h = size
+    return [
+        (max(0, int(x0 * factor) - _PAD_PX), max(0, int(y0 * factor) - _PAD_PX),
+         min(w, int(x1 * factor) + _PAD_PX), min(h, int(y1 * factor) + _PAD_PX))
+        for x0, y0, x1, y1 in boxes
+    ]
+
+
+def image_boxes(img: Image.Image) -> list[tuple[int, int, int, int]]:
+    """Region boxes for a picture, in the picture's own pixel coordinates."""
+    factor = max(1.0, max(img.size) / _ANALYSIS_SIDE_PX)
+    small = img.convert("L").resize((max(1, int(img.width / factor)), max(1, int(img.height / factor))))
+    ink = np.asarray(small) < _INK_THRESHOLD
+    return _scale_boxes(segment(ink, int(config.OCR_REGION_TILE_PX / factor)), factor, img.size)
+
+
+def pdf_text_boxes(page, scale: float, size) -> list[tuple[int, int, int, int]] | None:
+    """
+    Region boxes from the page's text layout (pixels at `scale`), or None when
+    it has no text at all (a scan). Word boxes are used rather than MuPDF's
+    blocks, which join the same baseline across columns into one block.
+    """
+    words = [w for w in page.get_text("words") if w[2] > w[0] and w[3] > w[1]]
+    if not words:
+        return None
+    factor = max(1.0, max(size) / _ANALYSIS_SIDE_PX)
+    k = scale / factor
+    ink = np.zeros((int(size[1] / factor) + 1, int(size[0] / factor) + 1), dtype=bool)
+    for x0, y0, x1, y1, *_ in words:
+        ink[int(y0 * k):int(y1 * k) + 1, int(x0 * k):int(x1 * k) + 1] = True
+    return _scale_boxes(segment(ink, int(config.OCR_REGION_TILE_PX / factor)), factor, size)
+
+
+def pdf_scan_boxes(page, scale: float, size) -> list[tuple[int, int, int, int]]:
+    """
+    Region boxes for a page without text (pixels at `scale`), segmented from a
+    grayscale render at the analysis size only, not the full OCR render.
+    """
+    factor = max(1.0, max(size) / _ANALYSIS_SIDE_PX)
+    k = scale / factor
+    pix = page.get_pixmap(matrix=fitz.Matrix(k, k), colorspace=fitz.csGRAY, alpha=False)
+    ink = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width) < _INK_THRESHOLD
+    return _scale_boxes(segment(ink, int(config.OCR_REGION_TILE_PX / factor)), factor, size)
+
+
+def _multi_column(boxes) -> bool:
+    return any(
+        a[1] < b[3] and b[1] < a[3] and (a[2] <= b[0] or b[2] <= a[0])
+        for i, a in enumerate(boxes) for b in boxes[i + 1:]
+    )
+
+
+def use_regions(boxes, size) -> bool:
+    """Whether region OCR applies, per SCANTRANSLATE_OCR_REGIONS (off | auto | on)."""
+    if len(boxes) < 2 or config.OCR_REGIONS == "off":
+        return False
+    if config.OCR_REGIONS == "on":
+        return True
+    return max(size) > config.OCR_MAX_SIDE_PX or _multi_column(boxes)
+
+
+def _encode_crop(crop: Image.Image) -> tuple[bytes, str]:
+    crop.thumbnail((config.OCR_MAX_SIDE_PX, config.OCR_MAX_SIDE_PX), Image.LANCZOS)
+    out = io.BytesIO()
+    if config.OCR_PAGE_FORMAT == "jpeg":
+        crop.save(out, format="JPEG", quality=config.OCR_JPEG_QUALITY)
+        return out.getvalue(), "image/jpeg"
+    crop.save(out, format="PNG")
+    return out.getvalue(), "image/png"
+
+
+def crop_regions(data: bytes, boxes) -> list[tuple[bytes, str]]:
+    """Every region as an OCR-ready image (capped, optionally grayscale); the page is decoded once."""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img).convert("L" if config.OCR_GRAYSCALE else "RGB")
+        return [_encode_crop(img.crop(box)) for box in boxes]
+
+
+def image_region_plan(upload_digest: str):
+    """(image digest, boxes) when an uploaded picture should be OCR'd by region, else None."""
+    if config.OCR_REGIONS == "off":
+        return None
+    with Image.open(io.BytesIO(get_upload_registry().get(upload_digest))) as img:
+        img = ImageOps.exif_transpose(img)
+        boxes = image_boxes(img)
+        size = img.size
+    return (upload_digest, boxes) if use_regions(boxes, size) else None
+
+
+def pdf_page_region_plan(pdf_digest: str, page_index: int):
+    """
+    (page image digest, boxes) when a PDF page should be OCR'd by region, else
+    None. The decision needs no full render (text layout, or a render at the
+    analysis size for a scan); only a page that is split is rendered at
+    OCR_REGION_RENDER_SCALE, without the usual OCR_MAX_SIDE_PX cap, and each
+    crop is capped on its own instead.
+    """
+    if config.OCR_REGIONS == "off":
+        return None
+    scale = config.OCR_REGION_RENDER_SCALE
+    matrix = fitz.Matrix(scale, scale)
+    with get_pdf_documents().document(pdf_digest) as doc:
+        page = doc.load_page(page_index)
+        area = (page.rect * matrix).irect
+        size = (area.width, area.height)  # what get_pixmap(matrix) produces
+        boxes = pdf_text_boxes(page, scale, size)
+        if boxes is None:
+            # Scanned page: no text layout, segment the pixels instead
+            boxes = pdf_scan_boxes(page, scale, size)
+        if not use_regions(boxes, size):
+            return None
+        pix = page.get_pixmap(
+            matrix=matrix, colorspace=fitz.csGRAY if config.OCR_GRAYSCALE else fitz.csRGB, alpha=False,
+        )
+        data = pix.tobytes("png")
+    return get_upload_registry().put(data), boxes
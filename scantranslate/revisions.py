@@ -0,0 +1,56 @@
+"""
+Page-level comparison of two versions of a multi-page document.
+
+Page results carry the page fingerprint (pdf.py), so a revised upload can be
+compared with the previous version page by page: pages are matched by
+fingerprint first (an unchanged page may have moved), and a changed page is
+diffed against the previous version's page at the same position. Only page
+numbers both runs covered are compared, so a run over a wider page scope
+doesn't report the extra pages as new.
+"""
+import difflib
+
+
+def _diff(old: str, new: str, old_label: str, new_label: str) -> str:
+    return "\n".join(difflib.unified_diff(
+        (old or "").splitlines(), (new or "").splitlines(), old_label, new_label, lineterm="", n=1,
+    ))
+
+
+def page_changes(previous: list[dict], current: list[dict]) -> dict | None:
+    """
+    {"unchanged", "changed": [{"page", "previous_page", "korean_diff", "target_diff"}], "removed": [pages]},
+    over the page numbers both versions cover, or None when there is nothing
+    to compare (no shared pages, or no fingerprints). `previous_page` is None
+    for a changed page whose position holds a page that moved elsewhere.
+    """
+    common = {r["page"] for r in previous} & {r["page"] for r in current}
+    previous = [r for r in previous if r["page"] in common]
+    current = [r for r in current if r["page"] in common]
+    if not any(r.get("fingerprint") for r in previous) or not any(r.get("fingerprint") for r in current):
+        return None
+    old_by_fingerprint = {r["fingerprint"]: r for r in previous if r.get("fingerprint")}
+    old_by_page = {r["page"]: r for r in previous}
+    current_fingerprints = {r.get("fingerprint") for r in current}
+
+    unchanged, changed, matched = 0, [], set()
+    for r in current:
+        old = old_by_fingerprint.get(r.get("fingerprint"))
+        if old is not None:
+            unchanged += 1
+            matched.add(old["page"])
+            continue
+        old = old_by_page.get(r["page"])
+        if old is not None and old.get("fingerprint") in current_fingerprints:
+            old = None  # that page still exists elsewhere; this one is new
+        if old is not None:
+            matched.add(old["page"])
+        old_label = f"v1 p{old['page']}" if old else "v1"
+        changed.append({
+            "page": r["page"],
+            "previous_page": old["page"] if old else None,
+            "korean_diff": _diff(old["korean"] if old else "", r["korean"], old_label, f"p{r['page']}"),
+            "target_diff": _diff(old["target"] if old else "", r["target"], old_label, f"p{r['page']}"),
+        })
+    removed = [r["page"] for r in previous if r["page"] not in matched]
+    return {"unchanged": unchanged, "changed": changed, "removed": removed}
@@ -0,0 +1,22 @@
+"""
+Typed reply models for Gemini structured output.
+
+Passed as `response_schema` (with `response_mime_type="application/json"`) so
+the model returns JSON that validates against them. The reply is then read
+from `response.parsed`, or validated from the text when streaming, instead of
+being scraped out of free text.
+"""
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class OcrResult(BaseModel):
+    """Stage 1 reply: the Korean text and an overall confidence (0-100)."""
+
+    korean: str
+    confidence: Optional[float] = None
+
+
+# Stage 2 for memory misses: one translation per input sentence, same order
+SentenceTranslations = list[str]
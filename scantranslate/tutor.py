@@ -0,0 +1,222 @@
+"""
+Learn & Inquire: follow-up questions about the current document.
+
+A `TutorSession` is bound to one document context (Korean text, translation,
+target language). The context is sent to Gemini once: as an explicit context
+cache when it is long enough for one (shared by every session asking about
+the same text), otherwise as the system instruction. Each question then only
+carries the chat so far plus the new turn. Once that history outgrows
+TUTOR_HISTORY_TOKENS the older turns are folded into a running summary, so
+per-question cost stays flat however long the conversation gets.
+
+Answers are cached by (context, focus text, question), so asking the same
+thing about the same text again costs nothing.
+"""
+import functools, hashlib, threading, time
+
+from google.genai.types import Content, CreateCachedContentConfig, GenerateContentConfig, Part
+
+from . import config
+from .cache import ResultCache, get_result_cache
+from .memory import normalize
+from .metrics import count, span, usage_fields
+
+_SYSTEM = "You are a precise bilingual explainer. Answer briefly but clearly."
+_EXPIRY_MARGIN_S = 60  # don't hand out a context cache that is about to expire
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough upper estimate; Hangul runs close to one token per one or two characters."""
+    return len(text or "") // 2 + 1
+
+
+def context_block(context) -> str:
+    if isinstance(context, dict):
+        return (
+            f"[Korean]\n{context.get('korean','')}\n\n"
+            f"[Translation]\n{context.get('target','')}\n\n"
+            f"[Target language]\n{context.get('lang','')}"
+        )
+    return str(context or "")
+
+
+def context_hash(context) -> str:
+    return hashlib.sha256(context_block(context).encode("utf-8")).hexdigest()
+
+
+def _contents_bytes(contents: list) -> int:
+    return sum(len((part.text or "").encode("utf-8")) for c in contents for part in c.parts)
+
+
+def _question_turn(question: str, focus_text: str) -> str:
+    return "\n".join([
+        "=== Focused Text ===",
+        (focus_text or "[None selected]"),
+        "",
+        "=== User Question ===",
+        question.strip(),
+    ])
+
+
+class ContextCaches:
+    """
+    Gemini context caches by (model, context hash), shared by every session in
+    the process. A context the API refuses to cache (too short, model without
+    caching) is remembered, so it is not retried on every question.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._names = {}  # (model, hash) -> (cache name or None, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, client, model: str, context) -> str | None:
+        key = (model, context_hash(context))
+        with self._lock:
+            name, expires_at = self._names.get(key, (None, 0.0))
+            if time.time() < expires_at - _EXPIRY_MARGIN_S:
+                return name
+        name = self._create(client, model, context)
+        with self._lock:
+            self._names[key] = (name, time.time() + self.ttl_seconds)
+        return name
+
+    def _create(self, client, model: str, context) -> str | None:
+        block = context_block(context)
+        if estimate_tokens(block) < config.TUTOR_CACHE_MIN_TOKENS:
+            return None
+        try:
+            with span("tutor_context_cache", model=model) as rec:
+                rec["bytes_sent"] = len(block.encode("utf-8"))
+                cached = client.caches.create(model=model, config=CreateCachedContentConfig(
+                    system_instruction=_SYSTEM,
+                    contents=[Content(role="user", parts=[Part(text=block)])],
+                    ttl=f"{int(self.ttl_seconds)}s",
+                ))
+            return cached.name
+        except Exception:
+            count("tutor_context_cache_failures")
+            return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_context_caches() -> ContextCaches:
+    return ContextCaches(config.TUTOR_CACHE_TTL_S)
+
+
+class TutorSession:
+    """Questions about one document context; keep one per browser session and document."""
+
+    def __init__(self, context, model: str = config.TUTOR_MODEL):
+        self.context = context
+        self.model = model
+        self.context_hash = context_hash(context)
+        self.summary = ""
+        self.summarized_turns = 0  # leading history turns folded into `summary`
+
+    # ── request assembly ──
+    def _answer_key(self, question: str, focus_text: str) -> str:
+        return ResultCache.make_key(
+            "tutor", self.context_hash, hashlib.sha256(normalize(focus_text or "").encode("utf-8")).hexdigest(),
+            hashlib.sha256(normalize(question).encode("utf-8")).hexdigest(), self.model, config.TUTOR_PROMPT_VERSION,
+        )
+
+    def _compact(self, client, history: list) -> list:
+        """
+        The newest turns that fit TUTOR_HISTORY_TOKENS, verbatim; everything
+        before them is folded into `summary` (one summary call per compaction).
+        """
+        if len(history) < self.summarized_turns:  # the chat was cleared
+            self.summary, self.summarized_turns = "", 0
+        kept, used = [], 0
+        for role, text in reversed(history):
+            used += estimate_tokens(text)
+            if used > config.TUTOR_HISTORY_TOKENS and kept:
+                break
+            kept.insert(0, (role, text))
+        while kept and kept[0][0] != "user":  # a chat starts with a user turn
+            kept.pop(0)
+        older = len(history) - len(kept)
+        if older > self.summarized_turns:
+            self._summarize(client, history[self.summarized_turns:older])
+            self.summarized_turns = older
+        return kept
+
+    def _summarize(self, client, turns: list) -> None:
+        transcript = "\n".join(f"{'User' if role == 'user' else 'Tutor'}: {text}" for role, text in turns)
+        prompt = (
+            "Update this summary of a tutoring conversation about a Korean document with the new turns. "
+            "Keep what was asked, what was explained and any terms the learner struggled with. "
+            "At most 150 words; reply with the summary only.\n\n"
+            f"Summary so far:\n{self.summary or '(none)'}\n\nNew turns:\n{transcript}"
+        )
+        try:
+            with span("tutor_summary", model=self.model, turns=len(turns)) as rec:
+                rec["bytes_sent"] = len(prompt.encode("utf-8"))
+                response = client.models.generate_content(model=self.model, contents=prompt)
+                rec.update(usage_fields(response))
+            self.summary = (response.text or "").strip() or self.summary
+        except Exception:
+            # Dropping the oldest turns is the fallback compaction
+            count("tutor_summary_failures")
+
+    def _request(self, client, question: str, focus_text: str, history: list) -> tuple[list, GenerateContentConfig]:
+        contents = []
+        kept = self._compact(client, list(history or []))
+        if self.summary:
+            contents += [
+                Content(role="user", parts=[Part(text=f"Summary of our conversation so far:\n{self.summary}")]),
+                Content(role="model", parts=[Part(text="Understood.")]),
+            ]
+        contents += [Content(role=role, parts=[Part(text=text)]) for role, text in kept]
+        contents.append(Content(role="user", parts=[Part(text=_question_turn(question, focus_text))]))
+
+        cache_name = get_context_caches().get(client, self.model, self.context)
+        if cache_name:
+            return contents, GenerateContentConfig(cached_content=cache_name)
+        return contents, GenerateContentConfig(
+            system_instruction=f"{_SYSTEM}\n\n=== Full Context ===\n{context_block(self.context)}"
+        )
+
+    # ── asking ──
+    def ask(self, client, question: str, focus_text: str = "", history: list | None = None) -> str:
+        """The answer text; raises on API errors (which are never cached)."""
+        disk_cache = get_result_cache()
+        key = self._answer_key(question, focus_text)
+        hit = disk_cache.get(key)
+        count("cache", stage="tutor", outcome="miss" if hit is None else "hit")
+        if hit is not None:
+            return hit["answer"]
+
+        contents, request_config = self._request(client, question, focus_text, history)
+        with span("tutor_call", model=self.model, cached_context=bool(request_config.cached_content)) as rec:
+            rec["bytes_sent"] = _contents_bytes(contents)
+            response = client.models.generate_content(model=self.model, contents=contents, config=request_config)
+            rec.update(usage_fields(response))
+        answer = (response.text or "").strip()
+        if answer:
+            disk_cache.put(key, {"answer": answer})
+        return answer
+
+    def ask_stream(self, client, question: str, focus_text: str = "", history: list | None = None):
+        """`ask` as a generator of text deltas; the full answer is cached once the stream completes."""
+        disk_cache = get_result_cache()
+        key = self._answer_key(question, focus_text)
+        hit = disk_cache.get(key)
+        count("cache", stage="tutor", outcome="miss" if hit is None else "hit")
+        if hit is not None:
+            yield hit["answer"]
+            return
+
+        contents, request_config = self._request(client, question, focus_text, history)
+        answer = ""
+        with span("tutor_call", model=self.model, cached_context=bool(request_config.cached_content),
+                  streamed=True) as rec:
+            rec["bytes_sent"] = _contents_bytes(contents)
+            for chunk in client.models.generate_content_stream(model=self.model, contents=contents, config=request_config):
+                rec.update(usage_fields(chunk))
+                if chunk.text:
+                    answer += chunk.text
+                    yield chunk.text
+        if answer.strip():
+            disk_cache.put(key, {"answer": answer.strip()})
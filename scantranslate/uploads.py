@@ -0,0 +1,78 @@
+"""
+Upload registry: hash once, pass digests around.
+
+Also knows which file types the pipeline accepts and how to flatten ZIP
+archives into individual documents.
+"""
+import functools, hashlib, io, os, zipfile
+
+from . import config
+from .caches import get_cache_manager
+
+UPLOAD_MIME_BY_EXT = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".pdf": "application/pdf"}
+ZIP_MAX_MEMBER_BYTES = 200 * 1024 * 1024  # same per-file limit as the uploader
+
+
+def hash_bytes(b: bytes) -> str:
+    return hashlib.sha256(b).hexdigest()
+
+
+def mime_for(name: str, default: str | None = None) -> str | None:
+    return UPLOAD_MIME_BY_EXT.get(os.path.splitext(name)[1].lower(), default)
+
+
+def iter_upload_entries(name: str, data: bytes, mime: str | None = None):
+    """Yield (name, bytes, mime) for a file, or for each supported member of a ZIP archive."""
+    if name.lower().endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or info.filename.startswith("__MACOSX/") or info.file_size > ZIP_MAX_MEMBER_BYTES:
+                    continue
+                member_mime = mime_for(info.filename)
+                if member_mime:
+                    yield f"{name}/{info.filename}", zf.read(info), member_mime
+        return
+    mime = mime_for(name, mime)
+    if mime:
+        yield name, data, mime
+
+
+class UploadRegistry:
+    """
+    Digest → bytes store. Files are hashed once when they enter the app and
+    everything downstream (cached renders, OCR) takes the digest instead of
+    the payload, so st.cache_data only ever hashes a 64-char string.
+    Blobs stay in memory up to `max_memory_bytes`; the least recently used
+    ones are spilled to `spill_dir` and read back on demand, until the spill
+    directory's own budget or TTL removes them.
+    """
+
+    def __init__(self, spill_dir: str, max_memory_bytes: int):
+        self.spill_dir = spill_dir
+        self.max_memory_bytes = max_memory_bytes
+        self._blobs = get_cache_manager().memory_cache(
+            "uploads", max_memory_bytes / (1024 * 1024), spill_dir=spill_dir,
+            spill_max_mb=config.UPLOAD_SPILL_MAX_MB, spill_ttl_seconds=config.UPLOAD_SPILL_TTL_S,
+        )
+        self._blobs.sweep_spill()  # whatever earlier processes left behind
+
+    def put(self, data: bytes) -> str:
+        digest = hash_bytes(data)
+        self._blobs.put(digest, data)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        data = self._blobs.get(digest)
+        if data is None:
+            raise KeyError(f"Unknown upload digest: {digest}")
+        return data
+
+    def __contains__(self, digest: str) -> bool:
+        """Resolvable without reading it: in memory, or spilled (spill files are named by digest)."""
+        return digest in self._blobs or os.path.exists(os.path.join(self.spill_dir, digest))
+
+
+@functools.lru_cache(maxsize=None)
+def get_upload_registry() -> UploadRegistry:
+    """One registry per process so digests resolve from any session or worker."""
+    return UploadRegistry(config.UPLOAD_SPILL_DIR, max_memory_bytes=int(config.UPLOAD_MEMORY_MB * 1024 * 1024))
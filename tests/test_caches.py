@@ -0,0 +1,83 @@
+import os, time
+
+from scantranslate.caches import MemoryCache
+
+
+def test_least_recently_used_entry_goes_first():
+    cache = MemoryCache("t", max_bytes=8)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.get("a")
+    cache.put("c", b"cccc")
+
+    assert "a" in cache and "b" not in cache and "c" in cache
+    assert cache.stats()["evictions"] == 1 and cache.bytes == 8
+
+
+def test_newest_entry_is_kept_even_over_budget():
+    cache = MemoryCache("t", max_bytes=4)
+    cache.put("a", b"aa")
+    cache.put("big", b"x" * 10)
+
+    assert cache.get("big") == b"x" * 10 and "a" not in cache
+
+
+def test_expired_entries_are_missing():
+    cache = MemoryCache("t", max_bytes=100, ttl_seconds=0.05)
+    cache.put("a", b"aaaa")
+    time.sleep(0.1)
+
+    assert cache.get("a") is None and cache.bytes == 0
+
+
+def test_evicted_entries_spill_and_read_back(tmp_path):
+    cache = MemoryCache("t", max_bytes=4, spill_dir=str(tmp_path))
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+
+    assert "a" not in cache and os.listdir(tmp_path) == ["a"] and cache.stats()["spilled"] == 1
+    assert cache.get("a") == b"aaaa"
+
+
+def _spilled(tmp_path, ages: dict, **kwargs) -> MemoryCache:
+    """A cache whose spill directory holds one 4-byte file per key, `ages[key]` seconds old."""
+    now = time.time()
+    for key, age in ages.items():
+        (tmp_path / key).write_bytes(b"abcd")
+        os.utime(tmp_path / key, (now - age, now - age))
+    return MemoryCache("t", max_bytes=100, spill_dir=str(tmp_path), **kwargs)
+
+
+def test_sweep_removes_least_recently_used_files_over_budget(tmp_path):
+    cache = _spilled(tmp_path, {"a": 40, "b": 30, "c": 20, "d": 10}, spill_max_bytes=8)
+    cache.sweep_spill()
+
+    assert sorted(os.listdir(tmp_path)) == ["c", "d"]
+    assert cache.stats()["spill_bytes"] == 8 and cache.stats()["spill_removed"] == 2
+
+
+def test_sweep_removes_expired_files(tmp_path):
+    cache = _spilled(tmp_path, {"old": 120, "new": 10}, spill_ttl_seconds=60)
+    cache.sweep_spill()
+
+    assert os.listdir(tmp_path) == ["new"]
+
+
+def test_reading_a_spilled_file_keeps_it_from_the_sweep(tmp_path):
+    cache = _spilled(tmp_path, {"a": 40, "b": 30, "c": 20}, spill_max_bytes=8)
+    assert cache.get("a") == b"abcd"
+    cache.clear()
+    cache.sweep_spill()
+
+    assert sorted(os.listdir(tmp_path)) == ["a", "c"]
+
+
+def test_spilling_over_budget_sweeps(tmp_path):
+    cache = MemoryCache("t", max_bytes=4, spill_dir=str(tmp_path), spill_max_bytes=8)
+    for key in "abcde":
+        cache.put(key, key.encode() * 4)
+        for name in os.listdir(tmp_path):  # distinct mtimes, in spill order
+            os.utime(tmp_path / name, (1000 + ord(name), 1000 + ord(name)))
+
+    assert sorted(os.listdir(tmp_path)) == ["c", "d"]
+    assert cache.get("e") == b"eeee"
@@ -0,0 +1,42 @@
+import os
+
+from scantranslate.cli import write_outputs
+from scantranslate.pipeline import BatchJobQueue
+
+
+def _page(page, korean, target="", error=None):
+    return {"page": page, "korean": korean, "target": target, "confidence": 90, "error": error, "source": "ocr"}
+
+
+def _queue(*jobs) -> BatchJobQueue:
+    queue = BatchJobQueue()
+    for i, (name, mime, pages) in enumerate(jobs):
+        queue.jobs[f"digest{i}"] = {
+            "files": [name], "digest": f"digest{i}", "mime": mime, "status": "done", "pages": pages, "pending": 0,
+        }
+    return queue
+
+
+def test_same_names_from_different_directories_keep_both_outputs(tmp_path):
+    queue = _queue(
+        ("notice.jpg", "image/jpeg", [_page(1, "첫째", "first")]),
+        ("notice.jpg", "image/jpeg", [_page(1, "둘째", "second")]),
+    )
+
+    written = write_outputs(queue, str(tmp_path), {"txt"})
+
+    assert [os.path.basename(p) for p in written] == ["notice.jpg.txt", "notice.jpg_2.txt"]
+    assert "first" in open(written[0], encoding="utf-8").read()
+    assert "second" in open(written[1], encoding="utf-8").read()
+
+
+def test_only_pdf_text_has_page_headers(tmp_path):
+    queue = _queue(
+        ("scan.png", "image/png", [_page(1, "안녕하세요", "Hello")]),
+        ("doc.pdf", "application/pdf", [_page(1, "하나", "One"), _page(2, "둘", "Two")]),
+    )
+
+    picture, document = (open(p, encoding="utf-8").read() for p in write_outputs(queue, str(tmp_path), {"txt"}))
+
+    assert "[Page" not in picture and "안녕하세요" in picture and "Hello" in picture
+    assert "[Page 1]" in document and "[Page 2]" in document
@@ -0,0 +1,113 @@
+import threading, time
+
+import pytest
+from google.genai.errors import APIError
+
+from scantranslate import config
+from scantranslate.gemini import CallBudget, TokenBucket, _SlotStream, call_with_retries
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(config, "BACKOFF_BASE_S", 0.0)
+
+
+def test_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate_per_minute=600, burst=3)  # one token per 0.1 s
+
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert 0.05 < bucket.acquire() < 0.2
+
+
+def test_pause_holds_every_caller_back():
+    bucket = TokenBucket(rate_per_minute=60_000, burst=10)
+    bucket.pause(0.1)
+
+    t0 = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - t0 >= 0.09
+
+
+def _failing(errors, result="ok"):
+    """A call that raises each of `errors` in turn, then returns `result`."""
+    errors = list(errors)
+
+    def fn():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return fn
+
+
+def test_transient_errors_are_retried():
+    budget = CallBudget(60_000, 10, 2)
+
+    assert call_with_retries(_failing([ConnectionError(), APIError(503, {})]), budget=budget) == "ok"
+    assert budget.stats()["calls"] == 3 and budget.stats()["retries"] == 2 and budget.stats()["failures"] == 0
+
+
+def test_other_errors_are_raised_at_once():
+    budget = CallBudget(60_000, 10, 2)
+
+    with pytest.raises(APIError):
+        call_with_retries(_failing([APIError(400, {})]), budget=budget)
+    assert budget.stats()["calls"] == 1 and budget.stats()["failures"] == 1
+
+
+def test_retries_run_out():
+    budget = CallBudget(60_000, 10, 2)
+
+    with pytest.raises(ConnectionError):
+        call_with_retries(_failing([ConnectionError()] * 3), budget=budget, max_retries=2)
+    assert budget.stats()["calls"] == 3 and budget.stats()["failures"] == 1
+
+
+def test_quota_error_pauses_the_shared_bucket(monkeypatch):
+    monkeypatch.setattr(config, "BACKOFF_BASE_S", 0.05)
+    monkeypatch.setattr("scantranslate.gemini.random.uniform", lambda lo, hi: hi)
+    budget = CallBudget(60_000, 10, 2)
+
+    call_with_retries(_failing([APIError(429, {})]), budget=budget)
+    assert budget.bucket._paused_until > 0
+
+
+def _free(slots) -> bool:
+    if slots.acquire(blocking=False):
+        slots.release()
+        return True
+    return False
+
+
+def test_stream_holds_its_slot_until_read_to_the_end():
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    stream = _SlotStream("a", iter(["b", "c"]), slots)
+
+    assert next(stream) == "a" and not _free(slots)
+    assert list(stream) == ["b", "c"]
+    assert _free(slots)
+    stream.close()  # released once only: a BoundedSemaphore would raise on a second release
+
+
+def test_closed_stream_gives_its_slot_back():
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    stream = _SlotStream("a", iter(["b"]), slots)
+
+    stream.close()
+    assert _free(slots)
+    assert list(stream) == []
+
+
+def test_stream_error_gives_its_slot_back():
+    def chunks():
+        yield "b"
+        raise ConnectionError()
+
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    stream = _SlotStream("a", chunks(), slots)
+
+    with pytest.raises(ConnectionError):
+        list(stream)
+    assert _free(slots)
@@ -0,0 +1,87 @@
+import sqlite3
+
+from scantranslate.history import HistoryStore
+
+
+def _store(tmp_path) -> HistoryStore:
+    return HistoryStore(str(tmp_path / "history.sqlite3"))
+
+
+def _ids(store, query, **kwargs) -> set[int]:
+    entries, total = store.page(query, **kwargs)
+    assert total == len(entries)
+    return {e["id"] for e in entries}
+
+
+def test_search_finds_korean_and_translated_text(tmp_path):
+    store = _store(tmp_path)
+    notice = store.add("h1", "주민센터 휴관 안내", "Community center closure", "English")
+    store.add("h2", "쓰레기 배출 요령", "How to put out trash", "English")
+
+    assert _ids(store, "휴관 안내") == {notice}  # full-text (trigram) search
+    assert _ids(store, "closure") == {notice}
+    assert _ids(store, "휴관") == {notice}  # shorter than a trigram: LIKE
+    assert _ids(store, "no such text") == set()
+
+
+def test_like_fallback_matches_wildcards_literally(tmp_path):
+    store = _store(tmp_path)
+    store.add("h1", "할인 50%", "50% off", "English")
+    store.add("h2", "할인 500원", "500 won off", "English")
+    store.fts = False
+
+    assert len(_ids(store, "0%")) == 1
+    assert len(_ids(store, "할인")) == 2
+
+
+def test_entries_are_per_owner_and_paged_newest_first(tmp_path):
+    store = _store(tmp_path)
+    ids = [store.add(f"h{i}", f"공지 {i}", f"Notice {i}", "English", owner="a@example.com") for i in range(5)]
+    store.add("other", "공지", "Notice", "English", owner="b@example.com")
+
+    entries, total = store.page(limit=2, offset=1, owner="a@example.com")
+    assert total == 5 and [e["id"] for e in entries] == [ids[3], ids[2]]
+    assert store.get(ids[0], owner="b@example.com") is None
+
+
+def test_rerun_refreshes_an_entry_but_keeps_edits(tmp_path):
+    store = _store(tmp_path)
+    entry_id = store.add("h1", "원문", "model", "English")
+    assert store.add("h1", "원문", "model again", "English") == entry_id
+    assert store.get(entry_id)["target"] == "model again"
+
+    store.update(entry_id, "원문", "corrected")
+    store.add("h1", "원문", "model once more", "English", confidence=88)
+
+    entry = store.get(entry_id)
+    assert entry["target"] == "corrected" and entry["edited"] and entry["confidence"] == 88
+    assert _ids(store, "corrected") == {entry_id}  # the search index follows the edit
+
+
+def test_previous_version_is_an_earlier_upload_of_the_same_file(tmp_path):
+    store = _store(tmp_path)
+    v1 = store.add("v1", "1판", "first", "English", file="notice.pdf", digest="d1", page_results=[{"page": 1}])
+    store.add("v2", "2판", "second", "English", file="notice.pdf", digest="d2")
+    store.add("v2-p2", "2판 2쪽", "second p2", "English", file="notice.pdf", digest="d2")  # same upload, other pages
+
+    previous = store.previous_version("notice.pdf", "English", "d2")
+    assert previous["id"] == v1 and previous["page_results"] == [{"page": 1}]
+    assert store.previous_version("notice.pdf", "Filipino", "d2") is None
+    assert store.previous_version("other.pdf", "English", "d2") is None
+
+
+def test_older_stores_gain_the_new_columns(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE history (id INTEGER PRIMARY KEY, owner TEXT NOT NULL, content_hash TEXT NOT NULL,"
+        " file TEXT NOT NULL, lang TEXT NOT NULL, lang_flag TEXT NOT NULL, confidence INTEGER,"
+        " korean TEXT NOT NULL, target TEXT NOT NULL, page_results TEXT NOT NULL,"
+        " created_at REAL NOT NULL, updated_at REAL NOT NULL, UNIQUE (owner, content_hash))"
+    )
+    conn.commit()
+    conn.close()
+
+    store = HistoryStore(path)
+    entry_id = store.add("h1", "원문", "text", "English", digest="d1")
+    assert store.get(entry_id)["edited"] == 0
@@ -0,0 +1,61 @@
+from scantranslate.memory import TranslationMemory, align
+
+
+def _memory(tmp_path, **kwargs) -> TranslationMemory:
+    return TranslationMemory(str(tmp_path / "tm.sqlite3"), **kwargs)
+
+
+def test_align_pairs_sentences_line_by_line():
+    korean = "안녕하세요. 반갑습니다.\n공지사항입니다."
+    target = "Hello. Nice to meet you.\nThis is a notice. Please read it."
+
+    assert align(korean, target) == [
+        ("안녕하세요.", "Hello."), ("반갑습니다.", "Nice to meet you."),
+        ("공지사항입니다.", "This is a notice. Please read it."),  # sentence counts differ: the whole line
+    ]
+
+
+def test_align_gives_up_on_different_line_counts():
+    assert align("하나.\n둘.", "One. Two.") == []
+
+
+def test_align_skips_untranslated_and_letterless_units():
+    assert align("2024. 10. 17.\n서울시", "2024. 10. 17.\n서울시") == []
+
+
+def test_lookup_ignores_spacing(tmp_path):
+    tm = _memory(tmp_path)
+    tm.remember([("안녕하세요  여러분.", "Hello everyone.")], "English")
+
+    assert tm.lookup_many([" 안녕하세요 여러분. "], "English") == {" 안녕하세요 여러분. ": "Hello everyone."}
+    assert tm.lookup_many(["안녕하세요 여러분."], "Filipino") == {}
+
+
+def test_edits_win_over_model_output(tmp_path):
+    tm = _memory(tmp_path)
+    tm.remember([("안녕하세요.", "Hi.")], "English")
+    tm.remember([("안녕하세요.", "Hello.")], "English", origin="edit")
+    assert tm.remember([("안녕하세요.", "Hey.")], "English") == 0
+
+    assert tm.lookup_many(["안녕하세요."], "English") == {"안녕하세요.": "Hello."}
+
+
+def test_plan_sends_only_unknown_sentences(tmp_path):
+    tm = _memory(tmp_path)
+    tm.remember([("안녕하세요.", "Hello.")], "English")
+
+    plan = tm.plan("안녕하세요. 새 문장입니다.\n2024.\n\n안녕하세요.", "English")
+
+    assert plan.missing == ["새 문장입니다."]
+    assert plan.assemble({"새 문장입니다.": "A new sentence."}) == "Hello. A new sentence.\n2024.\n\nHello."
+
+
+def test_fuzzy_lookup_reuses_near_identical_sentences(tmp_path):
+    tm = _memory(tmp_path, fuzzy_min=0.8)
+    tm.remember([("주민센터는 월요일부터 금요일까지 운영합니다.", "The center is open Monday to Friday.")], "English")
+
+    assert tm.lookup_many(["주민센터는 월요일부터 금요일까지 운영합니다!"], "English") == {
+        "주민센터는 월요일부터 금요일까지 운영합니다!": "The center is open Monday to Friday.",
+    }
+    assert tm.lookup_many(["도서관은 주말에도 문을 엽니다."], "English") == {}
+    assert tm.stats()["fuzzy_hits"] == 1
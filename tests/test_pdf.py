@@ -0,0 +1,74 @@
+import io
+
+import fitz
+import pytest
+from PIL import Image, ImageDraw
+
+from scantranslate.pdf import _fingerprint
+
+
+def _scan(lines=30, fmt="PNG") -> bytes:
+    img = Image.new("L", (800, 1000), 255)
+    draw = ImageDraw.Draw(img)
+    for i in range(lines):
+        draw.rectangle([50, 50 + i * 30, 700, 65 + i * 30], fill=0)
+    out = io.BytesIO()
+    img.convert("RGB").save(out, fmt)
+    return out.getvalue()
+
+
+def _document(text="주민센터 공지사항", lines=30) -> bytes:
+    doc = fitz.open()
+    for fmt in ("PNG", "JPEG"):  # scanned pages: Flate- and DCT-encoded images
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=_scan(lines, fmt))
+    page = doc.new_page()
+    page.insert_text((72, 72), text, fontname="korea")
+    page.draw_rect(fitz.Rect(100, 100, 200, 200))
+    return doc.tobytes()
+
+
+def _fingerprints(data: bytes) -> list[str]:
+    with fitz.open(stream=data) as doc:
+        return [_fingerprint(doc, i) for i in range(doc.page_count)]
+
+
+@pytest.mark.parametrize("options", [
+    {"deflate": True},
+    {"deflate": True, "garbage": 4},
+    {"clean": True},
+    {"expand": 255},
+    {"deflate": True, "garbage": 4, "clean": True},
+])
+def test_resaving_keeps_fingerprints(options):
+    data = _document()
+    with fitz.open(stream=data) as doc:
+        resaved = doc.tobytes(**options)
+
+    assert resaved != data
+    assert _fingerprints(resaved) == _fingerprints(data)
+
+
+def test_only_changed_pages_get_new_fingerprints():
+    before = _fingerprints(_document())
+
+    edited_text = _fingerprints(_document(text="주민센터 공지사항!"))
+    assert edited_text[:2] == before[:2] and edited_text[2] != before[2]
+
+    edited_scans = _fingerprints(_document(lines=29))
+    assert edited_scans[0] != before[0] and edited_scans[1] != before[1] and edited_scans[2] == before[2]
+
+
+def _form(value: str) -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    widget = fitz.Widget()
+    widget.field_name, widget.field_type = "name", fitz.PDF_WIDGET_TYPE_TEXT
+    widget.rect, widget.field_value = fitz.Rect(72, 72, 300, 100), value
+    page.add_widget(widget)
+    return doc.tobytes()
+
+
+def test_form_fillings_differ():
+    assert _fingerprints(_form("홍길동")) == _fingerprints(_form("홍길동"))
+    assert _fingerprints(_form("홍길동")) != _fingerprints(_form("김철수"))
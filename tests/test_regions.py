@@ -0,0 +1,89 @@
+import numpy as np
+
+from scantranslate.regions import _merge_small, segment
+
+LINE_H, LINE_GAP, WORD, SPACE = 16, 10, 40, 8
+
+
+def _line(ink, x0, x1, y):
+    """One line of "words": WORD-wide ink runs separated by SPACE-wide word spaces."""
+    for x in range(x0, x1, WORD + SPACE):
+        ink[y:y + LINE_H, x:min(x + WORD, x1)] = True
+
+
+def _column(ink, x0, x1, y, lines, paragraph_every=None):
+    for i in range(lines):
+        if paragraph_every and i and i % paragraph_every == 0:
+            y += LINE_H + LINE_GAP  # blank line between paragraphs
+        _line(ink, x0, x1, y)
+        y += LINE_H + LINE_GAP
+    return y
+
+
+def _page(h=1100, w=850):
+    return np.zeros((h, w), dtype=bool)
+
+
+def _no_overlaps(boxes):
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1:]:
+            assert not (a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]), (a, b)
+
+
+def test_two_columns_under_full_width_title():
+    ink = _page()
+    _line(ink, 60, 790, 40)
+    _column(ink, 60, 400, 100, 30)
+    _column(ink, 450, 790, 100, 30)
+
+    boxes = segment(ink, tile=1600)
+
+    assert len(boxes) == 3
+    title, left, right = boxes
+    assert title[1] < 100 and title[0] <= 60 and title[2] >= 780  # the whole title, read first
+    assert left[2] <= 410 and right[0] >= 440  # then the left column, then the right
+    assert left[3] - left[1] > 600 and right[3] - right[1] > 600
+    _no_overlaps(boxes)
+
+
+def test_single_line_is_not_split_at_word_spaces():
+    ink = _page(200)
+    _line(ink, 60, 790, 80)
+
+    assert segment(ink, tile=1600) == [(60, 80, 790, 80 + LINE_H)]
+
+
+def test_aligned_paragraph_breaks_keep_column_order():
+    ink = _page()
+    _line(ink, 60, 790, 40)
+    _column(ink, 60, 400, 100, 30, paragraph_every=6)
+    _column(ink, 450, 790, 100, 30, paragraph_every=6)
+
+    boxes = segment(ink, tile=1600)
+
+    column_of = ["title" if b[1] < 100 else "left" if b[2] <= 410 else "right" for b in boxes]
+    assert column_of[0] == "title"
+    assert column_of[1:] == sorted(column_of[1:])  # every left piece before any right piece
+    _no_overlaps(boxes)
+
+
+def test_tall_column_is_tiled_at_line_gaps():
+    ink = _page(2200)
+    _column(ink, 60, 790, 40, 80)
+
+    boxes = segment(ink, tile=600)
+
+    assert len(boxes) > 1
+    assert all(b[3] - b[1] <= 600 for b in boxes)
+    for b in boxes:  # cuts fall between lines: every box edge is a line edge
+        assert (b[1] - 40) % (LINE_H + LINE_GAP) == 0
+        assert (b[3] - 40 - LINE_H) % (LINE_H + LINE_GAP) == 0
+    _no_overlaps(boxes)
+
+
+def test_merge_never_grows_over_another_box():
+    small = (74, 331, 304, 365)
+    right = (320, 331, 486, 365)
+    below = (73, 380, 486, 1466)  # same column as `right`; the union would swallow `small`
+
+    assert _merge_small([small, right, below], tile=1600) == [small, right, below]